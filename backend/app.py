@@ -5,9 +5,10 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import os
 import asyncio
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 import json
 import uuid
+import secrets
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -16,6 +17,7 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
 # Import our custom modules
 from services.groq_service import GroqService
+from services.llm_router import LLMRouter
 from services.pdf_processor import PDFProcessor
 from services.web_search import WebSearchService
 from services.vector_store import VectorStore
@@ -25,10 +27,13 @@ from services import quiz_manager
 from services import auth_service
 from services import reporting_service
 from services import twofa_service
+from services import metrics
+from services import tracing
+from services.static_assets import StaticAssetsMiddleware
+from services.compression import negotiate_encoding, gzip_stream
 from services.security import (
-    AuditLoggingMiddleware,
-    RateLimitMiddleware,
-    SecurityHeadersMiddleware,
+    SecurityMiddleware,
+    audit_writer,
     sanitize_string,
     sanitize_username,
     sanitize_email,
@@ -39,13 +44,9 @@ from services.security import (
 
 app = FastAPI(title="Edu Assist Pro API", description="AI-powered corporate training platform with RAG capabilities")
 
-# ─── Middleware stack (order matters: outermost first) ────────────────────────
-# Security headers on every response
-app.add_middleware(SecurityHeadersMiddleware)
-# Rate limiting (before audit so 429s are fast)
-app.add_middleware(RateLimitMiddleware)
-# Audit logging for all /api/* requests
-app.add_middleware(AuditLoggingMiddleware)
+# ─── Middleware stack (the last one added runs outermost) ─────────────────────
+# Rate limiting, security headers and audit logging in one pure-ASGI pass
+app.add_middleware(SecurityMiddleware)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -58,18 +59,30 @@ app.add_middleware(
 
 # Mount static files (your existing frontend)
 import os
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response, StreamingResponse
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
 print(f"Static directory: {static_dir}")
 print(f"Static directory exists: {os.path.exists(static_dir)}")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
+# Fingerprinted + precompressed build (python build_static.py) served ahead of
+# every other middleware; falls through to the mount above when not built
+app.add_middleware(StaticAssetsMiddleware, dist_dir=os.path.join(static_dir, "dist"))
+if os.path.exists(os.path.join(static_dir, "dist", "manifest.json")):
+    print("✅ Serving built static assets from static/dist")
+
 # Initialize services
 groq_service = GroqService()
+llm_providers = [("groq", groq_service)]
+if os.getenv("OPENAI_API_KEY"):
+    # OpenAI is an optional fallback / hedge target behind Groq
+    from services.openai_service import OpenAIService
+    llm_providers.append(("openai", OpenAIService()))
+llm_router = LLMRouter(llm_providers)
 pdf_processor = PDFProcessor()
 web_search = WebSearchService()
 vector_store = VectorStore()
-rag_engine = RAGEngine(groq_service, vector_store, web_search)
+rag_engine = RAGEngine(llm_router, vector_store, web_search)
 
 # Pydantic models for request/response
 class SourceInfo(BaseModel):
@@ -84,12 +97,14 @@ class ChatMessage(BaseModel):
     eli5_mode: Optional[bool] = False
     session_id: Optional[str] = None
     conversation_history: Optional[List[dict]] = []
+    include_timings: Optional[bool] = False  # return per-stage timings with the response
 
 class ChatResponse(BaseModel):
     response: str
     sources: List[SourceInfo] = []  # Use proper source model
     session_id: str
     timestamp: str
+    timings: Optional[Dict[str, Any]] = None  # only when include_timings was set
 
 class DocumentUpload(BaseModel):
     filename: str
@@ -148,8 +163,14 @@ class TwoFASendCodeRequest(BaseModel):
 
 # ─── Auth dependency ──────────────────────────────────────────────────────────
 
+_NO_AUTH_CONTEXT = object()
+
 def get_current_user(request: Request) -> Optional[dict]:
-    """Extract and verify JWT from Authorization header. Returns payload or None."""
+    """Verified JWT payload for this request, or None (decoded once by SecurityMiddleware)."""
+    context = getattr(request.state, "auth", _NO_AUTH_CONTEXT)
+    if context is not _NO_AUTH_CONTEXT:
+        return context
+    # Middleware didn't run (e.g. the app is mounted without it): decode here
     auth = request.headers.get("Authorization", "")
     if auth.startswith("Bearer "):
         token = auth[7:]
@@ -176,6 +197,10 @@ def require_role(*roles):
 # In-memory storage for sessions (in production, use a database)
 chat_sessions = {}
 
+# Per-course locks so concurrent quiz generation requests share one LLM call
+# (one small lock per course id, kept for the life of the process)
+quiz_generation_locks: dict = {}
+
 @app.get("/")
 async def root():
     # Redirect to the login page
@@ -191,6 +216,18 @@ def api_health():
     """Alternative health check endpoint"""
     return {"status": "ok", "message": "Edu Assist Pro API is healthy"}
 
+# Bearer token for Prometheus scrapes (unset = /metrics is open, e.g. internal network only)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@app.get("/metrics")
+def prometheus_metrics(request: Request):
+    """Request latency histograms and LLM / embedding / cache / DB counters (Prometheus text format)."""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Debug: Print registered routes
 @app.on_event("startup")
 async def startup_event():
@@ -203,6 +240,12 @@ async def startup_event():
             print(f"   {list(methods) if methods else 'ALL'} {path}")
     print("✅ Startup complete!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush queued audit log rows before the process exits
+    audit_writer.close()
+    twofa_service.stop_challenge_sweeper()
+
 @app.get("/api/test")
 async def test_rag():
     """Test endpoint to verify RAG system is working"""
@@ -250,13 +293,14 @@ async def chat_endpoint(chat_request: ChatMessage, user=Depends(require_auth)):
             "timestamp": datetime.now().isoformat()
         })
         
-        # Get AI response using RAG engine
-        response_data = await rag_engine.get_response(
-            query=chat_request.message,
-            subject=chat_request.subject,
-            eli5_mode=chat_request.eli5_mode or False,
-            chat_history=chat_sessions[session_id]["messages"][-10:]  # Last 10 messages for context
-        )
+        # Get AI response using RAG engine (stage spans collected into a trace)
+        with tracing.start_trace("chat") as trace:
+            response_data = await rag_engine.get_response(
+                query=chat_request.message,
+                subject=chat_request.subject,
+                eli5_mode=chat_request.eli5_mode or False,
+                chat_history=chat_sessions[session_id]["messages"][-10:]  # Last 10 messages for context
+            )
         
         # Convert sources to SourceInfo objects
         sources = []
@@ -279,7 +323,8 @@ async def chat_endpoint(chat_request: ChatMessage, user=Depends(require_auth)):
             response=response_data["response"],
             sources=sources,  # Use converted SourceInfo objects
             session_id=session_id,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            timings=trace.timings() if chat_request.include_timings else None
         )
         
     except Exception as e:
@@ -391,28 +436,80 @@ async def health_check():
 
 # ─── COURSE & CURRICULUM ENDPOINTS ──────────────────────────────────────────
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _revalidatable_json(request: Request, etag: str, payload) -> Response:
+    """JSON response the browser may cache but must revalidate (304 if unchanged)."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
 @app.get("/api/courses")
-async def list_courses():
+async def list_courses(request: Request):
     """Return all available courses with module counts."""
     try:
-        courses = course_manager.get_all_courses()
-        return {"courses": courses}
+        generation, courses = course_manager.get_all_courses_versioned()
+        return _revalidatable_json(request, f'"catalog-{generation}"', {"courses": courses})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching courses: {str(e)}")
 
 @app.get("/api/courses/{course_id}")
-async def get_course(course_id: str):
+async def get_course(course_id: str, request: Request):
     """Return a single course with its modules."""
     try:
-        course = course_manager.get_course(course_id)
+        generation, course = course_manager.get_course_versioned(course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
-        return course
+        return _revalidatable_json(request, f'"course-{course_id}-{generation}"', course)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching course: {str(e)}")
 
+@app.get("/api/courses/{course_id}/outline")
+async def get_course_outline(course_id: str, request: Request):
+    """Return a course with module titles/durations only (content is loaded per module)."""
+    try:
+        generation, course = course_manager.get_course_outline_versioned(course_id)
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+        return _revalidatable_json(request, f'"outline-{course_id}-{generation}"', course)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching course outline: {str(e)}")
+
+@app.get("/api/courses/{course_id}/modules/{module_id}/content")
+async def get_module_content(course_id: str, module_id: str, request: Request):
+    """Return one module's HTML content, precompressed (br/gzip) when the client accepts it."""
+    try:
+        content = course_manager.get_module_content(
+            course_id, module_id, request.headers.get("accept-encoding")
+        )
+        if not content:
+            raise HTTPException(status_code=404, detail="Module not found")
+        headers = {
+            "ETag": content["etag"],
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request, content["etag"]):
+            return Response(status_code=304, headers=headers)
+        if content["encoding"]:
+            headers["Content-Encoding"] = content["encoding"]
+        return Response(content["body"], media_type="text/html; charset=utf-8", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching module content: {str(e)}")
+
 @app.post("/api/courses/{course_id}/enroll")
 async def enroll_in_course(course_id: str, req: EnrollRequest, user=Depends(require_auth)):
     """Enroll a user in a course."""
@@ -480,41 +577,53 @@ async def generate_quiz(course_id: str, user=Depends(require_auth)):
         if existing:
             return existing
 
-        # Get course info
-        course = course_manager.get_course(course_id)
-        if not course:
-            raise HTTPException(status_code=404, detail="Course not found")
-
-        modules = course.get("modules", [])
-        prompt = quiz_manager.build_quiz_prompt(course["title"], course["category"], modules)
-
-        # Call Groq LLM to generate questions
-        try:
-            response_text = await groq_service.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are a corporate training quiz generator. Respond ONLY with valid JSON arrays."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=2048
-            )
-            questions = quiz_manager.parse_quiz_response(response_text)
-        except Exception as e:
-            print(f"LLM quiz generation failed: {e}, using fallback questions")
-            questions = []
-
-        if not questions:
-            questions = quiz_manager.get_fallback_questions(course["title"], course["category"])
-
-        result = quiz_manager.create_quiz_from_questions(course_id, course["title"], questions)
-        # Return the full quiz
-        return quiz_manager.get_quiz_by_id(result["quiz_id"])
+        # Trainees opening the same course at once wait for one generation
+        # instead of each firing (and storing) their own quiz
+        lock = quiz_generation_locks.setdefault(course_id, asyncio.Lock())
+        async with lock:
+            existing = quiz_manager.get_quiz_for_course(course_id)
+            if existing:
+                return existing
+            return await _generate_and_store_quiz(course_id)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
 
+async def _generate_and_store_quiz(course_id: str) -> dict:
+    """Build the quiz prompt, call the LLM (or fall back) and persist the quiz."""
+    # Get course info
+    course = course_manager.get_course(course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    modules = course.get("modules", [])
+    prompt = quiz_manager.build_quiz_prompt(course["title"], course["category"], modules)
+
+    # Call Groq LLM to generate questions (lower priority than chat)
+    try:
+        response_text = await llm_router.chat_completion(
+            messages=[
+                {"role": "system", "content": "You are a corporate training quiz generator. Respond ONLY with valid JSON arrays."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=2048,
+            priority="quiz"
+        )
+        questions = quiz_manager.parse_quiz_response(response_text)
+    except Exception as e:
+        print(f"LLM quiz generation failed: {e}, using fallback questions")
+        questions = []
+
+    if not questions:
+        questions = quiz_manager.get_fallback_questions(course["title"], course["category"])
+
+    result = quiz_manager.create_quiz_from_questions(course_id, course["title"], questions)
+    # Return the full quiz
+    return quiz_manager.get_quiz_by_id(result["quiz_id"])
+
 @app.get("/api/quiz/{course_id}")
 async def get_quiz(course_id: str):
     """Get the quiz for a course (without correct answers for the frontend)."""
@@ -593,38 +702,18 @@ async def get_certificate(cert_id: str):
 
 # ─── AUTHENTICATION & AUTHORIZATION ENDPOINTS ────────────────────────────────
 
+@app.exception_handler(auth_service.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: auth_service.PasswordHasherBusy):
+    """Login storms: shed load instead of queueing unbounded bcrypt work."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "2"})
+
 @app.post("/api/auth/login")
 async def auth_login(req: LoginRequest):
     """Authenticate user and return JWT + user profile, or require 2FA."""
-    result = auth_service.login(req.username, req.password)
+    # One connection: user + 2FA settings lookup, audit row and challenge in one transaction
+    result = await auth_service.login_with_2fa(req.username, req.password)
     if "error" in result:
         raise HTTPException(status_code=401, detail=result["error"])
-
-    # Check if 2FA is enabled for this user
-    user = result["user"]
-    twofa_settings = twofa_service.get_user_2fa_settings(user["id"])
-
-    if twofa_settings["is_enabled"]:
-        # Issue a temporary token (not a full auth token)
-        temp_token = twofa_service.create_temp_token(user["id"], user["username"], user["role"])
-        # Create a challenge for the preferred method
-        challenge = twofa_service.create_challenge(user["id"], twofa_settings["preferred_method"])
-
-        return {
-            "requires_2fa": True,
-            "temp_token": temp_token,
-            "challenge_id": challenge["challenge_id"],
-            "method": twofa_settings["preferred_method"],
-            "instructions": challenge["instructions"],
-            "demo_hint": challenge.get("demo_hint", ""),
-            "available_methods": twofa_service.get_available_methods(),
-            "user_preview": {
-                "username": user["username"],
-                "name": user["name"],
-            },
-        }
-
-    # No 2FA — return token directly
     return result
 
 @app.post("/api/auth/register")
@@ -643,7 +732,7 @@ async def auth_register(req: RegisterRequest):
     if len(req.password) < 3:
         raise HTTPException(status_code=400, detail="Password must be at least 3 characters.")
 
-    result = auth_service.register_user(
+    result = await auth_service.register_user(
         username=clean_username,
         email=clean_email,
         password=req.password,
@@ -757,7 +846,7 @@ async def auth_me(user=Depends(require_auth)):
 @app.post("/api/auth/change-password")
 async def auth_change_password(req: ChangePasswordRequest, user=Depends(require_auth)):
     """Change the current user's password."""
-    result = auth_service.change_password(user["sub"], req.old_password, req.new_password)
+    result = await auth_service.change_password(user["sub"], req.old_password, req.new_password)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
@@ -804,46 +893,72 @@ async def report_team_overview(user=Depends(require_role("admin", "manager"))):
     return reporting_service.get_team_overview()
 
 @app.get("/api/reports/score-distribution")
-async def report_score_distribution(user=Depends(require_role("admin", "manager"))):
-    """Assessment score distribution across all users."""
-    return reporting_service.get_score_distribution()
+async def report_score_distribution(bucket_width: float = reporting_service.DEFAULT_BUCKET_WIDTH,
+                                    date_from: Optional[str] = None, date_to: Optional[str] = None,
+                                    user=Depends(require_role("admin", "manager"))):
+    """Assessment score distribution (histogram, pass rate, per-course percentiles)."""
+    try:
+        return reporting_service.get_score_distribution(bucket_width, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/reports/compliance")
-async def report_compliance(user=Depends(require_role("admin", "manager"))):
-    """Compliance status for mandatory courses."""
-    return reporting_service.get_compliance_report()
+async def report_compliance(department: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                            user=Depends(require_role("admin", "manager"))):
+    """Compliance status for mandatory courses (optionally one department, paginated)."""
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return reporting_service.get_compliance_report(department, limit, max(offset, 0))
+
+def _csv_download(request: Request, chunks, filename: str) -> StreamingResponse:
+    """Stream CSV chunks as a download, gzipped on the fly when the client accepts it."""
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if negotiate_encoding(request.headers.get("accept-encoding"), ["gzip"]) == "gzip":
+        headers["Content-Encoding"] = "gzip"
+        chunks = gzip_stream(chunks)
+    return StreamingResponse(chunks, media_type="text/csv; charset=utf-8", headers=headers)
 
 @app.get("/api/reports/export/team")
-async def export_team(user=Depends(require_role("admin", "manager"))):
-    """Export team overview as CSV."""
-    from fastapi.responses import Response
-    csv_data = reporting_service.export_team_csv()
-    return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=team_overview.csv"}
-    )
+async def export_team(request: Request, department: Optional[str] = None,
+                      user=Depends(require_role("admin", "manager"))):
+    """Export team overview as CSV (streamed)."""
+    return _csv_download(request, reporting_service.export_team_csv(department), "team_overview.csv")
 
 @app.get("/api/reports/export/scores")
-async def export_scores(user=Depends(require_role("admin", "manager"))):
-    """Export quiz scores as CSV."""
-    from fastapi.responses import Response
-    csv_data = reporting_service.export_scores_csv()
-    return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=assessment_scores.csv"}
+async def export_scores(request: Request, department: Optional[str] = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        user=Depends(require_role("admin", "manager"))):
+    """Export quiz scores as CSV (streamed). date_from / date_to are inclusive YYYY-MM-DD."""
+    try:
+        reporting_service.parse_date_range(date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _csv_download(
+        request, reporting_service.export_scores_csv(department, date_from, date_to), "assessment_scores.csv"
     )
 
 @app.get("/api/reports/export/compliance")
-async def export_compliance(user=Depends(require_role("admin", "manager"))):
-    """Export compliance report as CSV."""
-    from fastapi.responses import Response
-    csv_data = reporting_service.export_compliance_csv()
-    return Response(
-        content=csv_data,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=compliance_report.csv"}
+async def export_compliance(request: Request, department: Optional[str] = None,
+                            user=Depends(require_role("admin", "manager"))):
+    """Export compliance report as CSV (streamed)."""
+    return _csv_download(request, reporting_service.export_compliance_csv(department), "compliance_report.csv")
+
+@app.get("/api/reports/export/columnar/{dataset}")
+async def export_columnar(dataset: str, format: str = "parquet", course_id: Optional[str] = None,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          user=Depends(require_role("admin", "manager"))):
+    """Export raw history (quiz_attempts, enrollments, module_progress) as Parquet or Arrow IPC stream."""
+    if not reporting_service.columnar_available():
+        raise HTTPException(status_code=501, detail="Columnar export requires pyarrow on the server (pip install pyarrow)")
+    try:
+        batches = reporting_service.export_columnar(dataset, format, course_id, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = reporting_service.COLUMNAR_FORMATS[format]
+    return StreamingResponse(
+        batches,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={dataset}.{extension}"}
     )
 
 # ─── SECURITY ADMIN ENDPOINTS ─────────────────────────────────────────────────
@@ -851,7 +966,9 @@ async def export_compliance(user=Depends(require_role("admin", "manager"))):
 @app.get("/api/admin/security/stats")
 async def admin_security_stats(user=Depends(require_role("admin"))):
     """Security statistics for today (admin only)."""
-    return get_security_stats()
+    stats = get_security_stats()
+    stats["password_hasher"] = auth_service.get_password_hasher_stats()
+    return stats
 
 @app.get("/api/admin/security/request-log")
 async def admin_request_log(
@@ -864,6 +981,34 @@ async def admin_request_log(
     """Query request audit log (admin only)."""
     return {"log": get_request_log(limit=limit, method=method, path_contains=path, user_id=user_id)}
 
+@app.get("/api/admin/embeddings/stats")
+async def admin_embedding_stats(user=Depends(require_role("admin"))):
+    """Queue depth and batching stats of the shared embedding service (admin only)."""
+    if vector_store.embedding_client is None:
+        return {"mode": "in_process", "model": vector_store.model_name}
+    try:
+        stats = await vector_store.embedding_client.stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Embedding service unavailable: {str(e)}")
+    return {"mode": "service", "address": vector_store.embedding_client.address, **stats}
+
+@app.get("/api/admin/traces/chrome")
+async def admin_chrome_trace(limit: int = 50, user=Depends(require_role("admin"))):
+    """Recent chat request traces as Chrome trace JSON (open in chrome://tracing or Perfetto; admin only)."""
+    return JSONResponse(
+        tracing.chrome_trace(limit=max(limit, 0)),
+        headers={"Content-Disposition": "attachment; filename=chat_traces.json"},
+    )
+
+@app.get("/api/admin/llm/stats")
+async def admin_llm_stats(user=Depends(require_role("admin"))):
+    """LLM latency per provider/model, circuit state and Groq limiter counters (admin only)."""
+    return {
+        "router": llm_router.stats(),
+        "groq": groq_service.get_limiter_stats(),
+        "groq_tier_decisions": groq_service.get_tier_counts(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=3000)
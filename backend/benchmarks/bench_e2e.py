@@ -0,0 +1,462 @@
+"""
+End-to-end load test — the real app against a seeded corpus and local mocks.
+
+1. seed_data.py builds a throwaway data directory (courses.db, vector_store.db)
+2. mock_services.py stands in for Groq and DuckDuckGo with configurable latency
+3. serve_app.py boots backend/app.py on that data, pointed at the mocks
+4. Closed-loop clients drive each scenario for --duration seconds at --concurrency:
+   - chat:    POST /api/chat (RAG: embed, vector search, web search, LLM)
+   - courses: catalog, course detail, outline, module content
+   - quiz:    fetch, submit (graded, rollups updated), generate via the mock LLM
+   - reports: team overview, score distribution, compliance page, team CSV export
+
+Results (throughput, p50/p90/p99/max latency, errors, peak server RSS, and
+per-stage chat timings) go to --output as JSON, tagged with the git commit, so
+two runs can be compared:
+    python benchmarks/bench_e2e.py --output before.json
+    ... change something ...
+    python benchmarks/bench_e2e.py --output after.json
+    python benchmarks/bench_e2e.py --compare before.json after.json
+
+Run from backend/:
+    python benchmarks/bench_e2e.py [--scenarios chat,courses,quiz,reports] [--concurrency 16]
+                                   [--duration 20] [--users 500] [--courses 40] [--chunks 5000]
+                                   [--llm-latency-ms 400] [--search-latency-ms 150]
+                                   [--data-dir DIR] [--keep-data]
+
+Requires the full backend requirements (requirements.txt); the sentence-transformer
+model is not needed (stub encoder).  Never touches backend/courses.db.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import aiohttp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+SCENARIOS = ("chat", "courses", "quiz", "reports")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="unrecorded seconds before each scenario")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--search-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--data-dir", help="reuse (or create) this data directory instead of a temporary one")
+    parser.add_argument("--keep-data", action="store_true", help="don't delete the temporary data directory")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    return parser.parse_args(argv)
+
+
+def _log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _pct(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _latency_summary(values: list) -> dict:
+    return {
+        "p50_ms": round(_pct(values, 50) * 1000, 2),
+        "p90_ms": round(_pct(values, 90) * 1000, 2),
+        "p99_ms": round(_pct(values, 99) * 1000, 2),
+        "max_ms": round(max(values, default=0) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+    }
+
+
+# ─── Processes ───────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _spawn(script: str, args: list, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, script), *args],
+                            cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _rss_mb(pid: int) -> float:
+    """Resident set size from /proc (Linux); 0 elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def seed(args, data_dir: str) -> dict:
+    if os.path.exists(os.path.join(data_dir, "users.json")):
+        _log(f"📦 Reusing seeded data in {data_dir}")
+        return {"data_dir": data_dir, "reused": True}
+    _log(f"🌱 Seeding {args.courses} courses, {args.users} users, {args.attempts} attempts, "
+         f"{args.chunks} chunks into {data_dir}")
+    result = subprocess.run(
+        [sys.executable, os.path.join(BENCH_DIR, "seed_data.py"), "--data-dir", data_dir,
+         "--users", str(args.users), "--courses", str(args.courses), "--attempts", str(args.attempts),
+         "--chunks", str(args.chunks), "--seed", str(args.seed)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"seed_data.py failed:\n{result.stdout}\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+async def _wait_healthy(session: aiohttp.ClientSession, url: str, proc: subprocess.Popen, timeout: float = 180):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode} (see its log in the data directory)")
+        try:
+            async with session.get(url) as r:
+                if r.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} not healthy after {timeout:.0f}s")
+
+
+# ─── Scenarios ───────────────────────────────────────────────────────────────
+
+class Client:
+    """One simulated user: a trainee token plus whatever it has fetched so far."""
+
+    def __init__(self, ctx: dict, index: int, rng: random.Random):
+        self.ctx = ctx
+        self.rng = rng
+        trainee = ctx["trainees"][index % len(ctx["trainees"])]
+        self.token = trainee["token"]
+        self.user_id = trainee["user_id"]
+        self.session_id = f"bench-session-{index}"
+        self.quizzes = {}
+
+    def auth(self, token: str = None) -> dict:
+        return {"Authorization": f"Bearer {token or self.token}"}
+
+
+async def _request(session, method: str, url: str, **kwargs):
+    async with session.request(method, url, **kwargs) as r:
+        body = await r.read()
+        return r.status, body
+
+
+async def chat_step(session, base: str, client: Client):
+    question = " ".join(client.rng.choices(client.ctx["vocabulary"], k=8)) + "?"
+    status, body = await _request(session, "POST", f"{base}/api/chat", headers=client.auth(), json={
+        "message": question, "session_id": client.session_id, "include_timings": True,
+    })
+    timings = json.loads(body).get("timings") if status == 200 else None
+    return "chat", status, timings
+
+
+async def courses_step(session, base: str, client: Client):
+    rng, ctx = client.rng, client.ctx
+    course_id = rng.choice(ctx["courses"])
+    roll = rng.random()
+    if roll < 0.3:
+        status, _ = await _request(session, "GET", f"{base}/api/courses", headers={"Accept-Encoding": "gzip"})
+        return "catalog", status, None
+    if roll < 0.55:
+        status, _ = await _request(session, "GET", f"{base}/api/courses/{course_id}")
+        return "course", status, None
+    if roll < 0.75:
+        status, _ = await _request(session, "GET", f"{base}/api/courses/{course_id}/outline")
+        return "outline", status, None
+    course_id = rng.choice(ctx["bench_courses"])
+    module_id = f"mod-bench-{course_id.rsplit('-', 1)[1]}-{rng.randrange(5)}"
+    status, _ = await _request(session, "GET", f"{base}/api/courses/{course_id}/modules/{module_id}/content",
+                               headers={"Accept-Encoding": "gzip"})
+    return "module_content", status, None
+
+
+async def quiz_step(session, base: str, client: Client):
+    rng, ctx = client.rng, client.ctx
+    roll = rng.random()
+    if roll < 0.1:
+        # Mostly courses without a seeded quiz: the first call per course goes to the mock LLM
+        course_id = rng.choice(ctx["courses"])
+        status, _ = await _request(session, "POST", f"{base}/api/quiz/generate/{course_id}", headers=client.auth())
+        return "quiz_generate", status, None
+
+    course_id = rng.choice(ctx["quiz_courses"])
+    quiz = client.quizzes.get(course_id)
+    if quiz is None or roll < 0.5:
+        status, body = await _request(session, "GET", f"{base}/api/quiz/{course_id}")
+        if status == 200:
+            client.quizzes[course_id] = json.loads(body)
+        return "quiz_fetch", status, None
+
+    answers = {q["id"]: rng.choice(q["options"]) for q in quiz["questions"] if q.get("options")}
+    status, _ = await _request(session, "POST", f"{base}/api/quiz/submit", headers=client.auth(), json={
+        "user_id": client.user_id, "quiz_id": quiz["id"], "answers": answers,
+        "time_spent_seconds": rng.randint(120, 1800),
+    })
+    return "quiz_submit", status, None
+
+
+async def reports_step(session, base: str, client: Client):
+    rng, ctx = client.rng, client.ctx
+    headers = client.auth(ctx["manager_token"])
+    roll = rng.random()
+    if roll < 0.3:
+        status, _ = await _request(session, "GET", f"{base}/api/reports/team-overview", headers=headers)
+        return "team_overview", status, None
+    if roll < 0.6:
+        status, _ = await _request(session, "GET", f"{base}/api/reports/score-distribution", headers=headers)
+        return "score_distribution", status, None
+    if roll < 0.9:
+        offset = rng.randrange(0, max(1, ctx["user_count"]), 50)
+        status, _ = await _request(session, "GET", f"{base}/api/reports/compliance?limit=50&offset={offset}",
+                                   headers=headers)
+        return "compliance", status, None
+    status, _ = await _request(session, "GET", f"{base}/api/reports/export/team", headers=headers)
+    return "export_team", status, None
+
+
+STEPS = {"chat": chat_step, "courses": courses_step, "quiz": quiz_step, "reports": reports_step}
+
+
+async def run_scenario(session, base: str, name: str, ctx: dict, args, server_pid: int) -> dict:
+    step = STEPS[name]
+    clients = [Client(ctx, i, random.Random(args.seed * 1000 + i)) for i in range(args.concurrency)]
+    latencies, by_endpoint, statuses, stages = [], {}, {}, {}
+    recording = False
+    running = True
+    peak_rss = _rss_mb(server_pid)
+
+    async def worker(client: Client):
+        while running:
+            t0 = time.perf_counter()
+            try:
+                label, status, timings = await step(session, base, client)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                label, status, timings = name, 0, None
+            elapsed = time.perf_counter() - t0
+            if not recording:
+                continue
+            latencies.append(elapsed)
+            by_endpoint.setdefault(label, []).append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            if timings:
+                for span in timings.get("spans", []):
+                    stages.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+
+    async def rss_probe():
+        nonlocal peak_rss
+        while running:
+            peak_rss = max(peak_rss, _rss_mb(server_pid))
+            await asyncio.sleep(0.25)
+
+    tasks = [asyncio.ensure_future(worker(c)) for c in clients] + [asyncio.ensure_future(rss_probe())]
+    await asyncio.sleep(args.warmup)
+    recording = True
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    recording = False
+    elapsed = time.perf_counter() - start
+    running = False
+    await asyncio.gather(*tasks)
+
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(s): c for s, c in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        **_latency_summary(latencies),
+        "rss_mb": round(peak_rss, 1),
+        "endpoints": {label: {"requests": len(v), **_latency_summary(v)} for label, v in sorted(by_endpoint.items())},
+        **({"stages": {s: _latency_summary(v) for s, v in sorted(stages.items())}} if stages else {}),
+    }
+
+
+async def _login(session, base: str, username: str, password: str) -> dict:
+    async with session.post(f"{base}/api/auth/login", json={"username": username, "password": password}) as r:
+        body = await r.json()
+        if r.status != 200 or "token" not in body:
+            raise RuntimeError(f"login as {username} failed ({r.status}): {body}")
+        return body
+
+
+async def drive(args, users: dict, base: str, mock_base: str, server_pid: int) -> dict:
+    from stub_encoder import VOCABULARY
+
+    timeout = aiohttp.ClientTimeout(total=120)
+    connector = aiohttp.TCPConnector(limit=args.concurrency + 4)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        manager = await _login(session, base, users["manager"]["username"], users["manager"]["password"])
+        # bcrypt-bound: log in a handful of trainees and share them between clients
+        usernames = users["trainees"][:max(1, min(args.concurrency, 32))]
+        logins = await asyncio.gather(*[_login(session, base, u, users["password"]) for u in usernames])
+        ctx = {
+            "manager_token": manager["token"],
+            "trainees": [{"token": l["token"], "user_id": l["user"]["id"]} for l in logins],
+            "courses": users["courses"],
+            "bench_courses": [c for c in users["courses"] if c.startswith("course-bench-")],
+            "quiz_courses": users["quiz_courses"],
+            "user_count": len(users["trainees"]),
+            "vocabulary": VOCABULARY,
+        }
+
+        results = {}
+        for name in args.scenarios.split(","):
+            name = name.strip()
+            if name not in STEPS:
+                raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+            _log(f"🏃 {name}: {args.concurrency} clients, {args.warmup:.0f}s warm-up + {args.duration:.0f}s")
+            results[name] = await run_scenario(session, base, name, ctx, args, server_pid)
+            _log(f"   {results[name]['throughput_rps']:.1f} req/s, p50 {results[name]['p50_ms']:.0f}ms, "
+                 f"p99 {results[name]['p99_ms']:.0f}ms, {results[name]['errors']} errors")
+
+        async with session.get(f"{mock_base}/stats") as r:
+            mock_stats = await r.json()
+    return {"scenarios": results, "mocks": mock_stats}
+
+
+# ─── Report ──────────────────────────────────────────────────────────────────
+
+def print_table(results: dict):
+    _log(f"{'scenario':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+         f"{'p99 ms':>8} {'max ms':>8} {'RSS MB':>7}")
+    for name, r in results["scenarios"].items():
+        _log(f"{name:<10} {r['requests']:>9} {r['errors']:>7} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} "
+             f"{r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['rss_mb']:>7.1f}")
+    for name, r in results["scenarios"].items():
+        if "stages" in r:
+            _log(f"\n{name} stages{'':<14} {'p50 ms':>8} {'p99 ms':>8}")
+            for stage, s in r["stages"].items():
+                _log(f"  {stage:<24} {s['p50_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"📊 {before['meta']['commit']} → {after['meta']['commit']}")
+    print(f"{'scenario':<10} {'metric':<15} {'before':>10} {'after':>10} {'change':>9}")
+    for name, b in before["scenarios"].items():
+        a = after["scenarios"].get(name)
+        if a is None:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p99_ms", "errors", "rss_mb"):
+            print(f"{name:<10} {metric:<15} {b[metric]:>10} {a[metric]:>10} {_change(b[metric], a[metric]):>9}")
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    data_dir = os.path.abspath(args.data_dir) if args.data_dir else tempfile.mkdtemp(prefix="bench_e2e_")
+    os.makedirs(data_dir, exist_ok=True)
+    procs = []
+    try:
+        seeded = seed(args, data_dir)
+        with open(os.path.join(data_dir, "users.json")) as f:
+            users = json.load(f)
+
+        mock_port, app_port = _free_port(), _free_port()
+        mock_base, base = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{app_port}"
+        procs.append(_spawn("mock_services.py", [
+            "--port", str(mock_port), "--llm-latency-ms", str(args.llm_latency_ms),
+            "--search-latency-ms", str(args.search_latency_ms), "--llm-error-rate", str(args.llm_error_rate),
+        ], os.path.join(data_dir, "mock_services.log")))
+        server = _spawn("serve_app.py", ["--data-dir", data_dir, "--mock-url", mock_base, "--port", str(app_port)],
+                        os.path.join(data_dir, "serve_app.log"))
+        procs.append(server)
+
+        async def run():
+            async with aiohttp.ClientSession() as session:
+                await _wait_healthy(session, f"{mock_base}/stats", procs[0])
+                await _wait_healthy(session, f"{base}/health", server)
+            _log(f"🚀 App up on {base} (RSS {_rss_mb(server.pid):.0f} MB), mocks on {mock_base}")
+            return await drive(args, users, base, mock_base, server.pid)
+
+        results = asyncio.run(run())
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "params": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+                "seed": seeded,
+            },
+            **results,
+        }
+        print_table(results)
+        output = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output + "\n")
+            _log(f"💾 Results written to {args.output}")
+        else:
+            print(output)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if not args.data_dir and not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        elif not args.data_dir:
+            _log(f"📁 Data kept in {data_dir}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, BENCH_DIR)
+    main()
@@ -0,0 +1,141 @@
+"""
+Login-storm load test — what a burst of logins does to everyone else.
+
+Fires a burst of concurrent logins at a minimal Starlette app while probing
+event-loop lag and the latency of a trivial /ping endpoint:
+- inline: bcrypt.checkpw on the event loop (the previous behaviour)
+- pool:   auth_service.login (bcrypt on the bounded hashing pool; 503 when full)
+
+Run from backend/:
+    python benchmarks/bench_login_storm.py [--logins 48] [--concurrency 24] [--rounds 12]
+
+Uses a throwaway database (seeded demo users), never courses.db.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=24)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    return parser.parse_args()
+
+
+ARGS = _parse_args()
+os.environ["COURSES_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_login_"), "bench.db")
+os.environ["BCRYPT_ROUNDS"] = str(ARGS.rounds)
+
+import httpx  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from services import auth_service  # noqa: E402
+
+
+async def login_inline(request):
+    body = await request.json()
+    conn = auth_service._conn()
+    row = conn.execute("SELECT password_hash FROM users WHERE username=?", (body["username"],)).fetchone()
+    conn.close()
+    ok = auth_service._check_password(body["password"], row["password_hash"])
+    return JSONResponse({"ok": ok}, status_code=200 if ok else 401)
+
+
+async def login_pool(request):
+    body = await request.json()
+    try:
+        result = await auth_service.login(body["username"], body["password"])
+    except auth_service.PasswordHasherBusy as e:
+        return JSONResponse({"detail": str(e)}, status_code=503)
+    return JSONResponse(result, status_code=401 if "error" in result else 200)
+
+
+async def ping(request):
+    return JSONResponse({"status": "ok"})
+
+
+def _pct(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(mode: str) -> dict:
+    login = login_inline if mode == "inline" else login_pool
+    app = Starlette(routes=[Route("/login", login, methods=["POST"]), Route("/ping", ping)])
+    transport = httpx.ASGITransport(app=app)
+
+    lags, pings, login_latencies, statuses = [], [], [], []
+    storming = True
+
+    async def lag_probe():
+        while storming:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t0 - 0.005)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def ping_probe():
+            while storming:
+                t0 = time.perf_counter()
+                await client.get("/ping")
+                pings.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.02)
+
+        remaining = ARGS.logins
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                r = await client.post("/login", json={"username": "test", "password": "test"})
+                login_latencies.append(time.perf_counter() - t0)
+                statuses.append(r.status_code)
+
+        probes = [asyncio.ensure_future(lag_probe()), asyncio.ensure_future(ping_probe())]
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(ARGS.concurrency)])
+        elapsed = time.perf_counter() - start
+        storming = False
+        await asyncio.gather(*probes)
+
+    return {
+        "ok": statuses.count(200),
+        "busy": statuses.count(503),
+        "logins_per_s": statuses.count(200) / elapsed,
+        "login_p50_ms": _pct(login_latencies, 50) * 1000,
+        "login_p99_ms": _pct(login_latencies, 99) * 1000,
+        "lag_max_ms": max(lags, default=0) * 1000,
+        "lag_p99_ms": _pct(lags, 99) * 1000,
+        "ping_p99_ms": _pct(pings, 99) * 1000,
+        "pings": len(pings),
+    }
+
+
+def main():
+    stats = auth_service.get_password_hasher_stats()
+    print(f"🔐 {ARGS.logins} logins, concurrency {ARGS.concurrency}, bcrypt cost {ARGS.rounds}, "
+          f"{stats['workers']} hash workers (max pending {stats['max_pending']})")
+    print(f"{'mode':<7} {'ok':>4} {'503':>4} {'login/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'lag max':>8} {'lag p99':>8} {'pings':>6} {'ping p99':>9}")
+    for mode in ("inline", "pool"):
+        r = asyncio.run(run(mode))
+        print(f"{mode:<7} {r['ok']:>4} {r['busy']:>4} {r['logins_per_s']:>8.1f} {r['login_p50_ms']:>8.0f} "
+              f"{r['login_p99_ms']:>8.0f} {r['lag_max_ms']:>8.1f} {r['lag_p99_ms']:>8.1f} {r['pings']:>6} "
+              f"{r['ping_p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Middleware microbenchmark — req/s through the security middleware.
+
+Compares, on a minimal Starlette app (no network, httpx ASGITransport, every
+request carrying a Bearer token that the endpoint also needs):
+- none:   the bare app
+- legacy: the previous three BaseHTTPMiddleware classes (security headers,
+          rate limit, audit logging with a synchronous insert per request)
+- fused:  SecurityMiddleware (single pure-ASGI pass, batched audit writer)
+
+Run from backend/:
+    python benchmarks/bench_middleware.py [--requests 3000] [--concurrency 32] [--no-audit]
+
+--no-audit stubs out the SQLite insert so only middleware overhead is measured.
+Audit rows go to a throwaway database, never courses.db.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["COURSES_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_mw_"), "bench.db")
+
+import httpx  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+import jwt  # noqa: E402
+from services import security, auth_service  # noqa: E402
+
+
+# ─── Legacy stack (BaseHTTPMiddleware, as before the fused middleware) ───────
+
+def legacy_audit_user(authorization: str) -> tuple:
+    """The old in-middleware JWT decode (a second one happened in the endpoint)."""
+    if authorization.startswith("Bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], auth_service.JWT_SECRET, algorithms=["HS256"])
+            return payload.get("sub", ""), payload.get("username", ""), payload.get("role", "")
+        except Exception:
+            pass
+    return "", "", ""
+
+
+def legacy_write_request_log(method, path, status, user, ip, ua, duration_ms):
+    """The old per-request audit write: connect, insert, commit, close."""
+    conn = security._conn()
+    conn.execute(
+        security._INSERT_REQUEST_LOG,
+        (method, path, status, *user, ip, ua, round(duration_ms, 2),
+         datetime.now(timezone.utc).isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+audit_write = legacy_write_request_log
+
+
+class LegacyAuditLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start = time.time()
+        path = request.url.path
+        if not security.AUDIT_PATHS.match(path):
+            return await call_next(request)
+        user = legacy_audit_user(request.headers.get("Authorization", ""))
+        response = await call_next(request)
+        audit_write(
+            request.method, path, response.status_code, user,
+            request.client.host if request.client else "",
+            request.headers.get("User-Agent", "")[:200],
+            (time.time() - start) * 1000,
+        )
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if security.RATE_EXEMPT.match(path):
+            return await call_next(request)
+        ip = request.client.host if request.client else "unknown"
+        error = security._rate_limiter.check(ip, path)
+        if error:
+            return JSONResponse(status_code=429, content={"detail": error})
+        return await call_next(request)
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        for name, value in security.SECURITY_HEADERS.items():
+            response.headers[name] = value
+        if request.url.path.startswith("/api/") and "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+            response.headers["Pragma"] = "no-cache"
+        return response
+
+
+# ─── Test app ────────────────────────────────────────────────────────────────
+
+def endpoint_user(request):
+    """What an endpoint's auth dependency does: reuse the middleware's context, or decode again."""
+    state = request.scope.get("state", {})
+    if "auth" in state:
+        return state["auth"]
+    return legacy_audit_user(request.headers.get("Authorization", ""))
+
+
+async def ping(request):
+    endpoint_user(request)
+    return JSONResponse({"status": "ok"})
+
+
+async def stream(request):
+    endpoint_user(request)
+    async def chunks():
+        for i in range(10):
+            yield f"row {i}\n".encode()
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+def build_app(stack: str) -> Starlette:
+    app = Starlette(routes=[Route("/api/ping", ping), Route("/api/stream", stream)])
+    if stack == "legacy":
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware)
+        app.add_middleware(LegacyAuditLoggingMiddleware)
+    elif stack == "fused":
+        app.add_middleware(security.SecurityMiddleware)
+    return app
+
+
+async def run(stack: str, path: str, total: int, concurrency: int) -> dict:
+    app = build_app(stack)
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    token = auth_service.create_token("bench-user", "bench", "trainee")
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for _ in range(50):  # warm-up
+            await client.get(path)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                t0 = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - t0)
+                assert r.status_code == 200, r.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "req_per_s": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--no-audit", action="store_true", help="skip the SQLite audit insert")
+    args = parser.parse_args()
+
+    # The benchmark client is a single IP; keep it under the limits
+    security.GENERAL_MAX_REQUESTS = 10 ** 9
+    global audit_write
+    if args.no_audit:
+        audit_write = lambda *a, **kw: None
+        security.audit_writer.enqueue = lambda record: None
+
+    print(f"📊 {args.requests} requests, concurrency {args.concurrency}, "
+          f"audit {'off' if args.no_audit else 'on'}")
+    print(f"{'endpoint':<12} {'stack':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for path in ("/api/ping", "/api/stream"):
+        for stack in ("none", "legacy", "fused"):
+            result = asyncio.run(run(stack, path, args.requests, args.concurrency))
+            print(f"{path:<12} {stack:<8} {result['req_per_s']:>9.0f} "
+                  f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+    if not args.no_audit:
+        security.audit_writer.close()
+        stats = security.audit_writer.stats()
+        print(f"audit writer: {stats['written']} rows in {stats['batches']} batches, "
+              f"{stats['dropped']} dropped")
+
+
+if __name__ == "__main__":
+    main()
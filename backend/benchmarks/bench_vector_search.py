@@ -0,0 +1,354 @@
+"""
+Vector search at scale — where VectorStore.similarity_search falls over.
+
+For each --sizes N, fills a temporary vector_store.db with N random
+normalized 384-dim vectors through VectorStore.store_document_chunks (ingest
+rate), then compares query modes on the same data:
+- sqlite:   VectorStore._sync_similarity_search, the shipped path (fetch every
+            row, one np.dot per row, sort)
+- matrix:   all embeddings in one float32 matrix, one matrix-vector product
+            + argpartition
+- float16:  same, stored as float16 (half the memory)
+- int8:     same, per-vector scaled int8 (a quarter of the memory)
+- ivf-P:    k-means inverted lists (~4·√N centroids), scanning the P closest
+            lists (--nprobe)
+
+Per mode: build time (load from a cold page cache), cold first query, warm
+p50/p95, recall@k against an exact float32 top-k, resident index size and the
+peak allocation of one query (tracemalloc).  Queries are noisy copies of
+stored vectors, so every query has real near neighbours.  Uniform random
+vectors have no cluster structure, the worst case for IVF recall; real
+embeddings cluster by topic and do better.
+
+Offline: vectors are generated, never encoded — no sentence-transformer
+download.  "Cold" evicts the database file from the OS page cache with
+posix_fadvise (Linux; best effort elsewhere).
+
+Run from backend/:
+    python benchmarks/bench_vector_search.py [--sizes 10000,100000] [--top-k 5] [--queries 50]
+                                             [--sqlite-queries 5] [--nprobe 8,32] [--text-chars 500]
+
+Sizes up to 1000000 work but need several GB of RAM (the sqlite mode
+materialises every row) and disk (~2 KB per chunk at the default text size).
+"""
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated vector counts")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50, help="warm queries per in-memory mode")
+    parser.add_argument("--sqlite-queries", type=int, default=5, help="warm queries for the sqlite mode")
+    parser.add_argument("--nprobe", default="8,32", help="comma-separated IVF lists scanned per query")
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--text-chars", type=int, default=500, help="chunk text length (the sqlite mode fetches it)")
+    parser.add_argument("--query-noise", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the temporary databases")
+    return parser.parse_args()
+
+
+ARGS = _parse_args()
+# Vectors are supplied directly; never reach for the shared embedding service
+os.environ["EMBEDDING_SERVICE_ADDRESS"] = ""
+
+import numpy as np  # noqa: E402
+
+from services.vector_store import VectorStore  # noqa: E402
+from stub_encoder import EMBEDDING_DIM, synthetic_text  # noqa: E402
+
+BLOCK_ROWS = 65536
+
+
+def _pct(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def _evict(path: str):
+    """Drop the database file from the OS page cache (best effort)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# ─── Ingest ──────────────────────────────────────────────────────────────────
+
+class VectorFeed:
+    """Stands in for the sentence transformer: hands out pre-drawn random vectors, timing itself."""
+
+    def __init__(self, rng: np.random.Generator, dim: int):
+        self.rng = rng
+        self.dim = dim
+        self.seconds = 0.0
+
+    def encode(self, texts, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        start = time.perf_counter()
+        vectors = _normalize(self.rng.standard_normal((len(texts), self.dim), dtype=np.float32))
+        self.seconds += time.perf_counter() - start
+        return vectors
+
+
+def ingest(store: VectorStore, n: int, rng: np.random.Generator) -> dict:
+    feed = VectorFeed(rng, store.embedding_dimension)
+    store.embedding_model = feed
+    filler = synthetic_text(rng, ARGS.text_chars // 4 + 1)[:ARGS.text_chars]
+
+    async def run():
+        stored = 0
+        while stored < n:
+            count = min(ARGS.chunks_per_doc, n - stored)
+            chunks = [{"id": str(uuid.uuid4()), "text": f"{stored + i} {filler}", "metadata": {"page": i}}
+                      for i in range(count)]
+            await store.store_document_chunks(chunks, f"bench-{stored // ARGS.chunks_per_doc:06d}.pdf", "Bench")
+            stored += count
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    seconds = time.perf_counter() - start - feed.seconds
+    return {"chunks_per_s": n / seconds, "db_mb": os.path.getsize(store.db_path) / 2 ** 20}
+
+
+def load_matrix(db_path: str):
+    """Chunk ids and the float32 embedding matrix, in rowid order."""
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT id, embedding FROM chunks ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+    ids = [r[0] for r in rows]
+    matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+    return ids, matrix
+
+
+# ─── Modes ───────────────────────────────────────────────────────────────────
+
+class SqliteMode:
+    """The shipped path, untouched."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str, ids: list):
+        self.db_path = db_path
+        self.position = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.store = None
+        self.nbytes = 0
+
+    def build(self):
+        self.store = VectorStore(db_path=self.db_path)
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        results = self.store._sync_similarity_search(query, k)
+        return np.array([self.position[r["chunk_id"]] for r in results])
+
+
+class MatrixMode:
+    """Every embedding in one matrix, scored blockwise (float16 / int8 are widened per block)."""
+
+    def __init__(self, db_path: str, dtype: str):
+        self.db_path = db_path
+        self.dtype = dtype
+        self.name = "matrix" if dtype == "float32" else dtype
+        self.matrix = None
+        self.scales = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def build(self):
+        _, matrix = load_matrix(self.db_path)
+        if self.dtype == "int8":
+            self.scales = (np.abs(matrix).max(axis=1) / 127).astype(np.float32)
+            self.matrix = np.round(matrix / self.scales[:, None]).astype(np.int8)
+        else:
+            self.matrix = matrix.astype(self.dtype, copy=False)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        if self.dtype == "float32":
+            return self.matrix @ query
+        out = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self.matrix[start:start + BLOCK_ROWS].astype(np.float32) @ query
+        if self.scales is not None:
+            out *= self.scales
+        return out
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        return _top_k(self.scores(query), k)
+
+
+class IvfMode:
+    """Spherical k-means lists; vectors stored grouped by list so each probe is one contiguous slice."""
+
+    def __init__(self, db_path: str, nprobe: int, seed: int):
+        self.db_path = db_path
+        self.nprobe = nprobe
+        self.seed = seed
+        self.name = f"ivf-{nprobe}"
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.order.nbytes + self.centroids.nbytes + self.offsets.nbytes
+
+    def build(self):
+        _, matrix = load_matrix(self.db_path)
+        rng = np.random.default_rng(self.seed)
+        nlist = max(1, min(len(matrix) // 40, int(4 * np.sqrt(len(matrix)))))
+        sample = matrix[rng.choice(len(matrix), min(len(matrix), nlist * 40), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(10):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        assign = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            assign[start:start + BLOCK_ROWS] = np.argmax(matrix[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+        self.order = np.argsort(assign, kind="stable")
+        self.matrix = matrix[self.order]
+        self.offsets = np.searchsorted(assign[self.order], np.arange(nlist + 1))
+        self.centroids = centroids
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        probes = _top_k(self.centroids @ query, self.nprobe)
+        rows = np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1]) for p in probes])
+        if not len(rows):
+            return rows
+        best = _top_k(self.matrix[rows] @ query, k)
+        return self.order[rows[best]]
+
+
+# ─── Measure ─────────────────────────────────────────────────────────────────
+
+def measure(mode, db_path: str, queries: np.ndarray, truth: list, warm_queries: int) -> dict:
+    k = ARGS.top_k
+    _evict(db_path)
+    start = time.perf_counter()
+    mode.build()
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mode.search(queries[0], k)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    latencies, hits = [], 0
+    for i in range(warm_queries):
+        start = time.perf_counter()
+        found = mode.search(queries[i], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found.tolist()) & truth[i])
+
+    tracemalloc.start()
+    mode.search(queries[0], k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": mode.name,
+        "build_s": build_s,
+        "cold_ms": cold_ms,
+        "p50_ms": _pct(latencies, 50) * 1000,
+        "p95_ms": _pct(latencies, 95) * 1000,
+        "recall": hits / (warm_queries * k),
+        "index_mb": mode.nbytes / 2 ** 20,
+        "query_peak_mb": peak / 2 ** 20,
+    }
+
+
+def run_size(n: int) -> list:
+    rng = np.random.default_rng(ARGS.seed)
+    work_dir = tempfile.mkdtemp(prefix=f"bench_vectors_{n}_")
+    db_path = os.path.join(work_dir, "vector_store.db")
+    try:
+        store = VectorStore(db_path=db_path)
+        print(f"📥 {n:,} vectors → {db_path}", flush=True)
+        ingested = ingest(store, n, rng)
+        print(f"   ingest {ingested['chunks_per_s']:,.0f} chunks/s, {ingested['db_mb']:,.0f} MB on disk", flush=True)
+
+        ids, matrix = load_matrix(db_path)
+        count = max(ARGS.queries, ARGS.sqlite_queries)
+        picks = rng.choice(n, count, replace=n < count)
+        noise = rng.standard_normal((len(picks), EMBEDDING_DIM), dtype=np.float32)
+        # float32 like the encoder's output (a float64 query would upcast the whole matrix)
+        queries = _normalize(matrix[picks] + np.float32(ARGS.query_noise / np.sqrt(EMBEDDING_DIM)) * noise)
+        truth = [set(_top_k(matrix @ q, ARGS.top_k).tolist()) for q in queries]
+        del matrix
+
+        modes = [(SqliteMode(db_path, ids), ARGS.sqlite_queries),
+                 (MatrixMode(db_path, "float32"), ARGS.queries),
+                 (MatrixMode(db_path, "float16"), ARGS.queries),
+                 (MatrixMode(db_path, "int8"), ARGS.queries)]
+        modes += [(IvfMode(db_path, int(p), ARGS.seed), ARGS.queries) for p in ARGS.nprobe.split(",")]
+
+        rows = []
+        while modes:
+            mode, warm_queries = modes.pop(0)  # drop each index before building the next
+            row = measure(mode, db_path, queries, truth, warm_queries)
+            row.update(n=n, **ingested)
+            rows.append(row)
+            print(f"   {row['mode']:<8} p50 {row['p50_ms']:.1f}ms, recall@{ARGS.top_k} {row['recall']:.3f}", flush=True)
+            del mode
+        return rows
+    finally:
+        if ARGS.keep:
+            print(f"📁 Kept {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    sizes = [int(s) for s in ARGS.sizes.split(",")]
+    print(f"🔎 {EMBEDDING_DIM}-dim vectors, top-{ARGS.top_k}, {ARGS.queries} warm queries "
+          f"({ARGS.sqlite_queries} for sqlite), {os.cpu_count()} CPUs")
+    rows = [row for n in sizes for row in run_size(n)]
+
+    print(f"\n{'N':>9} {'mode':<8} {'build s':>8} {'cold ms':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{f'recall@{ARGS.top_k}':>9} {'index MB':>9} {'query MB':>9} {'ingest/s':>9}")
+    for r in rows:
+        print(f"{r['n']:>9,} {r['mode']:<8} {r['build_s']:>8.2f} {r['cold_ms']:>9.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['recall']:>9.3f} {r['index_mb']:>9.1f} {r['query_peak_mb']:>9.1f} "
+              f"{r['chunks_per_s']:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
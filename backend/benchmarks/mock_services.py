@@ -0,0 +1,162 @@
+"""
+Local stand-ins for the external services the app calls, with configurable latency.
+
+- Groq (OpenAI-compatible):  GET  /openai/v1/models
+                             POST /openai/v1/chat/completions
+  Quiz-generation prompts get a valid 10-question JSON array, everything
+  else a canned educational answer.  --llm-error-rate returns 503s so the
+  limiter's retry path is exercised too.
+- DuckDuckGo Instant Answer: GET  /ddg/
+- Result pages:              GET  /page/{n}
+- Request counters:          GET  /stats
+
+Point the app at it with GROQ_BASE_URL=http://HOST:PORT and
+DDG_API_URL=http://HOST:PORT/ddg/ (benchmarks/serve_app.py does this).
+
+Run from backend/:
+    python benchmarks/mock_services.py [--port 8799] [--llm-latency-ms 400] [--llm-jitter-ms 100]
+                                       [--search-latency-ms 150] [--llm-error-rate 0]
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--search-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of completions answered with 503")
+    return parser.parse_args(argv)
+
+
+MODELS = ("llama-3.1-8b-instant", "llama-3.3-70b-versatile")
+
+
+def _quiz_questions() -> list:
+    questions = []
+    for i in range(10):
+        if i >= 8:
+            options = ["True", "False"]
+        else:
+            options = [f"Option {c} for scenario {i + 1}: a plausible, professionally worded course of action"
+                       for c in "ABCD"]
+        questions.append({
+            "question_text": f"Scenario {i + 1}: a colleague asks how the policy applies to a real situation. What should you do?",
+            "question_type": "true_false" if i >= 8 else "mcq",
+            "options": options,
+            "correct_answer": options[i % len(options)],
+            "explanation": "Synthetic explanation generated by the benchmark mock.",
+        })
+    return questions
+
+
+class MockServices:
+    def __init__(self, args):
+        self.args = args
+        self.counts = {"completions": 0, "quiz_completions": 0, "errors_injected": 0,
+                       "models": 0, "searches": 0, "pages": 0}
+
+    async def _sleep(self, mean_ms: float, jitter_ms: float = 0.0):
+        delay = max(0.0, mean_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def models(self, request):
+        self.counts["models"] += 1
+        return web.json_response({
+            "object": "list",
+            "data": [{"id": m, "object": "model", "created": 0, "owned_by": "bench", "active": True}
+                     for m in MODELS],
+        })
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        await self._sleep(self.args.llm_latency_ms, self.args.llm_jitter_ms)
+        if random.random() < self.args.llm_error_rate:
+            self.counts["errors_injected"] += 1
+            return web.json_response({"error": {"message": "mock overload"}}, status=503)
+
+        messages = body.get("messages", [])
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        is_quiz = any("quiz generator" in str(m.get("content", "")) for m in messages)
+        if is_quiz:
+            self.counts["quiz_completions"] += 1
+            content = json.dumps(_quiz_questions())
+        else:
+            question = str(messages[-1].get("content", ""))[:120] if messages else ""
+            content = (f"Here is an explanation of your question ({question}). "
+                       "The key idea is to follow the documented procedure, escalate when unsure "
+                       "and keep records of what was decided and why.")
+        self.counts["completions"] += 1
+        prompt_tokens = prompt_chars // 4
+        completion_tokens = len(content) // 4
+        return web.json_response({
+            "id": f"chatcmpl-bench-{self.counts['completions']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", MODELS[0]),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    async def ddg(self, request):
+        self.counts["searches"] += 1
+        await self._sleep(self.args.search_latency_ms)
+        query = request.query.get("q", "")
+        base = f"http://{request.host}"
+        return web.json_response({
+            "Heading": query[:60],
+            "Abstract": f"Overview of {query[:80]} for training purposes.",
+            "AbstractURL": f"{base}/page/0",
+            "RelatedTopics": [
+                {"Text": f"Related topic {i} about {query[:40]}", "FirstURL": f"{base}/page/{i}"}
+                for i in range(1, 4)
+            ],
+        })
+
+    async def page(self, request):
+        self.counts["pages"] += 1
+        await self._sleep(self.args.search_latency_ms)
+        n = request.match_info["n"]
+        text = " ".join(f"Paragraph {i} of page {n} with explanatory content." for i in range(30))
+        return web.Response(text=f"<html><body><h1>Page {n}</h1><p>{text}</p></body></html>",
+                            content_type="text/html")
+
+    async def stats(self, request):
+        return web.json_response(self.counts)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/openai/v1/models", self.models)
+        app.router.add_post("/openai/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/ddg/", self.ddg)
+        app.router.add_get("/page/{n}", self.page)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    print(f"🧪 Mock Groq / web search on http://{args.host}:{args.port} "
+          f"(LLM {args.llm_latency_ms:.0f}±{args.llm_jitter_ms:.0f}ms, search {args.search_latency_ms:.0f}ms)",
+          flush=True)
+    web.run_app(MockServices(args).app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
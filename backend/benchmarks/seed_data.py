@@ -0,0 +1,219 @@
+"""
+Synthetic data for the end-to-end benchmark.
+
+Creates, in --data-dir:
+- courses.db       the app's database: built-in courses plus --courses synthetic
+                   ones (5 modules each), --users trainees across departments,
+                   enrollments and module progress, quizzes for half the courses
+                   (the rest are generated through the mock LLM during the run)
+                   and --attempts quiz attempts; reporting rollups rebuilt
+- vector_store.db  --chunks chunks over --documents documents, embedded with
+                   the stub encoder (same vectors serve_app.py uses for queries)
+- users.json       credentials for the load driver
+
+Run from backend/:
+    python benchmarks/seed_data.py --data-dir /tmp/bench [--users 500] [--courses 40]
+                                   [--attempts 20000] [--chunks 5000] [--documents 50]
+
+Never touches backend/courses.db.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+BENCH_PASSWORD = "bench-password"
+DEPARTMENTS = ("Engineering", "Operations", "Sales", "Finance", "HR", "Support", "Legal", "IT")
+CATEGORIES = ("Compliance", "Security", "Leadership", "Technical", "Soft Skills")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", required=True)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--enrollments-per-user", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+ARGS = _parse_args()
+os.makedirs(ARGS.data_dir, exist_ok=True)
+os.environ["COURSES_DB_PATH"] = os.path.join(ARGS.data_dir, "courses.db")
+
+import numpy as np  # noqa: E402
+
+from services import auth_service, course_manager, quiz_manager, reporting_rollups  # noqa: E402
+from stub_encoder import StubEncoder, synthetic_text  # noqa: E402
+
+
+def seed_courses(conn, rng: random.Random, count: int) -> list:
+    now = datetime.now().isoformat()
+    modules = []
+    for i in range(count):
+        course_id = f"course-bench-{i:04d}"
+        category = CATEGORIES[i % len(CATEGORIES)]
+        conn.execute("""
+            INSERT INTO courses (id, title, description, category, duration_hours, difficulty, is_mandatory,
+                                 created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (course_id, f"Benchmark Course {i}", f"Synthetic {category.lower()} course {i}", category,
+              rng.randint(1, 8), rng.choice(("Beginner", "Intermediate", "Advanced")),
+              1 if i % 8 == 0 else 0, now, now))
+        for m in range(5):
+            paragraphs = "".join(f"<p>Section {p}: {synthetic_text(np.random.default_rng(i * 10 + m), 80)}</p>"
+                                 for p in range(12))
+            modules.append((f"mod-bench-{i:04d}-{m}", course_id, f"Module {m + 1}", "Synthetic module",
+                            m, 30, paragraphs))
+    conn.executemany("""
+        INSERT INTO modules (id, course_id, title, description, order_index, duration_minutes, content)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, modules)
+    course_manager.precompress_module_content(conn)
+    return [r[0] for r in conn.execute("SELECT id FROM courses ORDER BY id")]
+
+
+def seed_users(conn, count: int) -> list:
+    password_hash = auth_service._hash_password(BENCH_PASSWORD)  # one hash, shared by every bench user
+    now = datetime.now(timezone.utc).isoformat()
+    users = [
+        (f"bench-user-{i:05d}", f"bench{i:05d}", f"bench{i:05d}@bench.invalid", password_hash,
+         f"Bench User {i}", "trainee", DEPARTMENTS[i % len(DEPARTMENTS)], now, now)
+        for i in range(count)
+    ]
+    conn.executemany("""
+        INSERT INTO users (id, username, email, password_hash, name, role, department, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, users)
+    return [u[0] for u in users]
+
+
+def seed_enrollments(conn, rng: random.Random, user_ids: list, course_ids: list, per_user: int):
+    now = datetime.now(timezone.utc)
+    enrollments, progress = [], []
+    modules_by_course = {}
+    for row in conn.execute("SELECT id, course_id FROM modules ORDER BY order_index"):
+        modules_by_course.setdefault(row[1], []).append(row[0])
+    for user_id in user_ids:
+        for course_id in rng.sample(course_ids, min(per_user, len(course_ids))):
+            enrolled_at = (now - timedelta(days=rng.randint(1, 365))).isoformat()
+            done = rng.random()
+            status = "completed" if done > 0.6 else "in_progress" if done > 0.2 else "enrolled"
+            pct = 100.0 if status == "completed" else round(done * 100, 1) if status == "in_progress" else 0.0
+            enrollments.append((str(uuid.uuid4()), user_id, course_id, status, enrolled_at,
+                                enrolled_at if status == "completed" else None, pct))
+            modules = modules_by_course.get(course_id, [])
+            for module_id in modules[:round(len(modules) * pct / 100)]:
+                progress.append((str(uuid.uuid4()), user_id, module_id, course_id, "completed",
+                                 enrolled_at, enrolled_at, None))
+    conn.executemany("""
+        INSERT INTO enrollments (id, user_id, course_id, status, enrolled_at, completed_at, progress)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, enrollments)
+    conn.executemany("""
+        INSERT INTO module_progress (id, user_id, module_id, course_id, status, started_at, completed_at, score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, progress)
+    return len(enrollments)
+
+
+def seed_quizzes(course_ids: list) -> dict:
+    """Quizzes for every other course: {course_id: quiz_id}."""
+    quizzes = {}
+    for course_id in course_ids[::2]:
+        course = course_manager.get_course(course_id)
+        questions = quiz_manager.get_fallback_questions(course["title"], course["category"])
+        quizzes[course_id] = quiz_manager.create_quiz_from_questions(course_id, course["title"], questions)["quiz_id"]
+    return quizzes
+
+
+def seed_attempts(conn, rng: random.Random, user_ids: list, quizzes: dict, count: int):
+    now = datetime.now(timezone.utc)
+    course_ids = list(quizzes)
+    rows = []
+    for _ in range(count):
+        course_id = rng.choice(course_ids)
+        score = round(min(100.0, max(0.0, rng.gauss(72, 15))), 1)
+        completed = now - timedelta(days=rng.uniform(0, 180))
+        rows.append((str(uuid.uuid4()), rng.choice(user_ids), quizzes[course_id], course_id, "{}",
+                     score / 10, 10, score, 1 if score >= 70 else 0,
+                     (completed - timedelta(minutes=20)).isoformat(), completed.isoformat(), 1200))
+    conn.executemany("""
+        INSERT INTO quiz_attempts (id, user_id, quiz_id, course_id, answers, score, total_points, percentage,
+                                   passed, started_at, completed_at, time_spent_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def seed_vector_store(path: str, chunks: int, documents: int, seed: int) -> int:
+    from services.vector_store import VectorStore
+
+    store = VectorStore(db_path=path)
+    encoder = StubEncoder(store.embedding_dimension)
+    rng = np.random.default_rng(seed)
+    per_document = max(1, chunks // max(1, documents))
+    stored = 0
+    for d in range(documents):
+        n = per_document if d < documents - 1 else max(1, chunks - stored)
+        texts = [synthetic_text(rng, 60) for _ in range(n)]
+        doc_chunks = [{"id": str(uuid.uuid4()), "text": t, "metadata": {"page": i}} for i, t in enumerate(texts)]
+        store._sync_store_chunks(str(uuid.uuid4()), f"bench-doc-{d:04d}.pdf", CATEGORIES[d % len(CATEGORIES)],
+                                 doc_chunks, encoder.encode(texts))
+        stored += n
+    return stored
+
+
+def main():
+    start = time.perf_counter()
+    rng = random.Random(ARGS.seed)
+    conn = course_manager.get_db()
+    course_ids = seed_courses(conn, rng, ARGS.courses)
+    user_ids = seed_users(conn, ARGS.users)
+    enrollments = seed_enrollments(conn, rng, user_ids, course_ids, ARGS.enrollments_per_user)
+    conn.commit()
+
+    quizzes = seed_quizzes(course_ids)
+    seed_attempts(conn, rng, user_ids, quizzes, ARGS.attempts)
+    conn.commit()
+    conn.close()
+    reporting_rollups.rebuild_rollups()
+
+    chunks = seed_vector_store(os.path.join(ARGS.data_dir, "vector_store.db"), ARGS.chunks, ARGS.documents, ARGS.seed)
+
+    with open(os.path.join(ARGS.data_dir, "users.json"), "w") as f:
+        json.dump({
+            "password": BENCH_PASSWORD,
+            "trainees": [f"bench{i:05d}" for i in range(ARGS.users)],
+            "trainee_ids": user_ids,
+            "manager": {"username": "manager", "password": "manager123"},
+            "admin": {"username": "admin", "password": "admin123"},
+            "courses": course_ids,
+            "quiz_courses": list(quizzes),
+        }, f)
+
+    print(json.dumps({
+        "data_dir": ARGS.data_dir,
+        "courses": len(course_ids),
+        "users": len(user_ids),
+        "enrollments": enrollments,
+        "quizzes": len(quizzes),
+        "attempts": ARGS.attempts,
+        "chunks": chunks,
+        "seconds": round(time.perf_counter() - start, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Boot backend/app.py for benchmarking against a seeded data directory.
+
+- COURSES_DB_PATH / vector_store.db from --data-dir (see seed_data.py)
+- Groq and DuckDuckGo pointed at --mock-url (see mock_services.py); the
+  OpenAI fallback and the shared embedding service are disabled
+- Queries embedded with the stub encoder (no model download) unless --real-encoder
+- Per-IP rate limits lifted: the load driver is a single client IP
+- GROQ_REQUESTS_PER_MINUTE defaults to an unthrottled value here; export it
+  to benchmark with the production pacing
+
+Run from backend/:
+    python benchmarks/serve_app.py --data-dir /tmp/bench --mock-url http://127.0.0.1:8799 [--port 8765]
+
+Requires the full backend requirements (requirements.txt).
+"""
+
+import os
+import sys
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", required=True)
+    parser.add_argument("--mock-url", required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--real-encoder", action="store_true", help="load the sentence-transformer model")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    data_dir = os.path.abspath(args.data_dir)
+    mock_url = args.mock_url.rstrip("/")
+
+    os.environ["COURSES_DB_PATH"] = os.path.join(data_dir, "courses.db")
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ["GROQ_BASE_URL"] = mock_url
+    os.environ["DDG_API_URL"] = f"{mock_url}/ddg/"
+    # Set (empty) so backend/.env can't switch them on
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ["EMBEDDING_SERVICE_ADDRESS"] = ""
+    os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "1000000")
+
+    # VectorStore() opens vector_store.db relative to the working directory
+    os.chdir(data_dir)
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    import uvicorn
+    import app as backend_app
+    from services import security
+    from stub_encoder import StubEncoder
+
+    if not args.real_encoder:
+        backend_app.vector_store.embedding_model = StubEncoder(backend_app.vector_store.embedding_dimension)
+
+    security.GENERAL_MAX_REQUESTS = 10 ** 9
+    security.LOGIN_MAX_ATTEMPTS = 10 ** 9
+    security.REGISTER_MAX_ATTEMPTS = 10 ** 9
+
+    print(f"🚀 Benchmark server on http://{args.host}:{args.port} (data {data_dir}, mocks {mock_url})", flush=True)
+    uvicorn.run(backend_app.app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
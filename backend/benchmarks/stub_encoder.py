@@ -0,0 +1,63 @@
+"""
+Stub sentence encoder for benchmarks — no model download, no GPU.
+
+Feature hashing: every token maps to a fixed pseudo-random unit vector
+(seeded by a hash of the token) and a text is the normalized sum of its
+tokens.  Texts that share words get a high cosine similarity, so retrieval
+behaves plausibly, and the output matches what VectorStore stores
+(float32, EMBEDDING_DIM wide).  Drop-in for SentenceTransformer.encode.
+"""
+
+import re
+import hashlib
+from typing import Dict, List
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Word list for synthetic chunks and chat queries
+VOCABULARY = (
+    "compliance policy privacy security password phishing incident report data retention "
+    "access control encryption audit training manager employee customer vendor contract "
+    "risk assessment safety workplace ethics conflict interest gift disclosure harassment "
+    "diversity inclusion onboarding leadership feedback performance review goal project "
+    "deadline budget forecast revenue expense invoice payment approval workflow process "
+    "quality standard procedure checklist document record archive backup recovery network "
+    "firewall device laptop mobile email attachment link download software update patch "
+    "vulnerability threat malware ransomware social engineering badge visitor office remote "
+    "meeting presentation communication negotiation coaching mentoring skill certificate "
+    "regulation law fine penalty investigation whistleblower hotline escalation approval"
+).split()
+
+
+class StubEncoder:
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            self._token_vectors[token] = vector
+        return vector
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                out[i] += self._token_vector(token)
+            norm = np.linalg.norm(out[i])
+            if norm:
+                out[i] /= norm
+        return out
+
+
+def synthetic_text(rng: np.random.Generator, words: int) -> str:
+    """A sentence-ish run of vocabulary words (chunk text or a chat question)."""
+    return " ".join(VOCABULARY[i] for i in rng.integers(0, len(VOCABULARY), words)).capitalize() + "."
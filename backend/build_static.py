@@ -0,0 +1,117 @@
+"""
+Build fingerprinted, precompressed static assets for production serving.
+Run after changing anything in static/:  python3 backend/build_static.py
+
+Writes static/dist/:
+- JS/CSS copied to content-hashed names (admin.js → admin.3f2a9c1d.js)
+- HTML pages with their <script src> / <link href> rewritten to the hashed names
+- every other file (JSON data, images) copied as-is
+- .gz (and .br when the brotli package is installed) siblings for text assets
+- manifest.json mapping original names to hashed names
+
+app.py serves static/dist through StaticAssetsMiddleware when it exists.
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+
+sys.path.insert(0, os.path.dirname(__file__))
+from services.compression import compress_variants  # noqa: E402
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+
+HASHED_EXTENSIONS = {".js", ".css"}
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".css", ".json", ".svg", ".txt"}
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+# Tooling files that are not part of the site
+SKIP_FILES = {"package.json", "package-lock.json", "vite.config.js", "README.md"}
+
+# src="auth-helper.js?v=2" / href='style.css'
+ASSET_REF = re.compile(r"""(?P<attr>\b(?:src|href))=(?P<q>["'])(?P<path>[^"'?#:]+)(?:\?[^"']*)?(?P=q)""")
+
+
+def _hashed_name(rel_path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def _write(rel_path: str, data: bytes):
+    out_path = os.path.join(DIST_DIR, rel_path)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(data)
+    if os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        for encoding, blob in compress_variants(data).items():
+            with open(out_path + ENCODING_SUFFIXES[encoding], "wb") as f:
+                f.write(blob)
+
+
+def _source_files():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR and not d.startswith(".")]
+        for name in files:
+            if name in SKIP_FILES or name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, STATIC_DIR).replace(os.sep, "/"), path
+
+
+def _rewrite_html(html: str, page_dir: str, manifest: dict) -> str:
+    def replace(match):
+        ref = os.path.normpath(os.path.join(page_dir, match.group("path"))).replace(os.sep, "/")
+        hashed = manifest.get(ref)
+        if not hashed:
+            return match.group(0)
+        new_ref = os.path.relpath(hashed, page_dir or ".").replace(os.sep, "/")
+        return f'{match.group("attr")}={match.group("q")}{new_ref}{match.group("q")}'
+    return ASSET_REF.sub(replace, html)
+
+
+def build() -> dict:
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    html_pages = []
+    raw_bytes = 0
+
+    for rel_path, path in _source_files():
+        with open(path, "rb") as f:
+            data = f.read()
+        raw_bytes += len(data)
+        ext = os.path.splitext(rel_path)[1].lower()
+        if ext in HASHED_EXTENSIONS:
+            manifest[rel_path] = _hashed_name(rel_path, data)
+            _write(manifest[rel_path], data)
+        elif ext == ".html":
+            html_pages.append((rel_path, data))  # written once every asset has its hash
+        else:
+            _write(rel_path, data)
+
+    for rel_path, data in html_pages:
+        page_dir = os.path.dirname(rel_path)
+        _write(rel_path, _rewrite_html(data.decode("utf-8"), page_dir, manifest).encode("utf-8"))
+
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return {"hashed": len(manifest), "pages": len(html_pages), "source_bytes": raw_bytes}
+
+
+def main():
+    print(f"📦 Building static assets: {STATIC_DIR} → {DIST_DIR}")
+    result = build()
+    print(f"✅ {result['hashed']} fingerprinted assets, {result['pages']} HTML pages "
+          f"({result['source_bytes'] / 1024:.0f} KB source)")
+
+
+if __name__ == "__main__":
+    main()
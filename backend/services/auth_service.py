@@ -6,33 +6,110 @@ Authentication & Authorization Service
 """
 
 import os
+import time
+import asyncio
 import sqlite3
+import hashlib
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict
 
 import jwt
 import bcrypt as _bcrypt
 
+from services import twofa_service
+from services import reporting_rollups
+from services import metrics
 
-def _hash_password(password: str) -> str:
-    return _bcrypt.hashpw(password.encode("utf-8"), _bcrypt.gensalt()).decode("utf-8")
-
-
-def _check_password(password: str, hashed: str) -> bool:
-    return _bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
 
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "courses.db")
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "courses.db"))
 JWT_SECRET = os.getenv("JWT_SECRET", "edu-assist-pro-secret-change-in-prod-2026")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_HOURS = 24
 
+# Verified tokens kept in memory (LRU) so each request doesn't re-check the signature
+TOKEN_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+
+# Password hashing: bcrypt cost factor (existing hashes are upgraded on login),
+# dedicated worker threads, and how many hashes may wait before we refuse more
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
 ROLES = ["admin", "instructor", "manager", "trainee"]
 DEFAULT_ROLE = "trainee"
 
 
+# ─── Password hashing ────────────────────────────────────────────────────────
+# bcrypt is deliberately slow (~250 ms of CPU at cost 12).  The async helpers
+# run it on a dedicated pool (bcrypt releases the GIL, so workers hash in
+# parallel) and refuse new work with PasswordHasherBusy once
+# PASSWORD_HASH_MAX_PENDING hashes are queued or running.
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes in flight; the caller should retry shortly."""
+
+
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+_hash_rejected = 0
+_hash_lock = threading.Lock()
+
+
+def _hash_password(password: str) -> str:
+    return _bcrypt.hashpw(password.encode("utf-8"), _bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def _check_password(password: str, hashed: str) -> bool:
+    return _bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def _needs_rehash(hashed: str) -> bool:
+    """True if a stored hash ($2b$<cost>$...) uses a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def _run_hasher(fn, *args):
+    global _hash_pending, _hash_rejected
+    with _hash_lock:
+        if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+            _hash_rejected += 1
+            raise PasswordHasherBusy("Too many sign-in requests right now. Please retry in a moment.")
+        _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        with _hash_lock:
+            _hash_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hasher(_hash_password, password)
+
+
+async def check_password_async(password: str, hashed: str) -> bool:
+    return await _run_hasher(_check_password, password, hashed)
+
+
+def get_password_hasher_stats() -> dict:
+    with _hash_lock:
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "pending": _hash_pending,
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "rejected": _hash_rejected,
+        }
+
+
 # ─── DB helpers ──────────────────────────────────────────────────────────────
 
 def _conn():
@@ -139,20 +216,48 @@ def create_token(user_id: str, username: str, role: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
+# sha256(token) → (payload, exp); entries never outlive the token's own exp
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
 def verify_token(token: str) -> Optional[dict]:
-    """Returns decoded payload or None if invalid / expired."""
+    """
+    Returns decoded payload or None if invalid / expired.
+    The payload may be shared between callers — treat it as read-only.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit is not None:
+            payload, exp = hit
+            if exp > time.time():
+                _token_cache.move_to_end(key)
+                metrics.cache_lookup("jwt", True)
+                return payload
+            del _token_cache[key]
+            return None
+    metrics.cache_lookup("jwt", False)
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _token_cache_lock:
+            _token_cache[key] = (payload, exp)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload
+
 
 # ─── Public API ──────────────────────────────────────────────────────────────
 
-def register_user(
+async def register_user(
     username: str,
     email: str,
     password: str,
@@ -172,13 +277,18 @@ def register_user(
         if conn.execute("SELECT 1 FROM users WHERE email=?", (email,)).fetchone():
             return {"error": "Email already registered"}
 
+        password_hash = await hash_password_async(password)
         now = datetime.now(timezone.utc).isoformat()
         user_id = str(uuid.uuid4())
-        conn.execute(
-            """INSERT INTO users (id, username, email, password_hash, name, role, department, created_at, updated_at)
-               VALUES (?,?,?,?,?,?,?,?,?)""",
-            (user_id, username, email, _hash_password(password), name or username, role, department, now, now),
-        )
+        try:
+            conn.execute(
+                """INSERT INTO users (id, username, email, password_hash, name, role, department, created_at, updated_at)
+                   VALUES (?,?,?,?,?,?,?,?,?)""",
+                (user_id, username, email, password_hash, name or username, role, department, now, now),
+            )
+        except sqlite3.IntegrityError:
+            # Registered concurrently while the password was being hashed
+            return {"error": "Username or email already registered"}
         _log(conn, user_id, "register", f"New {role} account created")
         conn.commit()
         return get_user_safe(user_id, conn)
@@ -186,20 +296,16 @@ def register_user(
         conn.close()
 
 
-def login(username: str, password: str) -> dict:
+async def login(username: str, password: str) -> dict:
     """Authenticate and return { token, user } or { error }."""
     conn = _conn()
     try:
         row = conn.execute(
             "SELECT * FROM users WHERE username=? AND is_active=1", (username,)
         ).fetchone()
-        if not row:
-            return {"error": "Invalid username or password"}
-
-        if not _check_password(password, row["password_hash"]):
-            _log(conn, row["id"], "login_failed", "Bad password")
-            conn.commit()
-            return {"error": "Invalid username or password"}
+        error = await _verify_login(conn, row, password)
+        if error:
+            return error
 
         token = create_token(row["id"], row["username"], row["role"])
         _log(conn, row["id"], "login", "Successful login")
@@ -211,6 +317,72 @@ def login(username: str, password: str) -> dict:
         conn.close()
 
 
+async def login_with_2fa(username: str, password: str) -> dict:
+    """
+    Full /api/auth/login flow on one connection: the user row is fetched
+    joined with its 2FA settings, and the audit row plus (when 2FA is on)
+    the challenge are written in a single transaction.
+
+    Returns { token, user }, the requires_2fa payload, or { error }.
+    """
+    conn = _conn()
+    try:
+        row = conn.execute(
+            """SELECT u.*, t.is_enabled AS twofa_enabled, t.preferred_method AS twofa_method
+               FROM users u LEFT JOIN twofa_settings t ON t.user_id = u.id
+               WHERE u.username=? AND u.is_active=1""",
+            (username,),
+        ).fetchone()
+        error = await _verify_login(conn, row, password)
+        if error:
+            return error
+
+        user = _row_to_safe(row)
+        _log(conn, row["id"], "login", "Successful login")
+
+        if not row["twofa_enabled"]:
+            conn.commit()
+            return {"token": create_token(row["id"], row["username"], row["role"]), "user": user}
+
+        method = row["twofa_method"]
+        challenge = twofa_service.insert_challenge(conn, row["id"], method)
+        conn.commit()
+        return {
+            "requires_2fa": True,
+            "temp_token": twofa_service.create_temp_token(row["id"], row["username"], row["role"]),
+            "challenge_id": challenge["challenge_id"],
+            "method": method,
+            "instructions": challenge["instructions"],
+            "demo_hint": challenge.get("demo_hint", ""),
+            "available_methods": twofa_service.get_available_methods(),
+            "user_preview": {
+                "username": user["username"],
+                "name": user["name"],
+            },
+        }
+    finally:
+        conn.close()
+
+
+async def _verify_login(conn, row, password: str) -> Optional[dict]:
+    """Check the password for a fetched user row; returns { error } on failure."""
+    if not row:
+        return {"error": "Invalid username or password"}
+
+    if not await check_password_async(password, row["password_hash"]):
+        _log(conn, row["id"], "login_failed", "Bad password")
+        conn.commit()
+        return {"error": "Invalid username or password"}
+
+    if _needs_rehash(row["password_hash"]):
+        # Transparently upgrade the stored hash to the current cost factor
+        conn.execute(
+            "UPDATE users SET password_hash=? WHERE id=?",
+            (await hash_password_async(password), row["id"]),
+        )
+    return None
+
+
 def get_user_safe(user_id: str, conn=None) -> dict:
     """Return user dict without password hash."""
     close = False
@@ -258,6 +430,10 @@ def update_user(user_id: str, **kwargs) -> dict:
         updates["updated_at"] = datetime.now(timezone.utc).isoformat()
         set_clause = ", ".join(f"{k}=?" for k in updates)
         vals = list(updates.values()) + [user_id]
+        if "department" in updates:
+            row = conn.execute("SELECT department FROM users WHERE id=?", (user_id,)).fetchone()
+            if row:
+                reporting_rollups.move_user_department(conn, user_id, row["department"], updates["department"])
         conn.execute(f"UPDATE users SET {set_clause} WHERE id=?", vals)
         _log(conn, user_id, "update_user", f"Fields updated: {list(updates.keys())}")
         conn.commit()
@@ -266,17 +442,17 @@ def update_user(user_id: str, **kwargs) -> dict:
         conn.close()
 
 
-def change_password(user_id: str, old_password: str, new_password: str) -> dict:
+async def change_password(user_id: str, old_password: str, new_password: str) -> dict:
     conn = _conn()
     try:
         row = conn.execute("SELECT password_hash FROM users WHERE id=?", (user_id,)).fetchone()
         if not row:
             return {"error": "User not found"}
-        if not _check_password(old_password, row["password_hash"]):
+        if not await check_password_async(old_password, row["password_hash"]):
             return {"error": "Current password is incorrect"}
         conn.execute(
             "UPDATE users SET password_hash=?, updated_at=? WHERE id=?",
-            (_hash_password(new_password), datetime.now(timezone.utc).isoformat(), user_id),
+            (await hash_password_async(new_password), datetime.now(timezone.utc).isoformat(), user_id),
         )
         _log(conn, user_id, "change_password", "Password changed")
         conn.commit()
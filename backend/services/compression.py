@@ -0,0 +1,91 @@
+"""
+Compression helpers — precompressed response bodies and Accept-Encoding negotiation.
+Brotli is optional (pip install brotli); without it only gzip variants are produced.
+"""
+
+import gzip
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+# Preferred order when the client accepts several encodings equally
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 256
+
+# Level for on-the-fly (streamed) gzip: favours throughput over ratio
+STREAM_GZIP_LEVEL = 6
+
+
+def available_encodings() -> tuple:
+    return PREFERRED_ENCODINGS if brotli is not None else ("gzip",)
+
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """
+    Return {encoding: compressed_body} for every encoding we can produce.
+    Variants that don't make the body smaller are left out.
+    """
+    if len(data) < MIN_COMPRESS_BYTES:
+        return {}
+    variants: Dict[str, bytes] = {}
+    # mtime=0 keeps the output deterministic (stable ETags / build artifacts)
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants["br"] = br
+    return variants
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """
+    Pick the best encoding from `available` allowed by an Accept-Encoding
+    header, or None for identity.  Honours q-values (q=0 means "not this").
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    available = set(available)
+    best, best_q = None, 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def gzip_stream(chunks: Iterable[Union[str, bytes]], level: int = STREAM_GZIP_LEVEL) -> Iterator[bytes]:
+    """
+    Gzip a stream of chunks incrementally (str chunks are UTF-8 encoded).
+    Memory stays bounded by the compressor window, whatever the total size.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
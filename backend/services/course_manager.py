@@ -7,11 +7,18 @@ import sqlite3
 import os
 import json
 import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Callable
 
+from services.compression import compress_variants, negotiate_encoding
+from services import reporting_rollups
+from services import metrics
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db")
+
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db"))
 
 
 def get_db():
@@ -64,6 +71,9 @@ def init_db():
             progress REAL DEFAULT 0,
             FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
         );
+        -- Covers the (user, course) lookups of the compliance report and enrollment checks
+        CREATE INDEX IF NOT EXISTS idx_enrollments_user_course
+            ON enrollments(user_id, course_id, status, progress);
 
         CREATE TABLE IF NOT EXISTS module_progress (
             id TEXT PRIMARY KEY,
@@ -77,13 +87,51 @@ def init_db():
             FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE,
             FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
         );
+
+        -- Catalog generation: bumped by triggers on every write to courses/modules,
+        -- including the expand_*/populate_* scripts that write with raw SQL.
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO catalog_version (id, generation) VALUES (1, 0);
+
+        -- Module content precompressed per encoding ('identity', 'gzip', 'br')
+        CREATE TABLE IF NOT EXISTS module_content_blobs (
+            module_id TEXT NOT NULL,
+            encoding TEXT NOT NULL,
+            body BLOB NOT NULL,
+            etag TEXT NOT NULL,
+            PRIMARY KEY (module_id, encoding)
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_modules_content_blobs_update
+        AFTER UPDATE OF content ON modules
+        BEGIN
+            DELETE FROM module_content_blobs WHERE module_id = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_modules_content_blobs_delete
+        AFTER DELETE ON modules
+        BEGIN
+            DELETE FROM module_content_blobs WHERE module_id = OLD.id;
+        END;
     """)
+    for table in ("courses", "modules"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_catalog_gen
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_version SET generation = generation + 1 WHERE id = 1;
+                END
+            """)
 
     # --- Seed data (only if no courses exist) ---
     existing = cur.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
     if existing == 0:
         _seed_courses(cur)
 
+    precompress_module_content(conn)
+
     conn.commit()
     conn.close()
 
@@ -215,11 +263,52 @@ def _seed_courses(cur):
             ))
 
 
-# ─── CRUD Functions ──────────────────────────────────────────────────────────
+# ─── Catalog read-through cache ─────────────────────────────────────────────
+# Cached values are stamped with the catalog generation they were read at and
+# reused until the generation changes.  Callers must treat them as read-only.
 
-def get_all_courses() -> List[Dict]:
-    """Return all courses with module counts."""
+_catalog_cache: Dict[Any, Tuple[int, Any]] = {}
+_catalog_lock = threading.Lock()
+
+
+def get_catalog_generation(conn=None) -> int:
+    """Current catalog generation (changes whenever courses or modules change)."""
+    close = conn is None
+    if conn is None:
+        conn = get_db()
+    try:
+        row = conn.execute("SELECT generation FROM catalog_version WHERE id = 1").fetchone()
+        return row[0] if row else 0
+    finally:
+        if close:
+            conn.close()
+
+
+def _read_through(key: Any, loader: Callable[[sqlite3.Connection], Any]) -> Tuple[int, Any]:
+    """Return (generation, value) from the cache, loading on a miss or stale stamp."""
     conn = get_db()
+    try:
+        generation = get_catalog_generation(conn)
+        with _catalog_lock:
+            hit = _catalog_cache.get(key)
+        if hit is not None and hit[0] == generation:
+            metrics.cache_lookup("catalog", True)
+            return hit
+        metrics.cache_lookup("catalog", False)
+        with metrics.db_timer("catalog_load"):
+            value = loader(conn)
+    finally:
+        conn.close()
+
+    with _catalog_lock:
+        # Drop everything from older generations so the cache can't grow stale entries
+        for stale_key in [k for k, (g, _) in _catalog_cache.items() if g != generation]:
+            del _catalog_cache[stale_key]
+        _catalog_cache[key] = (generation, value)
+    return generation, value
+
+
+def _load_all_courses(conn) -> List[Dict]:
     rows = conn.execute("""
         SELECT c.*, COUNT(m.id) as module_count
         FROM courses c
@@ -227,26 +316,192 @@ def get_all_courses() -> List[Dict]:
         GROUP BY c.id
         ORDER BY c.is_mandatory DESC, c.title
     """).fetchall()
-    conn.close()
     return [dict(r) for r in rows]
 
 
-def get_course(course_id: str) -> Optional[Dict]:
-    """Return a single course with its modules."""
-    conn = get_db()
+def _load_course(conn, course_id: str) -> Optional[Dict]:
     course = conn.execute("SELECT * FROM courses WHERE id = ?", (course_id,)).fetchone()
     if not course:
-        conn.close()
         return None
     result = dict(course)
     modules = conn.execute(
         "SELECT * FROM modules WHERE course_id = ? ORDER BY order_index", (course_id,)
     ).fetchall()
     result["modules"] = [dict(m) for m in modules]
-    conn.close()
     return result
 
 
+def _load_course_outline(conn, course_id: str) -> Optional[Dict]:
+    course = conn.execute("SELECT * FROM courses WHERE id = ?", (course_id,)).fetchone()
+    if not course:
+        return None
+    result = dict(course)
+    modules = conn.execute("""
+        SELECT id, course_id, title, description, order_index, duration_minutes
+        FROM modules WHERE course_id = ? ORDER BY order_index
+    """, (course_id,)).fetchall()
+    result["modules"] = [dict(m) for m in modules]
+    return result
+
+
+def get_all_courses_versioned() -> Tuple[int, List[Dict]]:
+    """Return (catalog generation, all courses with module counts)."""
+    return _read_through("all_courses", _load_all_courses)
+
+
+def get_course_versioned(course_id: str) -> Tuple[int, Optional[Dict]]:
+    """Return (catalog generation, course with its modules or None)."""
+    return _read_through(("course", course_id), lambda conn: _load_course(conn, course_id))
+
+
+def get_course_outline_versioned(course_id: str) -> Tuple[int, Optional[Dict]]:
+    """Return (catalog generation, course with module metadata but no content)."""
+    return _read_through(("outline", course_id), lambda conn: _load_course_outline(conn, course_id))
+
+
+# ─── Module content (precompressed) ──────────────────────────────────────────
+# Triggers drop a module's blobs whenever its content changes (including edits
+# made by the expand_* scripts with raw SQL).  A read that finds no blobs serves
+# the identity content and queues the module for recompression on a background
+# thread, so GETs stay read-only and brotli never runs on the event loop.
+
+_INSERT_MODULE_BLOB = (
+    "INSERT OR REPLACE INTO module_content_blobs (module_id, encoding, body, etag) VALUES (?, ?, ?, ?)"
+)
+
+# One worker: recompressions are rare and serialising them keeps write contention low
+_compress_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="module-compress")
+_compress_pending: set = set()
+_compress_pending_lock = threading.Lock()
+
+
+def _content_etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _module_blob_rows(module_id: str, content: Optional[str]) -> List[tuple]:
+    """Every supported encoding of one module's content, as module_content_blobs rows."""
+    body = (content or "").encode("utf-8")
+    digest = _content_etag(body)
+    variants = {"identity": body, **compress_variants(body)}
+    return [(module_id, encoding, blob, digest) for encoding, blob in variants.items()]
+
+
+def _store_module_blobs(conn, module_id: str, content: Optional[str]) -> str:
+    """Compress one module's content into every supported encoding; returns the ETag base."""
+    rows = _module_blob_rows(module_id, content)
+    conn.executemany(_INSERT_MODULE_BLOB, rows)
+    return rows[0][3]
+
+
+def _recompress_module(module_id: str):
+    """Background: compress outside any transaction, then write under BEGIN IMMEDIATE."""
+    conn = get_db()
+    try:
+        row = conn.execute("SELECT content FROM modules WHERE id = ?", (module_id,)).fetchone()
+        if not row:
+            return
+        rows = _module_blob_rows(module_id, row["content"])
+        conn.execute("BEGIN IMMEDIATE")
+        current = conn.execute("SELECT content FROM modules WHERE id = ?", (module_id,)).fetchone()
+        if current and current["content"] == row["content"]:  # not edited while compressing
+            conn.executemany(_INSERT_MODULE_BLOB, rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Recompressing module {module_id} failed: {e}")
+    finally:
+        conn.close()
+        with _compress_pending_lock:
+            _compress_pending.discard(module_id)
+
+
+def _schedule_recompress(module_id: str):
+    with _compress_pending_lock:
+        if module_id in _compress_pending:
+            return
+        _compress_pending.add(module_id)
+    _compress_pool.submit(_recompress_module, module_id)
+
+
+def precompress_module_content(conn=None) -> int:
+    """Precompress every module that has no cached blobs yet. Returns the count."""
+    close = conn is None
+    if conn is None:
+        conn = get_db()
+    try:
+        rows = conn.execute("""
+            SELECT m.id, m.content FROM modules m
+            WHERE NOT EXISTS (
+                SELECT 1 FROM module_content_blobs b
+                WHERE b.module_id = m.id AND b.encoding = 'identity'
+            )
+        """).fetchall()
+        for row in rows:
+            _store_module_blobs(conn, row["id"], row["content"])
+        if close:
+            conn.commit()
+        return len(rows)
+    finally:
+        if close:
+            conn.close()
+
+
+def get_module_content(course_id: str, module_id: str, accept_encoding: Optional[str] = None) -> Optional[Dict]:
+    """
+    Return {"body", "encoding", "etag"} for a module's HTML content, using the
+    best precompressed variant the client accepts (encoding None = identity).
+    Read-only: on a blob miss the identity content is served and the module is
+    recompressed in the background.
+    """
+    conn = get_db()
+    try:
+        # One transaction so the variant list and the body come from the same snapshot
+        conn.execute("BEGIN")
+        variants = {
+            r["encoding"]: r["etag"]
+            for r in conn.execute("""
+                SELECT b.encoding, b.etag FROM module_content_blobs b
+                JOIN modules m ON m.id = b.module_id
+                WHERE m.id = ? AND m.course_id = ?
+            """, (module_id, course_id)).fetchall()
+        }
+        if "identity" not in variants:
+            row = conn.execute(
+                "SELECT content FROM modules WHERE id = ? AND course_id = ?", (module_id, course_id)
+            ).fetchone()
+            conn.commit()
+            if not row:
+                return None
+            _schedule_recompress(module_id)
+            body = (row["content"] or "").encode("utf-8")
+            # Same ETag as the identity blob will get, so revalidation survives the recompress
+            return {"body": body, "encoding": None, "etag": f'"{_content_etag(body)}"'}
+
+        encoding = negotiate_encoding(accept_encoding, [e for e in variants if e != "identity"])
+        stored = encoding or "identity"
+        body = conn.execute(
+            "SELECT body FROM module_content_blobs WHERE module_id = ? AND encoding = ?",
+            (module_id, stored)
+        ).fetchone()["body"]
+        conn.commit()
+        etag = f'"{variants[stored]}-{encoding}"' if encoding else f'"{variants[stored]}"'
+        return {"body": body, "encoding": encoding, "etag": etag}
+    finally:
+        conn.close()
+
+
+# ─── CRUD Functions ──────────────────────────────────────────────────────────
+
+def get_all_courses() -> List[Dict]:
+    """Return all courses with module counts."""
+    return get_all_courses_versioned()[1]
+
+
+def get_course(course_id: str) -> Optional[Dict]:
+    """Return a single course with its modules."""
+    return get_course_versioned(course_id)[1]
+
+
 def get_enrollment(user_id: str, course_id: str) -> Optional[Dict]:
     """Get enrollment status for a user + course."""
     conn = get_db()
@@ -263,10 +518,15 @@ def enroll_user(user_id: str, course_id: str) -> Dict:
     conn = get_db()
     enrollment_id = f"enr-{uuid.uuid4().hex[:8]}"
     now = datetime.now().isoformat()
-    conn.execute("""
+    already_enrolled = conn.execute(
+        "SELECT 1 FROM enrollments WHERE user_id = ? AND course_id = ? LIMIT 1", (user_id, course_id)
+    ).fetchone() is not None
+    inserted = conn.execute("""
         INSERT OR IGNORE INTO enrollments (id, user_id, course_id, status, enrolled_at, progress)
         VALUES (?, ?, ?, 'enrolled', ?, 0)
-    """, (enrollment_id, user_id, course_id, now))
+    """, (enrollment_id, user_id, course_id, now)).rowcount
+    if inserted and not already_enrolled:
+        reporting_rollups.record_enrollment(conn, user_id, course_id)
     conn.commit()
     conn.close()
     return {"enrollment_id": enrollment_id, "status": "enrolled"}
@@ -321,10 +581,18 @@ def update_module_progress(user_id: str, module_id: str, course_id: str, status:
     progress = (completed / total * 100) if total > 0 else 0
 
     enrollment_status = "completed" if progress >= 100 else "in_progress"
-    conn.execute("""
+    was_completed = conn.execute(
+        "SELECT MAX(status = 'completed') FROM enrollments WHERE user_id = ? AND course_id = ?",
+        (user_id, course_id)
+    ).fetchone()[0]
+    updated = conn.execute("""
         UPDATE enrollments SET progress = ?, status = ?, completed_at = ?
         WHERE user_id = ? AND course_id = ?
-    """, (progress, enrollment_status, now if enrollment_status == "completed" else None, user_id, course_id))
+    """, (progress, enrollment_status, now if enrollment_status == "completed" else None, user_id, course_id)).rowcount
+    if updated:
+        reporting_rollups.record_completion_change(
+            conn, user_id, course_id, bool(was_completed), enrollment_status == "completed"
+        )
 
     conn.commit()
     conn.close()
@@ -0,0 +1,418 @@
+"""
+Embedding Service — a shared, out-of-process SentenceTransformer pool.
+
+Every uvicorn worker that imports app.py used to load its own copy of the
+embedding model.  This module lets all web workers share one local service
+instead:
+
+- A server process listens on a Unix socket (or host:port on Windows)
+- Requests are queued in a bounded queue (backpressure: callers get a
+  "busy" error instead of piling up unbounded work)
+- A batcher thread coalesces queued requests into batches and hands them
+  to a process pool, one model copy per worker process ("core group")
+- Queue depth, batch sizes and rejections are reported via a stats call
+
+Run the server:
+    python -m services.embedding_service            (from backend/)
+
+Point the web workers at it:
+    EMBEDDING_SERVICE_ADDRESS=/tmp/edu_assist_embeddings.sock
+
+Connections are authenticated (requests are pickled, so an unauthenticated
+peer could run code in the service).  Without EMBEDDING_SERVICE_AUTHKEY the
+server generates a random key at start-up and writes it to a 0600 key file
+that clients on the same host read.  TCP addresses other than loopback are
+refused unless EMBEDDING_SERVICE_AUTHKEY is set explicitly.
+"""
+
+import os
+import sys
+import time
+import queue
+import asyncio
+import secrets
+import tempfile
+import ipaddress
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.connection import Listener, Client
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+# ─── Config ──────────────────────────────────────────────────────────────────
+
+DEFAULT_ADDRESS = os.getenv("EMBEDDING_SERVICE_ADDRESS", "/tmp/edu_assist_embeddings.sock")
+# Shared secret; when unset the server generates one and writes it to AUTH_KEY_FILE
+AUTH_KEY = os.getenv("EMBEDDING_SERVICE_AUTHKEY", "")
+AUTH_KEY_FILE = os.getenv("EMBEDDING_SERVICE_AUTHKEY_FILE", "")  # default: next to the socket
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Worker processes (each holds one model copy) and threads per worker
+WORKER_PROCESSES = int(os.getenv("EMBEDDING_WORKERS", "2"))
+THREADS_PER_WORKER = int(os.getenv("EMBEDDING_THREADS_PER_WORKER", "0"))  # 0 = cpu_count // workers
+
+# Batching / backpressure
+MAX_BATCH_TEXTS = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+MAX_QUEUE_DEPTH = int(os.getenv("EMBEDDING_MAX_QUEUE", "256"))
+
+# Client side: how long a web worker waits for an answer
+CLIENT_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_CLIENT_TIMEOUT", "30"))
+
+
+def _parse_address(address: str) -> Tuple[Union[str, Tuple[str, int]], str]:
+    """'host:port' → AF_INET tuple, anything else → AF_UNIX path."""
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return (host, int(port)), "AF_INET"
+    return address, "AF_UNIX"
+
+
+def _key_file(address: str) -> str:
+    if AUTH_KEY_FILE:
+        return AUTH_KEY_FILE
+    addr, family = _parse_address(address)
+    if family == "AF_UNIX":
+        return f"{addr}.key"
+    return os.path.join(tempfile.gettempdir(), f"edu_assist_embeddings_{addr[1]}.key")
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _server_authkey(address: str) -> bytes:
+    """The configured key, or a fresh random one published to the 0600 key file."""
+    addr, family = _parse_address(address)
+    if AUTH_KEY:
+        return AUTH_KEY.encode("utf-8")
+    if family == "AF_INET" and not _is_loopback(addr[0]):
+        raise RuntimeError(f"Refusing to listen on {address} without EMBEDDING_SERVICE_AUTHKEY "
+                           "(only loopback addresses may use a generated key)")
+
+    key = secrets.token_hex(32)
+    path = _key_file(address)
+    if os.path.exists(path):
+        os.unlink(path)
+    # O_EXCL after the unlink: never write the key into a file someone else created
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    return key.encode("utf-8")
+
+
+def _client_authkey(address: str) -> bytes:
+    if AUTH_KEY:
+        return AUTH_KEY.encode("utf-8")
+    path = _key_file(address)
+    try:
+        with open(path) as f:
+            return f.read().strip().encode("utf-8")
+    except OSError as e:
+        raise ConnectionError(f"Embedding service key file {path} not readable ({e}); "
+                              "is the service running, or set EMBEDDING_SERVICE_AUTHKEY") from e
+
+
+# ─── Worker process side ─────────────────────────────────────────────────────
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    """Load the model once per worker process and pin its thread count."""
+    global _worker_model
+    if threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, convert_to_numpy=True)  # type: ignore
+
+
+# ─── Server ──────────────────────────────────────────────────────────────────
+
+class _Job:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class EmbeddingServer:
+    """Accepts connections from web workers and serves batched encode calls."""
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        model_name: str = MODEL_NAME,
+        workers: int = WORKER_PROCESSES,
+        threads_per_worker: int = THREADS_PER_WORKER,
+    ):
+        self.address = address
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        if threads_per_worker <= 0:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        self.threads_per_worker = threads_per_worker
+
+        self._queue: "queue.Queue[_Job]" = queue.Queue(maxsize=MAX_QUEUE_DEPTH)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stop = threading.Event()
+
+        # Metrics (guarded by _stats_lock)
+        self._stats_lock = threading.Lock()
+        self._in_flight_batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._rejected = 0
+        self._errors = 0
+        self._max_queue_depth_seen = 0
+        self._queue_wait_ms_total = 0.0
+        self._started_at = time.time()
+
+    # ── lifecycle ──
+
+    def serve_forever(self):
+        addr, family = _parse_address(self.address)
+        authkey = _server_authkey(self.address)  # before loading models: refuse bad config fast
+        if family == "AF_UNIX" and os.path.exists(addr):  # stale socket from a previous run
+            os.unlink(addr)
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.model_name, self.threads_per_worker),
+        )
+        # Warm every worker so the first real request doesn't pay model load
+        list(self._pool.map(_encode_batch, [["warmup"]] * self.workers))
+
+        batcher = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+        batcher.start()
+
+        listener = Listener(addr, family=family, authkey=authkey)
+        print(f"✅ Embedding service listening on {self.address} "
+              f"({self.workers} workers × {self.threads_per_worker} threads, model={self.model_name})")
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:
+                    print(f"⚠️ Embedding service accept error: {e}")
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            self.shutdown()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ── connection handling ──
+
+    def _handle_connection(self, conn):
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._dispatch(request))
+        finally:
+            conn.close()
+
+    def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}
+        if op != "encode":
+            return {"ok": False, "error": f"Unknown op: {op}"}
+
+        texts = request.get("texts") or []
+        if not texts:
+            return {"ok": True, "embeddings": np.zeros((0, 0), dtype=np.float32)}
+
+        job = _Job(list(texts))
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            return {"ok": False, "busy": True, "error": "Embedding service overloaded"}
+
+        with self._stats_lock:
+            self._requests += 1
+            self._max_queue_depth_seen = max(self._max_queue_depth_seen, self._queue.qsize())
+
+        try:
+            return {"ok": True, "embeddings": job.future.result()}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    # ── batching ──
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            jobs = [first]
+            n_texts = len(first.texts)
+            deadline = time.monotonic() + BATCH_WAIT_MS / 1000.0
+            while n_texts < MAX_BATCH_TEXTS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                n_texts += len(job.texts)
+
+            self._submit(jobs)
+
+    def _submit(self, jobs: List[_Job]):
+        texts: List[str] = []
+        for job in jobs:
+            texts.extend(job.texts)
+
+        now = time.monotonic()
+        with self._stats_lock:
+            self._in_flight_batches += 1
+            self._batches += 1
+            self._texts += len(texts)
+            self._queue_wait_ms_total += sum((now - j.enqueued_at) * 1000 for j in jobs)
+
+        pool_future = self._pool.submit(_encode_batch, texts)  # type: ignore
+
+        def _fan_out(fut):
+            with self._stats_lock:
+                self._in_flight_batches -= 1
+            try:
+                embeddings = fut.result()
+            except Exception as e:
+                with self._stats_lock:
+                    self._errors += 1
+                for job in jobs:
+                    job.future.set_exception(e)
+                return
+            offset = 0
+            for job in jobs:
+                job.future.set_result(embeddings[offset:offset + len(job.texts)])
+                offset += len(job.texts)
+
+        pool_future.add_done_callback(_fan_out)
+
+    # ── metrics ──
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": MAX_QUEUE_DEPTH,
+                "max_queue_depth_seen": self._max_queue_depth_seen,
+                "in_flight_batches": self._in_flight_batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "batches": self._batches,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0,
+                "avg_queue_wait_ms": round(self._queue_wait_ms_total / self._requests, 2) if self._requests else 0,
+                "rejected": self._rejected,
+                "errors": self._errors,
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "model": self.model_name,
+                "uptime_seconds": round(time.time() - self._started_at, 1),
+            }
+
+
+# ─── Client (used by VectorStore inside web workers) ─────────────────────────
+
+class EmbeddingServiceBusy(Exception):
+    """Raised when the embedding service rejects work because its queue is full."""
+
+
+class EmbeddingClient:
+    """
+    Thin client for EmbeddingServer.  Connections are pooled and each one
+    carries a single outstanding request, so the blocking send/recv pair
+    is run in the default executor to keep the event loop free.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS):
+        self.address = address
+        self._addr, self._family = _parse_address(address)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+
+    @classmethod
+    def from_env(cls) -> Optional["EmbeddingClient"]:
+        """Return a client if EMBEDDING_SERVICE_ADDRESS is configured, else None."""
+        address = os.getenv("EMBEDDING_SERVICE_ADDRESS")
+        return cls(address) if address else None
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            # Key read per new connection: a restarted server publishes a new one
+            return Client(self._addr, family=self._family, authkey=_client_authkey(self.address))
+
+    def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._checkout()
+        try:
+            conn.send(payload)
+            if not conn.poll(CLIENT_TIMEOUT_SECONDS):
+                raise TimeoutError(f"Embedding service did not answer within {CLIENT_TIMEOUT_SECONDS}s")
+            reply = conn.recv()
+        except Exception:
+            conn.close()
+            raise
+        self._idle.put(conn)
+        return reply
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_event_loop()
+        reply = await loop.run_in_executor(None, self._request, {"op": "encode", "texts": texts})
+        if not reply.get("ok"):
+            if reply.get("busy"):
+                raise EmbeddingServiceBusy(reply.get("error", "Embedding service busy"))
+            raise Exception(f"Embedding service error: {reply.get('error')}")
+        return reply["embeddings"]
+
+    async def stats(self) -> Dict[str, Any]:
+        loop = asyncio.get_event_loop()
+        reply = await loop.run_in_executor(None, self._request, {"op": "stats"})
+        return reply.get("stats", {})
+
+
+def main():
+    address = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS
+    server = EmbeddingServer(address=address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Embedding service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,174 @@
 # Updated: Dynamic model fetching from Groq API
 import os
-from groq import Groq
+import json
+import time
+import heapq
+import random
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq, APIStatusError, APIConnectionError, APITimeoutError
 import asyncio
 from typing import List, Dict, Optional, Any
 import aiohttp
+from services.model_tiers import choose_tier, FAST_TIER, QUALITY_TIER
+from services.prompts import educational_system_prompt, format_user_message, PromptCacheStats
+from services import tracing
+
+# Model tiers: small fast model for simple turns, large model for heavy ones
+GROQ_FAST_MODEL = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+GROQ_QUALITY_MODEL = os.getenv("GROQ_QUALITY_MODEL", "llama-3.3-70b-versatile")
+
+# Concurrency / pacing against Groq rate limits
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "0"))  # 0 = don't pace on tokens
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+GROQ_BACKOFF_BASE_SECONDS = 0.5
+GROQ_BACKOFF_MAX_SECONDS = 20.0
+
+# Priority classes (lower value is served first)
+PRIORITY_CHAT = 0
+PRIORITY_QUIZ = 1
+PRIORITIES = {"chat": PRIORITY_CHAT, "quiz": PRIORITY_QUIZ}
+
+
+class _PrioritySemaphore:
+    """
+    Counting semaphore whose waiters are woken by priority, then FIFO.
+    A released slot is handed directly to the next waiter so a burst of
+    quiz generations can't starve chat requests queued behind them.
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._active = 0
+        self._waiters: list = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    async def acquire(self, priority: int):
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+        fut = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # The slot was handed over just before we were cancelled: pass it on
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # slot transferred, _active unchanged
+                return
+        self._active -= 1
+
+
+class _TokenBucket:
+    """
+    Continuous-refill token bucket; capacity is one minute's allowance.
+    Waiters are served by priority, then FIFO, so quiz generations queued
+    on an empty bucket don't hold back a chat request that arrives later.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list = []  # heap of (priority, seq, cost, future)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, _, f in self._waiters if not f.done())
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (e.g. after a 429 Retry-After)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        if self._waiters:
+            self._dispatch()
+
+    async def acquire(self, cost: float = 1.0, priority: int = PRIORITY_CHAT):
+        if self.per_minute <= 0:
+            return
+        cost = min(cost, self.per_minute)
+        if not self._waiters and self._take(cost):
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), cost, fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._tokens += cost  # granted just before we were cancelled: give them back
+            self._dispatch()
+            raise
+
+    def _take(self, cost: float) -> bool:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+        if self._tokens < cost:
+            return False
+        self._tokens -= cost
+        return True
+
+    def _dispatch(self):
+        """Grant tokens to the head waiters, then sleep until the next one can be served."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            _, _, cost, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)  # cancelled while waiting
+                continue
+            if not self._take(cost):
+                now = time.monotonic()
+                delay = max(self._paused_until - now, (cost - self._tokens) * 60.0 / self.per_minute)
+                self._wakeup = fut.get_loop().call_later(max(delay, 0.001), self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            fut.set_result(None)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (seconds) from a Groq API error response, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
 
 class GroqService:
     def __init__(self):
@@ -14,10 +179,23 @@ class GroqService:
         if not self.api_key:
             raise ValueError("GROQ_API_KEY environment variable is required")
         
-        self.client = Groq(api_key=self.api_key)
+        # Retries are handled by chat_completion so they go through the limiter
+        self.client = Groq(api_key=self.api_key, max_retries=0)
         self.default_model = None  # Will be set dynamically
         self._available_models = None
         
+        # Request coalescing, concurrency limit and rate pacing
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._semaphore = _PrioritySemaphore(GROQ_MAX_CONCURRENCY)
+        # Blocking SDK calls; one thread per semaphore slot so a granted slot never queues
+        self._executor = ThreadPoolExecutor(max_workers=GROQ_MAX_CONCURRENCY, thread_name_prefix="groq")
+        self._request_bucket = _TokenBucket(GROQ_REQUESTS_PER_MINUTE)
+        self._token_bucket = _TokenBucket(GROQ_TOKENS_PER_MINUTE)
+        self._stats = {"calls": 0, "coalesced": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+        self.tier_models = {FAST_TIER: GROQ_FAST_MODEL, QUALITY_TIER: GROQ_QUALITY_MODEL}
+        self._tier_counts = {FAST_TIER: 0, QUALITY_TIER: 0}
+        self.prompt_cache = PromptCacheStats()
+        
     async def get_available_models(self) -> List[str]:
         """
         Fetch available models from Groq API
@@ -28,7 +206,9 @@ class GroqService:
         try:
             async with aiohttp.ClientSession() as session:
                 headers = {"Authorization": f"Bearer {self.api_key}"}
-                async with session.get("https://api.groq.com/openai/v1/models", headers=headers) as response:
+                # Honour GROQ_BASE_URL (picked up by the SDK) so local stand-ins work too
+                models_url = str(self.client.base_url).rstrip("/") + "/openai/v1/models"
+                async with session.get(models_url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
                         models = [model['id'] for model in data.get('data', [])]
@@ -68,38 +248,162 @@ class GroqService:
             self.default_model = chosen or "llama-3.3-70b-versatile"
             print(f"✅ Using default model: {self.default_model}")
         return self.default_model
+    
+    async def select_model(
+        self,
+        query: str,
+        context: str = "",
+        chat_history: Optional[List[Dict[str, Any]]] = None,
+        eli5_mode: bool = False
+    ) -> str:
+        """
+        Pick the fast or quality tier model for this turn from cheap local features
+        """
+        decision = choose_tier(query, context, chat_history, eli5_mode)
+        tier = decision["tier"]
+        model = self.tier_models[tier]
+        models = await self.get_available_models()
+        if models and model not in models:
+            model = await self.get_default_model()
+        self._tier_counts[tier] += 1
+        f = decision["features"]
+        print(f"🧭 Model tier: {tier} → {model} ({decision['reason']}; "
+              f"query≈{f['query_tokens']} ctx≈{f['context_tokens']} tok/{f['context_chunks']} chunks, "
+              f"history={f['history_messages']} msgs)")
+        return model
+    
+    def get_tier_counts(self) -> Dict[str, int]:
+        return dict(self._tier_counts)
         
+    @tracing.traced("llm.groq")
     async def chat_completion(
         self, 
         messages: List[Dict[str, Any]], 
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 1024
+        max_tokens: int = 1024,
+        priority: str = "chat"
     ) -> str:
         """
-        Generate chat completion using Groq API
+        Generate chat completion using Groq API.
+        Identical in-flight requests share one upstream call; all calls go
+        through the priority semaphore and rate buckets, with backoff on 429/5xx.
         """
         try:
             # Get the model to use (dynamic or provided)
             model_to_use = model or await self.get_default_model()
             
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(
-                    model=model_to_use,
-                    messages=messages,  # type: ignore
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-            )
+            key = self._request_key(model_to_use, messages, temperature, max_tokens)
+            shared = self._in_flight.get(key)
+            if shared is not None:
+                self._stats["coalesced"] += 1
+                return await asyncio.shield(shared)
             
-            return response.choices[0].message.content or ""
+            task = asyncio.ensure_future(
+                self._limited_completion(model_to_use, messages, temperature, max_tokens, priority)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            return await asyncio.shield(task)
             
         except Exception as e:
             raise Exception(f"Groq API error: {str(e)}")
     
+    @staticmethod
+    def _request_key(model: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def _limited_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        priority: str
+    ) -> str:
+        """
+        Run one upstream completion under the rate buckets and concurrency limit.
+        The buckets are waited on and retries back off without holding a slot,
+        so queued low-priority work can't keep chat out during 429 storms.
+        """
+        # Rough token estimate (~4 chars/token) plus the completion budget
+        estimated_tokens = sum(len(str(m.get("content", ""))) for m in messages) / 4 + max_tokens
+        
+        rank = PRIORITIES.get(priority, PRIORITY_CHAT)
+        attempt = 0
+        while True:
+            await self._request_bucket.acquire(1, rank)
+            await self._token_bucket.acquire(estimated_tokens, rank)
+            self._stats["calls"] += 1
+            try:
+                response = await self._run_in_slot(
+                    rank,
+                    lambda: self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,  # type: ignore
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+                )
+                self.prompt_cache.record(getattr(response, "usage", None))
+                return response.choices[0].message.content or ""
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= GROQ_MAX_RETRIES:
+                    self._stats["errors"] += 1
+                    raise
+                delay = min(GROQ_BACKOFF_MAX_SECONDS, GROQ_BACKOFF_BASE_SECONDS * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)  # jitter so retries don't re-synchronise
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if isinstance(e, APIStatusError) and e.status_code == 429:
+                    self._stats["rate_limited"] += 1
+                    # Everyone waits out the Retry-After, not just this caller
+                    self._request_bucket.pause(delay)
+                attempt += 1
+                self._stats["retries"] += 1
+                print(f"⚠️ Groq call failed ({e}); retry {attempt}/{GROQ_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def _run_in_slot(self, priority: int, fn):
+        """
+        Run fn on the SDK thread pool while holding a concurrency slot.
+        The slot is released when the thread finishes, not when the caller
+        stops waiting: a cancelled hedge loser keeps counting as in flight
+        until its upstream call has actually ended.
+        """
+        await self._semaphore.acquire(priority)
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(fn)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(lambda _: self._release_slot(loop))
+        return await asyncio.wrap_future(future)
+    
+    def _release_slot(self, loop: asyncio.AbstractEventLoop):
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+    
+    def get_limiter_stats(self) -> Dict[str, Any]:
+        """
+        Coalescing / concurrency counters for the admin panel
+        """
+        return {
+            **self._stats,
+            "in_flight": self._semaphore.active,
+            "waiting": self._semaphore.waiting,
+            "rate_waiting": self._request_bucket.waiting + self._token_bucket.waiting,
+            "unique_in_flight_prompts": len(self._in_flight),
+            "max_concurrency": GROQ_MAX_CONCURRENCY,
+            "requests_per_minute": GROQ_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": GROQ_TOKENS_PER_MINUTE,
+        }
+    
     async def generate_educational_response(
         self,
         query: str,
@@ -111,8 +415,29 @@ class GroqService:
         """
         Generate educational response with context and subject-specific formatting
         """
-        # Build the system prompt for educational context
-        system_prompt = self._build_educational_system_prompt(subject, eli5_mode)
+        messages = self.build_educational_messages(query, context, subject, eli5_mode, chat_history)
+        model = await self.select_model(query, context, chat_history, eli5_mode)
+        
+        return await self.chat_completion(
+            messages=messages,
+            model=model,
+            temperature=0.7 if not eli5_mode else 0.8,
+            max_tokens=1500
+        )
+    
+    def build_educational_messages(
+        self,
+        query: str,
+        context: str = "",
+        subject: str = "General",
+        eli5_mode: bool = False,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the system / history / user messages for an educational response
+        """
+        # Precomputed system prompt: static prefix first so provider prompt caching can reuse it
+        system_prompt = educational_system_prompt(subject, eli5_mode)
         
         # Build messages array
         messages = [{"role": "system", "content": system_prompt}]
@@ -127,85 +452,10 @@ class GroqService:
                     })
         
         # Add current query with context
-        user_message = self._format_user_message(query, context)
+        user_message = format_user_message(query, context)
         messages.append({"role": "user", "content": user_message})
         
-        return await self.chat_completion(
-            messages=messages,
-            temperature=0.7 if not eli5_mode else 0.8,
-            max_tokens=1500
-        )
-    
-    def _build_educational_system_prompt(self, subject: str, eli5_mode: bool) -> str:
-        """
-        Build system prompt for educational chatbot
-        """
-        base_prompt = f"""You are an educational AI assistant for VoxTech Learning Platform, designed to teach 10th grade students about {subject}.
-
-Your role is to provide clear, educational responses as a patient teacher who explains concepts step-by-step.
-
-TEACHING STYLE FOR 10TH GRADERS:
-- Explain concepts as if you're a friendly teacher in a classroom
-- Break down complex ideas into simple, easy-to-understand steps
-- Use encouraging language and relatable examples
-- Start with basic concepts before moving to advanced ones
-- Ask rhetorical questions to engage thinking: "Now, why do you think this works?"
-- Use phrases like "Let's think about this together" or "Here's a helpful way to remember this"
-
-FORMATTING REQUIREMENTS:
-- Use clear paragraphs separated by double line breaks
-- Use bullet points (•) for step-by-step explanations
-- Use **bold text** for key vocabulary and important concepts
-- Structure responses like a mini-lesson with clear sections
-- Always end with an encouraging note or summary
-
-RESPONSE STRUCTURE:
-**Introduction**
-Brief, encouraging explanation of what we're going to learn.
-
-**Key Concepts:**
-• Important point 1 with clear explanation
-• Important point 2 with clear explanation
-• Important point 3 with clear explanation
-
-**Step-by-Step Example:**
-Walk through a problem or concept step by step.
-
-**Summary**
-Encouraging wrap-up that reinforces learning.
-
-You are a helpful educational teacher who can explain any topic clearly and thoroughly."""
-        
-        if eli5_mode:
-            base_prompt += """
-        
-        IMPORTANT: ELI5 MODE is ON. Explain everything as if talking to a 5-year-old:
-        - Use very simple words and short sentences
-        - Use fun analogies and comparisons to everyday objects
-        - Be extra patient and encouraging
-        - Avoid technical jargon completely
-        - Use emojis to make it more engaging
-        - Still maintain proper formatting with line breaks and structure
-        """
-        
-        return base_prompt
-    
-    def _format_user_message(self, query: str, context: str) -> str:
-        """
-        Format user message with context if available
-        """
-        if context.strip():
-            return f"""I have some relevant information from my knowledge base:
-
-{context}
-
-Please answer this question as a teacher for 10th grade students: {query}
-
-Use the provided information if relevant, but feel free to expand with additional teaching points to help explain the concept thoroughly."""
-        else:
-            return f"""Please answer this question as a teacher for 10th grade students: {query}
-
-Explain the concept clearly and thoroughly to help them understand."""
+        return messages
     
     async def health_check(self) -> bool:
         """
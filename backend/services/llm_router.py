@@ -0,0 +1,324 @@
+"""
+LLM Router — provider-agnostic front for GroqService / OpenAIService.
+- Same chat_completion / generate_educational_response interface as the services
+- Rolling p50/p95 latency and error rate per provider + model
+- Hedging: a slow request is duplicated onto the next provider after a deadline
+- Circuit breaker: a failing provider is skipped until a cool-down trial succeeds
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import List, Dict, Optional, Any, Tuple
+
+from services import metrics
+
+# ─── Config ──────────────────────────────────────────────────────────────────
+
+# Samples kept per provider/model for the rolling latency / error stats
+LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+# Hedge deadline: the p95 of the primary's model, clamped to [min, max].  Until
+# that model has enough samples the default deadline is used.
+HEDGE_DEFAULT_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "6"))
+HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "2"))
+HEDGE_MAX_SECONDS = float(os.getenv("LLM_HEDGE_MAX_SECONDS", "15"))
+HEDGE_MIN_SAMPLES = 20
+
+# Priorities that may be hedged.  Quiz generation (2048-token completions) is
+# routinely slower than the chat deadline and would almost always be paid twice;
+# it still fails over on errors.
+HEDGE_PRIORITIES = {p.strip() for p in os.getenv("LLM_HEDGE_PRIORITIES", "chat").split(",") if p.strip()}
+
+# Circuit breaker
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class _LatencyWindow:
+    """Last N (latency, ok) samples for one provider/model."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=size)
+        self.total_calls = 0
+        self.total_errors = 0
+
+    def record(self, seconds: float, ok: bool):
+        self._samples.append((seconds, ok))
+        self.total_calls += 1
+        if not ok:
+            self.total_errors += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(s for s, ok in self._samples if ok)
+        if not latencies:
+            return None
+        idx = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[idx]
+
+    def error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def summary(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "samples": len(self._samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "total_calls": self.total_calls,
+            "total_errors": self.total_errors,
+        }
+
+
+class _CircuitBreaker:
+    """closed → open after N consecutive failures → half-open trial after cool-down."""
+
+    def __init__(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < BREAKER_COOLDOWN_SECONDS:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+        # half-open: let exactly one trial request through
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            if self.state != "open":
+                print(f"⚠️ LLM circuit opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """A hedged request was cancelled: neither success nor failure."""
+        self._trial_in_flight = False
+
+
+class _Provider:
+    def __init__(self, name: str, service: Any):
+        self.name = name
+        self.service = service
+        self.breaker = _CircuitBreaker()
+
+
+class LLMRouter:
+    def __init__(self, providers: List[Tuple[str, Any]]):
+        """
+        providers: [(name, service), ...] in order of preference.
+        Each service must provide chat_completion, get_default_model,
+        select_model, build_educational_messages and a tier_models mapping
+        (GroqService / OpenAIService do).
+        """
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = [_Provider(name, service) for name, service in providers]
+        self._windows: Dict[str, _LatencyWindow] = {}
+        self._hedges = 0
+        self._fallback_wins = 0
+        self._failovers = 0
+
+    # ── public interface (mirrors GroqService / OpenAIService) ──
+
+    async def get_default_model(self) -> str:
+        return await self.providers[0].service.get_default_model()
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        priority: str = "chat"
+    ) -> str:
+        """
+        Route a chat completion to the best available provider, hedging onto
+        the next one if the first is slower than its usual p95 (HEDGE_PRIORITIES only).
+        `model` applies to the preferred provider; others use their default.
+        """
+        kwargs = {"temperature": temperature, "max_tokens": max_tokens, "priority": priority}
+        remaining = list(self.providers)
+        pending: Dict[asyncio.Task, _Provider] = {}
+        last_error: Optional[Exception] = None
+
+        def start_next(requested_model: Optional[str] = None) -> bool:
+            # Breakers are consulted only when a provider is actually about to be used
+            while remaining:
+                provider = remaining.pop(0)
+                if provider.breaker.allow():
+                    provider_model = requested_model if provider is self.providers[0] else None
+                    task = asyncio.ensure_future(self._call(provider, messages, provider_model, kwargs))
+                    pending[task] = provider
+                    return True
+            return False
+
+        if not start_next(model):
+            raise Exception("All LLM providers are unavailable (circuit open)")
+        first = next(iter(pending.values()))
+        hedge = priority in HEDGE_PRIORITIES
+        first_model = None
+        if hedge and remaining:
+            # The deadline follows the model actually asked for (fast and quality tiers differ a lot)
+            first_model = (model if first is self.providers[0] else None) or await first.service.get_default_model()
+
+        try:
+            while pending:
+                deadline = self._hedge_deadline(first, first_model) if remaining and hedge else None
+                done, _ = await asyncio.wait(
+                    list(pending), timeout=deadline, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Deadline passed with nothing back: hedge onto the next provider
+                    if start_next():
+                        self._hedges += 1
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if provider is not first:
+                        self._fallback_wins += 1
+                    return result
+                # Everything that finished failed: fail over if nothing else is running
+                if not pending and start_next():
+                    self._failovers += 1
+        finally:
+            for task, provider in pending.items():
+                task.cancel()
+                provider.breaker.record_abandoned()
+
+        raise last_error or Exception("All LLM providers are unavailable (circuit open)")
+
+    async def generate_educational_response(
+        self,
+        query: str,
+        context: str = "",
+        subject: str = "General",
+        eli5_mode: bool = False,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """
+        Generate educational response with context and subject-specific formatting
+        """
+        primary = self.providers[0].service
+        messages = primary.build_educational_messages(query, context, subject, eli5_mode, chat_history)
+        model = await primary.select_model(query, context, chat_history, eli5_mode)
+        return await self.chat_completion(
+            messages=messages,
+            model=model,
+            temperature=0.7 if not eli5_mode else 0.8,
+            max_tokens=1500
+        )
+
+    async def health_check(self) -> bool:
+        results = await asyncio.gather(
+            *[p.service.health_check() for p in self.providers], return_exceptions=True
+        )
+        return any(r is True for r in results)
+
+    def stats(self) -> Dict[str, Any]:
+        """Rolling latency / error stats per provider and model, plus breaker state."""
+        return {
+            "providers": [
+                {
+                    "name": p.name,
+                    "circuit": p.breaker.state,
+                    "consecutive_failures": p.breaker.consecutive_failures,
+                }
+                for p in self.providers
+            ],
+            "models": {key: window.summary() for key, window in self._windows.items()},
+            "tiers": self._tier_stats(),
+            "prompt_cache": {
+                p.name: p.service.prompt_cache.summary()
+                for p in self.providers if hasattr(p.service, "prompt_cache")
+            },
+            "hedged_requests": self._hedges,
+            "fallback_wins": self._fallback_wins,
+            "failovers": self._failovers,
+        }
+
+    # ── internals ──
+
+    def _tier_stats(self) -> Dict[str, Any]:
+        """Latency per model tier, so the fast/quality split can be compared."""
+        tiers: Dict[str, Any] = {}
+        for p in self.providers:
+            for tier, model in getattr(p.service, "tier_models", {}).items():
+                window = self._windows.get(f"{p.name}:{model}")
+                tiers[f"{p.name}:{tier}"] = {
+                    "model": model,
+                    **(window.summary() if window else _LatencyWindow().summary()),
+                }
+        return tiers
+
+    def _window(self, provider: str, model: str) -> _LatencyWindow:
+        key = f"{provider}:{model}"
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _LatencyWindow()
+        return window
+
+    def _hedge_deadline(self, provider: _Provider, model: str) -> float:
+        """How long to wait on the primary's model before duplicating the request."""
+        window = self._window(provider.name, model)
+        p95 = window.percentile(95) if len(window) >= HEDGE_MIN_SAMPLES else None
+        if p95 is None:
+            return HEDGE_DEFAULT_SECONDS
+        return min(HEDGE_MAX_SECONDS, max(HEDGE_MIN_SECONDS, p95))
+
+    async def _call(
+        self,
+        provider: _Provider,
+        messages: List[Dict[str, Any]],
+        model: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> str:
+        model_to_use = model or await provider.service.get_default_model()
+        window = self._window(provider.name, model_to_use)
+        start = time.monotonic()
+        try:
+            result = await provider.service.chat_completion(messages, model=model_to_use, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            elapsed = time.monotonic() - start
+            window.record(elapsed, ok=False)
+            metrics.LLM_CALLS.inc(provider.name, model_to_use, "error")
+            metrics.LLM_LATENCY.observe(elapsed, provider.name)
+            provider.breaker.record_failure()
+            raise
+        elapsed = time.monotonic() - start
+        window.record(elapsed, ok=True)
+        metrics.LLM_CALLS.inc(provider.name, model_to_use, "ok")
+        metrics.LLM_LATENCY.observe(elapsed, provider.name)
+        provider.breaker.record_success()
+        return result
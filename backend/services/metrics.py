@@ -0,0 +1,240 @@
+"""
+Metrics — in-process counters and latency histograms, exported as Prometheus text.
+
+- Fixed-bucket histograms (log-spaced, 1ms … 60s) keyed by label values, so
+  p50 / p95 / p99 can be estimated without keeping samples
+- Counters for LLM calls, embedding calls, cache lookups and request counts
+- DB time: `with metrics.db_timer("operation"):` around the hot queries
+- Chat pipeline stage latency, fed by services.tracing spans
+
+Everything is per process: with several uvicorn workers each exposes its own
+series on /metrics (Prometheus sums them); the admin panel shows the worker
+that served the request.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ─── Config ──────────────────────────────────────────────────────────────────
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implicit
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.035, 0.05, 0.075,
+    0.1, 0.15, 0.25, 0.35, 0.5, 0.75, 1.0, 1.5, 2.5, 3.5, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0,
+)
+
+# Route label for requests that matched no route (keeps 404 scans from
+# creating one series per probed path)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ─── Metric types ────────────────────────────────────────────────────────────
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label set.  Percentiles are interpolated
+    linearly inside the bucket that holds the rank (as histogram_quantile does),
+    so they are accurate to the bucket resolution.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last = +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], tuple]:
+        """{labels: (bucket counts, sum, count)}"""
+        with self._lock:
+            return {labels: (list(s[0]), s[1], s[2]) for labels, s in self._series.items()}
+
+    def merged(self, match: Optional[Callable[[Dict[str, str]], bool]] = None) -> tuple:
+        """(bucket counts, sum, count) summed over the label sets `match` accepts."""
+        counts, total, n = [0] * (len(self.buckets) + 1), 0.0, 0
+        for labels, (bucket_counts, s, c) in self.snapshot().items():
+            if match is not None and not match(dict(zip(self.labelnames, labels))):
+                continue
+            counts = [a + b for a, b in zip(counts, bucket_counts)]
+            total += s
+            n += c
+        return counts, total, n
+
+    def quantile(self, q: float, counts: List[int]) -> Optional[float]:
+        n = sum(counts)
+        if not n:
+            return None
+        rank = q * n
+        cumulative = 0
+        for i, c in enumerate(counts):
+            if cumulative + c >= rank and c:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # +Inf bucket: best known bound
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / c
+            cumulative += c
+        return self.buckets[-1]
+
+    def summary(self, match: Optional[Callable[[Dict[str, str]], bool]] = None,
+                percentiles: Tuple[int, ...] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+        """count, avg and pN in milliseconds over the matching series."""
+        counts, total, n = self.merged(match)
+        result: Dict[str, Optional[float]] = {
+            "count": n,
+            "avg_ms": round(total / n * 1000, 1) if n else None,
+        }
+        for p in percentiles:
+            value = self.quantile(p / 100, counts)
+            result[f"p{p}_ms"] = round(value * 1000, 1) if value is not None else None
+        return result
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, n) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, c in zip((*self.buckets, math.inf), counts):
+                cumulative += c
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {n}")
+        return lines
+
+
+# ─── Registry ────────────────────────────────────────────────────────────────
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, method, status class and role.",
+    ("route", "method", "status", "role"),
+)
+LLM_CALLS = Counter("llm_calls_total", "LLM completion calls by provider, model and outcome.",
+                    ("provider", "model", "outcome"))
+LLM_LATENCY = Histogram("llm_call_duration_seconds", "LLM completion latency by provider.", ("provider",))
+EMBEDDING_CALLS = Counter("embedding_calls_total", "Embedding batches by backend.", ("backend",))
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Texts embedded by backend.", ("backend",))
+EMBEDDING_LATENCY = Histogram("embedding_duration_seconds", "Embedding batch latency by backend.", ("backend",))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "In-process cache lookups by cache and result (hit / miss).",
+                        ("cache", "result"))
+STAGE_LATENCY = Histogram("rag_stage_duration_seconds", "Time per traced chat pipeline stage (services.tracing).",
+                          ("stage",))
+DB_TIME = Histogram("db_operation_duration_seconds", "Time spent in instrumented database operations.",
+                    ("operation",))
+
+_REGISTRY = (REQUEST_LATENCY, LLM_CALLS, LLM_LATENCY, EMBEDDING_CALLS, EMBEDDING_TEXTS,
+             EMBEDDING_LATENCY, CACHE_LOOKUPS, STAGE_LATENCY, DB_TIME)
+
+_START_TIME = time.time()
+
+
+def status_class(status: int) -> str:
+    return f"{status // 100}xx" if 100 <= status < 600 else "other"
+
+
+def observe_request(route: str, method: str, status: int, role: str, seconds: float):
+    REQUEST_LATENCY.observe(seconds, route or UNMATCHED_ROUTE, method, status_class(status), role or "anonymous")
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+def db_timer(operation: str):
+    """Context manager adding the block's wall time to db_operation_duration_seconds."""
+    return DB_TIME.time(operation)
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = [
+        "# HELP process_start_time_seconds Start time of the process since unix epoch in seconds.",
+        "# TYPE process_start_time_seconds gauge",
+        f"process_start_time_seconds {_START_TIME}",
+    ]
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def request_latency_summary(top_routes: int = 10) -> Dict[str, object]:
+    """
+    Overall API latency percentiles plus the busiest routes, for the admin
+    panel (this worker, since start).
+    """
+    api = lambda labels: labels["route"].startswith("/api/")  # noqa: E731
+    routes: Dict[str, int] = {}
+    for labels, (_, _, n) in REQUEST_LATENCY.snapshot().items():
+        if labels[0].startswith("/api/"):
+            routes[labels[0]] = routes.get(labels[0], 0) + n
+    busiest = sorted(routes, key=routes.get, reverse=True)[:top_routes]
+    return {
+        "overall": REQUEST_LATENCY.summary(api),
+        "routes": {route: REQUEST_LATENCY.summary(lambda labels, r=route: labels["route"] == r)
+                   for route in busiest},
+        "uptime_s": round(time.time() - _START_TIME),
+    }
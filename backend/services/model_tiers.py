@@ -0,0 +1,70 @@
+"""
+Model tier policy — decide whether a chat turn needs the big model.
+
+Uses only cheap local features (approximate token counts of the query,
+retrieved context and chat history) so the decision costs microseconds:
+- "fast"    → small model (e.g. llama-3.1-8b-instant): greetings, thanks,
+              short lookups, ELI5 follow-ups
+- "quality" → large model (e.g. llama-3.3-70b-versatile): long questions,
+              multi-chunk retrieved context, long conversations
+"""
+
+import os
+import re
+from typing import List, Dict, Optional, Any
+
+FAST_TIER = "fast"
+QUALITY_TIER = "quality"
+
+# Thresholds (approximate tokens, ~4 characters per token)
+SHORT_QUERY_TOKENS = int(os.getenv("TIER_SHORT_QUERY_TOKENS", "24"))
+SINGLE_CHUNK_CONTEXT_TOKENS = int(os.getenv("TIER_SINGLE_CHUNK_CONTEXT_TOKENS", "200"))
+LONG_HISTORY_TOKENS = int(os.getenv("TIER_LONG_HISTORY_TOKENS", "800"))
+
+# RAGEngine numbers each retrieved chunk / web result as "1. ...", "2. ..."
+_CHUNK_MARKER = re.compile(r"(?:^|\n|\\n)\d+\. ")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def query_features(
+    query: str,
+    context: str = "",
+    chat_history: Optional[List[Dict[str, Any]]] = None,
+    eli5_mode: bool = False
+) -> Dict[str, Any]:
+    history = [m for m in (chat_history or []) if m.get("role") in ("user", "assistant")]
+    return {
+        "query_tokens": estimate_tokens(query),
+        "context_tokens": estimate_tokens(context),
+        "context_chunks": len(_CHUNK_MARKER.findall(context)),
+        "history_messages": len(history),
+        "history_tokens": sum(estimate_tokens(str(m.get("content", ""))) for m in history[-5:]),
+        "eli5_mode": eli5_mode,
+    }
+
+
+def choose_tier(
+    query: str,
+    context: str = "",
+    chat_history: Optional[List[Dict[str, Any]]] = None,
+    eli5_mode: bool = False
+) -> Dict[str, Any]:
+    """Returns {"tier", "reason", "features"}."""
+    f = query_features(query, context, chat_history, eli5_mode)
+
+    # chat_history includes the current user turn, so > 1 means a follow-up
+    if eli5_mode and f["history_messages"] > 1:
+        tier, reason = FAST_TIER, "ELI5 follow-up"
+    elif f["context_chunks"] > 1 or f["context_tokens"] > SINGLE_CHUNK_CONTEXT_TOKENS:
+        tier, reason = QUALITY_TIER, "multi-chunk context"
+    elif f["query_tokens"] > SHORT_QUERY_TOKENS:
+        tier, reason = QUALITY_TIER, "long query"
+    elif f["history_tokens"] > LONG_HISTORY_TOKENS:
+        tier, reason = QUALITY_TIER, "long conversation"
+    else:
+        tier, reason = FAST_TIER, "short query"
+
+    return {"tier": tier, "reason": reason, "features": f}
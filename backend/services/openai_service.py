@@ -3,6 +3,9 @@ import os
 from openai import AsyncOpenAI
 import asyncio
 from typing import List, Dict, Optional, Any
+from services.model_tiers import choose_tier, FAST_TIER, QUALITY_TIER
+from services.prompts import educational_system_prompt, format_user_message, PromptCacheStats
+from services import tracing
 
 class OpenAIService:
     def __init__(self):
@@ -14,17 +17,43 @@ class OpenAIService:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
         self.client = AsyncOpenAI(api_key=self.api_key)
-        self.default_model = "gpt-4o-mini"  # You can change this to gpt-4 or other OpenAI models
+        self.default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # You can change this to gpt-4 or other OpenAI models
+        self.tier_models = {
+            FAST_TIER: os.getenv("OPENAI_FAST_MODEL", self.default_model),
+            QUALITY_TIER: os.getenv("OPENAI_QUALITY_MODEL", self.default_model),
+        }
+        self.prompt_cache = PromptCacheStats()
         
+    async def get_default_model(self) -> str:
+        """
+        Model used when the caller doesn't pick one
+        """
+        return self.default_model
+    
+    async def select_model(
+        self,
+        query: str,
+        context: str = "",
+        chat_history: Optional[List[Dict[str, Any]]] = None,
+        eli5_mode: bool = False
+    ) -> str:
+        """
+        Pick the fast or quality tier model (same policy as GroqService)
+        """
+        return self.tier_models[choose_tier(query, context, chat_history, eli5_mode)["tier"]]
+        
+    @tracing.traced("llm.openai")
     async def chat_completion(
         self, 
         messages: List[Dict[str, Any]], 
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 1024
+        max_tokens: int = 1024,
+        priority: str = "chat"
     ) -> str:
         """
         Generate chat completion using OpenAI API
+        (priority is accepted for interface parity with GroqService)
         """
         try:
             response = await self.client.chat.completions.create(
@@ -34,6 +63,7 @@ class OpenAIService:
                 max_tokens=max_tokens
             )
             
+            self.prompt_cache.record(getattr(response, "usage", None))
             return response.choices[0].message.content or ""
             
         except Exception as e:
@@ -50,8 +80,29 @@ class OpenAIService:
         """
         Generate educational response with context and subject-specific formatting
         """
-        # Build the system prompt for educational context
-        system_prompt = self._build_educational_system_prompt(subject, eli5_mode)
+        messages = self.build_educational_messages(query, context, subject, eli5_mode, chat_history)
+        model = await self.select_model(query, context, chat_history, eli5_mode)
+        
+        return await self.chat_completion(
+            messages=messages,
+            model=model,
+            temperature=0.7 if not eli5_mode else 0.8,
+            max_tokens=1500
+        )
+    
+    def build_educational_messages(
+        self,
+        query: str,
+        context: str = "",
+        subject: str = "General",
+        eli5_mode: bool = False,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the system / history / user messages for an educational response
+        """
+        # Precomputed system prompt: static prefix first so provider prompt caching can reuse it
+        system_prompt = educational_system_prompt(subject, eli5_mode)
         
         # Build messages array
         messages = [{"role": "system", "content": system_prompt}]
@@ -66,85 +117,10 @@ class OpenAIService:
                     })
         
         # Add current query with context
-        user_message = self._format_user_message(query, context)
+        user_message = format_user_message(query, context)
         messages.append({"role": "user", "content": user_message})
         
-        return await self.chat_completion(
-            messages=messages,
-            temperature=0.7 if not eli5_mode else 0.8,
-            max_tokens=1500
-        )
-    
-    def _build_educational_system_prompt(self, subject: str, eli5_mode: bool) -> str:
-        """
-        Build system prompt for educational chatbot
-        """
-        base_prompt = f"""You are an educational AI assistant for VoxTech Learning Platform, designed to teach 10th grade students about {subject}.
-
-Your role is to provide clear, educational responses as a patient teacher who explains concepts step-by-step.
-
-TEACHING STYLE FOR 10TH GRADERS:
-- Explain concepts as if you're a friendly teacher in a classroom
-- Break down complex ideas into simple, easy-to-understand steps
-- Use encouraging language and relatable examples
-- Start with basic concepts before moving to advanced ones
-- Ask rhetorical questions to engage thinking: "Now, why do you think this works?"
-- Use phrases like "Let's think about this together" or "Here's a helpful way to remember this"
-
-FORMATTING REQUIREMENTS:
-- Use clear paragraphs separated by double line breaks
-- Use bullet points (•) for step-by-step explanations
-- Use **bold text** for key vocabulary and important concepts
-- Structure responses like a mini-lesson with clear sections
-- Always end with an encouraging note or summary
-
-RESPONSE STRUCTURE:
-**Introduction**
-Brief, encouraging explanation of what we're going to learn.
-
-**Key Concepts:**
-• Important point 1 with clear explanation
-• Important point 2 with clear explanation
-• Important point 3 with clear explanation
-
-**Step-by-Step Example:**
-Walk through a problem or concept step by step.
-
-**Summary**
-Encouraging wrap-up that reinforces learning.
-
-You are a helpful educational teacher who can explain any topic clearly and thoroughly."""
-        
-        if eli5_mode:
-            base_prompt += """
-        
-        IMPORTANT: ELI5 MODE is ON. Explain everything as if talking to a 5-year-old:
-        - Use very simple words and short sentences
-        - Use fun analogies and comparisons to everyday objects
-        - Be extra patient and encouraging
-        - Avoid technical jargon completely
-        - Use emojis to make it more engaging
-        - Still maintain proper formatting with line breaks and structure
-        """
-        
-        return base_prompt
-    
-    def _format_user_message(self, query: str, context: str) -> str:
-        """
-        Format user message with context if available
-        """
-        if context.strip():
-            return f"""I have some relevant information from my knowledge base:
-
-{context}
-
-Please answer this question as a teacher for 10th grade students: {query}
-
-Use the provided information if relevant, but feel free to expand with additional teaching points to help explain the concept thoroughly."""
-        else:
-            return f"""Please answer this question as a teacher for 10th grade students: {query}
-
-Explain the concept clearly and thoroughly to help them understand."""
+        return messages
     
     async def health_check(self) -> bool:
         """
@@ -0,0 +1,158 @@
+"""
+Educational chat prompts — built once, shared by GroqService and OpenAIService.
+
+System prompts are laid out static-first so the leading bytes are identical
+for every request (then the ELI5 block, then the subject line).  Providers
+that cache prompt prefixes can then reuse the work across requests; the
+hit rate is tracked by PromptCacheStats from the usage they return.
+"""
+
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, Any
+
+# Subjects the frontend sends: sidebar modules, course categories and the default
+KNOWN_SUBJECTS = (
+    "General",
+    "Compliance", "Compliance Training",
+    "Security", "Security Awareness",
+    "Leadership", "Leadership Development",
+    "Technical", "Technical Skills",
+    "HR & Benefits",
+    "Customer Service", "Customer Relations",
+    "Operations",
+    "Professional Growth",
+)
+
+_STATIC_SYSTEM_PROMPT = """You are an educational AI assistant for VoxTech Learning Platform, designed to teach 10th grade students.
+
+Your role is to provide clear, educational responses as a patient teacher who explains concepts step-by-step.
+
+TEACHING STYLE FOR 10TH GRADERS:
+- Explain concepts as if you're a friendly teacher in a classroom
+- Break down complex ideas into simple, easy-to-understand steps
+- Use encouraging language and relatable examples
+- Start with basic concepts before moving to advanced ones
+- Ask rhetorical questions to engage thinking: "Now, why do you think this works?"
+- Use phrases like "Let's think about this together" or "Here's a helpful way to remember this"
+
+FORMATTING REQUIREMENTS:
+- Use clear paragraphs separated by double line breaks
+- Use bullet points (•) for step-by-step explanations
+- Use **bold text** for key vocabulary and important concepts
+- Structure responses like a mini-lesson with clear sections
+- Always end with an encouraging note or summary
+
+RESPONSE STRUCTURE:
+**Introduction**
+Brief, encouraging explanation of what we're going to learn.
+
+**Key Concepts:**
+• Important point 1 with clear explanation
+• Important point 2 with clear explanation
+• Important point 3 with clear explanation
+
+**Step-by-Step Example:**
+Walk through a problem or concept step by step.
+
+**Summary**
+Encouraging wrap-up that reinforces learning.
+
+You are a helpful educational teacher who can explain any topic clearly and thoroughly."""
+
+_ELI5_BLOCK = """
+
+IMPORTANT: ELI5 MODE is ON. Explain everything as if talking to a 5-year-old:
+- Use very simple words and short sentences
+- Use fun analogies and comparisons to everyday objects
+- Be extra patient and encouraging
+- Avoid technical jargon completely
+- Use emojis to make it more engaging
+- Still maintain proper formatting with line breaks and structure"""
+
+_SUBJECT_LINE = "\n\nThe subject for this conversation is: {subject}."
+
+
+def _compose_system_prompt(subject: str, eli5_mode: bool) -> str:
+    prompt = _STATIC_SYSTEM_PROMPT
+    if eli5_mode:
+        prompt += _ELI5_BLOCK
+    return sys.intern(prompt + _SUBJECT_LINE.format(subject=subject))
+
+
+# Precomputed at import for every known subject × ELI5 combination
+_SYSTEM_PROMPTS: Dict[tuple, str] = {
+    (subject, eli5): _compose_system_prompt(subject, eli5)
+    for subject in KNOWN_SUBJECTS
+    for eli5 in (False, True)
+}
+
+
+@lru_cache(maxsize=256)
+def _custom_subject_prompt(subject: str, eli5_mode: bool) -> str:
+    return _compose_system_prompt(subject, eli5_mode)
+
+
+def educational_system_prompt(subject: str, eli5_mode: bool) -> str:
+    """
+    Return the (interned) system prompt for a subject / ELI5 combination
+    """
+    prompt = _SYSTEM_PROMPTS.get((subject, eli5_mode))
+    if prompt is None:
+        prompt = _custom_subject_prompt(subject, eli5_mode)
+    return prompt
+
+
+def format_user_message(query: str, context: str) -> str:
+    """
+    Format user message with context if available
+    """
+    if context.strip():
+        return f"""I have some relevant information from my knowledge base:
+
+{context}
+
+Please answer this question as a teacher for 10th grade students: {query}
+
+Use the provided information if relevant, but feel free to expand with additional teaching points to help explain the concept thoroughly."""
+    else:
+        return f"""Please answer this question as a teacher for 10th grade students: {query}
+
+Explain the concept clearly and thoroughly to help them understand."""
+
+
+# ─── Prefix-cache reporting ──────────────────────────────────────────────────
+
+class PromptCacheStats:
+    """Accumulates prompt / cached-prompt token counts reported by a provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.responses_with_cache_info = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage: Any):
+        """Record a response's `usage` object (OpenAI-compatible shape)."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        with self._lock:
+            self.responses += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            if cached is not None:
+                self.responses_with_cache_info += 1
+                self.cached_tokens += cached
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "responses_with_cache_info": self.responses_with_cache_info,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_tokens,
+                "prefix_cache_hit_rate": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            }
@@ -10,8 +10,10 @@ import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
+from services import reporting_rollups
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db")
+
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db"))
 
 
 def get_db():
@@ -65,6 +67,10 @@ def init_quiz_tables():
             time_spent_seconds INTEGER DEFAULT 0,
             FOREIGN KEY (quiz_id) REFERENCES quizzes(id) ON DELETE CASCADE
         );
+        -- Newest-first scans (score export) without sorting the whole table
+        CREATE INDEX IF NOT EXISTS idx_quiz_attempts_completed ON quiz_attempts(completed_at);
+        -- Per-course score percentiles by seeking to a rank (reporting)
+        CREATE INDEX IF NOT EXISTS idx_quiz_attempts_course_score ON quiz_attempts(course_id, score);
 
         CREATE TABLE IF NOT EXISTS certificates (
             id TEXT PRIMARY KEY,
@@ -763,6 +769,7 @@ def grade_quiz(quiz_id: str, user_id: str, answers: Dict[str, str], time_spent:
         round(percentage, 1), 1 if passed else 0,
         now, now, time_spent
     ))
+    reporting_rollups.record_quiz_attempt(conn, user_id, quiz["course_id"], earned_points, passed, now)
 
     # If passed, generate certificate
     certificate = None
@@ -1,16 +1,18 @@
 # Updated: Dynamic model support
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import asyncio
 from services.groq_service import GroqService
+from services.llm_router import LLMRouter
 from services.vector_store import VectorStore
 from services.web_search import WebSearchService
 
 class RAGEngine:
-    def __init__(self, groq_service: GroqService, vector_store: VectorStore, web_search: WebSearchService):
+    def __init__(self, llm_service: Union[LLMRouter, GroqService], vector_store: VectorStore, web_search: WebSearchService):
         """
-        Initialize RAG engine with required services
+        Initialize RAG engine with required services.
+        llm_service is usually an LLMRouter; a bare GroqService also works.
         """
-        self.groq_service = groq_service
+        self.llm_service = llm_service
         self.vector_store = vector_store
         self.web_search = web_search
         
@@ -42,8 +44,8 @@ class RAGEngine:
             # Step 3: Build context from chunks and web results
             context = await self._build_context(relevant_chunks, web_results, query)
             
-            # Step 4: Generate response using Groq
-            response = await self.groq_service.generate_educational_response(
+            # Step 4: Generate response using the LLM router
+            response = await self.llm_service.generate_educational_response(
                 query=query,
                 context=context['text'],
                 subject=subject or "General",
@@ -60,7 +62,7 @@ class RAGEngine:
         except Exception as e:
             # Fallback to direct response without context
             try:
-                response = await self.groq_service.generate_educational_response(
+                response = await self.llm_service.generate_educational_response(
                     query=query,
                     context="",
                     subject=subject or "General",
@@ -210,7 +212,7 @@ class RAGEngine:
             'type': 'follow_up'
         }
         
-        response = await self.groq_service.generate_educational_response(
+        response = await self.llm_service.generate_educational_response(
             query=query,
             context=context['text'],
             subject="General",
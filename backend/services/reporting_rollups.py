@@ -0,0 +1,248 @@
+"""
+Reporting Rollups — incrementally maintained counters behind the dashboards.
+
+The write paths that change reportable data update these tables on their own
+connection, inside their own transaction:
+  - course_manager.enroll_user            → enrolled (first enrollment per user/course)
+  - course_manager.update_module_progress → completed (when a course flips to/from completed)
+  - quiz_manager.grade_quiz               → attempts, scores, passes, histogram bucket
+  - auth_service.update_user              → moves a user's counters between departments
+
+Tables (all keyed, so dashboards read O(rows returned)):
+  rollup_user_stats        per user
+  rollup_course_stats      per course (+ min/max score)
+  rollup_department_stats  per department (also the source of the global totals)
+  rollup_score_buckets     10-point score histogram
+
+Enrollment counts are distinct (user, course) pairs, as in the per-user
+overview. rebuild_rollups() recomputes everything from the raw tables — run
+backend/rebuild_reporting_rollups.py after editing enrollments or attempts
+with raw SQL. The first dashboard read on a database without rollups builds them.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db"))
+
+HISTOGRAM_BUCKETS = 10
+
+# Counter columns shared by the user / course / department tables
+_COUNTERS = ("enrolled", "completed", "attempts", "scored", "score_sum", "passed")
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _init_tables():
+    conn = get_db()
+    counters = ",\n".join(f"            {c} {'REAL' if c == 'score_sum' else 'INTEGER'} NOT NULL DEFAULT 0"
+                          for c in _COUNTERS)
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS rollup_user_stats (
+            user_id TEXT PRIMARY KEY,
+{counters},
+            last_activity TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_course_stats (
+            course_id TEXT PRIMARY KEY,
+{counters},
+            min_score REAL,
+            max_score REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_department_stats (
+            department TEXT PRIMARY KEY,
+{counters}
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_score_buckets (
+            bucket INTEGER PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            passed INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- One row once the rollups have been built from the raw tables
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            built_at TEXT NOT NULL
+        );
+    """)
+    conn.commit()
+    conn.close()
+
+
+_init_tables()
+
+
+# ─── Incremental updates (caller's connection, caller commits) ───────────────
+
+def _bump(conn, table: str, key_column: str, key: str, deltas: Dict[str, float]):
+    columns = ", ".join(deltas)
+    placeholders = ", ".join("?" for _ in deltas)
+    assignments = ", ".join(f"{c} = {c} + excluded.{c}" for c in deltas)
+    conn.execute(
+        f"""INSERT INTO {table} ({key_column}, {columns}) VALUES (?, {placeholders})
+            ON CONFLICT({key_column}) DO UPDATE SET {assignments}""",
+        (key, *deltas.values()),
+    )
+
+
+def _department_of(conn, user_id: str) -> str:
+    row = conn.execute("SELECT department FROM users WHERE id = ?", (user_id,)).fetchone()
+    return (row[0] or "") if row else ""
+
+
+def _bump_all(conn, user_id: str, course_id: str, deltas: Dict[str, float]):
+    _bump(conn, "rollup_user_stats", "user_id", user_id, deltas)
+    _bump(conn, "rollup_course_stats", "course_id", course_id, deltas)
+    _bump(conn, "rollup_department_stats", "department", _department_of(conn, user_id), deltas)
+
+
+def score_bucket(score: Optional[float]) -> int:
+    """Histogram bucket (0..9) for a score, as in get_score_distribution."""
+    return max(0, min(int((score or 0) // 10), HISTOGRAM_BUCKETS - 1))
+
+
+def record_enrollment(conn, user_id: str, course_id: str):
+    """Call after inserting the first enrollment row for this (user, course) pair."""
+    _bump_all(conn, user_id, course_id, {"enrolled": 1})
+
+
+def record_completion_change(conn, user_id: str, course_id: str, was_completed: bool, is_completed: bool):
+    """Call when an enrollment's status moves to or away from 'completed'."""
+    if was_completed != is_completed:
+        _bump_all(conn, user_id, course_id, {"completed": 1 if is_completed else -1})
+
+
+def record_quiz_attempt(conn, user_id: str, course_id: str, score: Optional[float],
+                        passed: bool, completed_at: Optional[str]):
+    """Call after inserting a quiz_attempts row."""
+    deltas = {
+        "attempts": 1,
+        "scored": 0 if score is None else 1,
+        "score_sum": score or 0,
+        "passed": 1 if passed else 0,
+    }
+    _bump_all(conn, user_id, course_id, deltas)
+    conn.execute("""
+        UPDATE rollup_user_stats
+        SET last_activity = CASE WHEN ? > COALESCE(last_activity, '') THEN ? ELSE last_activity END
+        WHERE user_id = ?
+    """, (completed_at, completed_at, user_id))
+    if score is not None:
+        conn.execute("""
+            UPDATE rollup_course_stats
+            SET min_score = CASE WHEN min_score IS NULL OR ? < min_score THEN ? ELSE min_score END,
+                max_score = CASE WHEN max_score IS NULL OR ? > max_score THEN ? ELSE max_score END
+            WHERE course_id = ?
+        """, (score, score, score, score, course_id))
+    _bump(conn, "rollup_score_buckets", "bucket", score_bucket(score),
+          {"attempts": 1, "passed": 1 if passed else 0})
+
+
+def move_user_department(conn, user_id: str, old_department: Optional[str], new_department: Optional[str]):
+    """Call when a user's department changes: their counters follow them."""
+    old_department, new_department = old_department or "", new_department or ""
+    if old_department == new_department:
+        return
+    row = conn.execute(
+        f"SELECT {', '.join(_COUNTERS)} FROM rollup_user_stats WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if not row:
+        return
+    counts = dict(zip(_COUNTERS, row))
+    _bump(conn, "rollup_department_stats", "department", old_department, {c: -v for c, v in counts.items()})
+    _bump(conn, "rollup_department_stats", "department", new_department, counts)
+
+
+# ─── Backfill ────────────────────────────────────────────────────────────────
+
+# (user_id, course_id, department, completed) per distinct enrollment pair
+_PAIRS = """
+    SELECT e.user_id, e.course_id, COALESCE(u.department, '') AS department,
+           MAX(CASE WHEN e.status = 'completed' THEN 1 ELSE 0 END) AS done
+    FROM enrollments e LEFT JOIN users u ON u.id = e.user_id
+    GROUP BY e.user_id, e.course_id
+"""
+
+_ATTEMPTS = """
+    SELECT qa.user_id, qa.course_id, COALESCE(u.department, '') AS department,
+           qa.score, CASE WHEN qa.passed THEN 1 ELSE 0 END AS passed, qa.completed_at
+    FROM quiz_attempts qa LEFT JOIN users u ON u.id = qa.user_id
+"""
+
+
+_ROLLUP_KEYS = {
+    "rollup_user_stats": "user_id",
+    "rollup_course_stats": "course_id",
+    "rollup_department_stats": "department",
+}
+
+# Per-table columns beyond the shared counters, as aggregates over _ATTEMPTS
+_ATTEMPT_EXTRAS = {
+    "rollup_user_stats": {"last_activity": "MAX(completed_at)"},
+    "rollup_course_stats": {"min_score": "MIN(score)", "max_score": "MAX(score)"},
+}
+
+
+def rebuild_rollups(conn=None) -> Dict[str, int]:
+    """Recompute every rollup table from enrollments / quiz_attempts in one transaction."""
+    close = conn is None
+    if conn is None:
+        conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table in (*_ROLLUP_KEYS, "rollup_score_buckets"):
+            conn.execute(f"DELETE FROM {table}")
+
+        for table, key in _ROLLUP_KEYS.items():
+            conn.execute(f"""
+                INSERT INTO {table} ({key}, enrolled, completed)
+                SELECT {key}, COUNT(*), SUM(done) FROM ({_PAIRS}) GROUP BY {key}
+            """)
+            columns = {"attempts": "COUNT(*)", "scored": "COUNT(score)",
+                       "score_sum": "COALESCE(SUM(score), 0)", "passed": "SUM(passed)",
+                       **_ATTEMPT_EXTRAS.get(table, {})}
+            conn.execute(f"""
+                INSERT INTO {table} ({key}, {', '.join(columns)})
+                SELECT {key}, {', '.join(columns.values())}
+                FROM ({_ATTEMPTS}) WHERE true GROUP BY {key}
+                ON CONFLICT({key}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}
+            """)
+
+        conn.execute(f"""
+            INSERT INTO rollup_score_buckets (bucket, attempts, passed)
+            SELECT MAX(0, MIN(CAST(COALESCE(score, 0) / 10 AS INTEGER), {HISTOGRAM_BUCKETS - 1})) AS bucket,
+                   COUNT(*), SUM(CASE WHEN passed THEN 1 ELSE 0 END)
+            FROM quiz_attempts GROUP BY bucket
+        """)
+        conn.execute(
+            "INSERT OR REPLACE INTO rollup_state (id, built_at) VALUES (1, ?)",
+            (datetime.now(timezone.utc).isoformat(),),
+        )
+        conn.commit()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in (*_ROLLUP_KEYS, "rollup_score_buckets")
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if close:
+            conn.close()
+
+
+def ensure_built(conn):
+    """Backfill the rollups the first time a dashboard reads them on this database."""
+    if conn.execute("SELECT 1 FROM rollup_state WHERE id = 1").fetchone() is None:
+        print("📊 Building reporting rollups from raw enrollments / quiz attempts...")
+        rebuild_rollups(conn)
@@ -7,15 +7,37 @@ import sqlite3
 import os
 import csv
 import io
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import math
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Optional, List, Dict, Any, Iterator
 
+import numpy as np
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db")
+from services import reporting_rollups
 
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc as pa_ipc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = None
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "courses.db"))
+
+
+# Rows fetched per cursor round trip when streaming exports
+STREAM_FETCH_SIZE = 500
+
+# Rows per record batch (and Parquet row group) in columnar exports
+COLUMNAR_BATCH_ROWS = int(os.getenv("REPORT_COLUMNAR_BATCH_ROWS", "65536"))
+
+
+def get_db(check_same_thread: bool = True):
+    # Streaming responses advance their generator from threadpool workers,
+    # so their connection must be usable from whichever thread runs next()
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
@@ -28,52 +50,37 @@ def get_team_overview() -> Dict[str, Any]:
     Returns an overview of all users' training progress:
     - Total users, courses, enrollments, completions
     - Per-user summary (courses enrolled, completed, avg score)
+    - Per-department counters
+    Read from the reporting rollups, so the cost is O(users + departments).
     """
     conn = get_db()
     cur = conn.cursor()
+    reporting_rollups.ensure_built(conn)
 
-    # Total counts
     total_users = cur.execute("SELECT COUNT(*) FROM users WHERE is_active = 1").fetchone()[0]
     total_courses = cur.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
-    total_enrollments = cur.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0]
-    total_completions = cur.execute(
-        "SELECT COUNT(*) FROM enrollments WHERE status = 'completed'"
-    ).fetchone()[0]
 
-    # Per-user summaries
-    rows = cur.execute("""
-        SELECT
-            u.id,
-            u.username,
-            u.name,
-            u.department,
-            u.role,
-            COUNT(DISTINCT e.course_id) AS enrolled,
-            COUNT(DISTINCT CASE WHEN e.status = 'completed' THEN e.course_id END) AS completed,
-            ROUND(AVG(CASE WHEN qa.score IS NOT NULL THEN qa.score END), 1) AS avg_score,
-            MAX(qa.completed_at) AS last_activity
-        FROM users u
-        LEFT JOIN enrollments e ON u.id = e.user_id
-        LEFT JOIN quiz_attempts qa ON u.id = qa.user_id
-        WHERE u.is_active = 1
-        GROUP BY u.id
-        ORDER BY u.name
+    dept_rows = cur.execute("""
+        SELECT department, enrolled, completed, attempts, passed,
+               ROUND(score_sum / NULLIF(scored, 0), 1) AS avg_score
+        FROM rollup_department_stats
+        ORDER BY department
     """).fetchall()
+    total_enrollments = sum(d["enrolled"] for d in dept_rows)
+    total_completions = sum(d["completed"] for d in dept_rows)
 
-    members = []
-    for r in rows:
-        members.append({
-            "user_id": r["id"],
-            "username": r["username"],
-            "name": r["name"] or r["username"],
-            "department": r["department"] or "—",
-            "role": r["role"],
-            "enrolled": r["enrolled"] or 0,
-            "completed": r["completed"] or 0,
-            "avg_score": r["avg_score"] or 0,
-            "last_activity": r["last_activity"] or "—",
-            "completion_rate": round((r["completed"] / r["enrolled"] * 100) if r["enrolled"] else 0, 1),
-        })
+    # Per-user summaries
+    members = [_team_member(r) for r in _team_member_rows(cur).fetchall()]
+
+    departments = [{
+        "department": d["department"] or "—",
+        "enrolled": d["enrolled"],
+        "completed": d["completed"],
+        "completion_rate": round((d["completed"] / d["enrolled"] * 100) if d["enrolled"] else 0, 1),
+        "attempts": d["attempts"],
+        "avg_score": d["avg_score"] or 0,
+        "pass_rate": round((d["passed"] / d["attempts"] * 100) if d["attempts"] else 0, 1),
+    } for d in dept_rows if d["enrolled"] or d["attempts"]]
 
     conn.close()
     return {
@@ -83,218 +90,641 @@ def get_team_overview() -> Dict[str, Any]:
         "total_completions": total_completions,
         "completion_rate": round((total_completions / total_enrollments * 100) if total_enrollments else 0, 1),
         "members": members,
+        "departments": departments,
+    }
+
+
+def _team_member_rows(cur, department: Optional[str] = None):
+    where, params = "u.is_active = 1", []
+    if department:
+        where += " AND u.department = ?"
+        params.append(department)
+    return cur.execute(f"""
+        SELECT
+            u.id, u.username, u.name, u.department, u.role,
+            r.enrolled, r.completed, r.last_activity,
+            ROUND(r.score_sum / NULLIF(r.scored, 0), 1) AS avg_score
+        FROM users u
+        LEFT JOIN rollup_user_stats r ON r.user_id = u.id
+        WHERE {where}
+        ORDER BY u.name
+    """, params)
+
+
+def _team_member(r) -> Dict[str, Any]:
+    enrolled = r["enrolled"] or 0
+    completed = r["completed"] or 0
+    return {
+        "user_id": r["id"],
+        "username": r["username"],
+        "name": r["name"] or r["username"],
+        "department": r["department"] or "—",
+        "role": r["role"],
+        "enrolled": enrolled,
+        "completed": completed,
+        "avg_score": r["avg_score"] or 0,
+        "last_activity": r["last_activity"] or "—",
+        "completion_rate": round((completed / enrolled * 100) if enrolled else 0, 1),
     }
 
 
 # ─── Assessment Score Distribution ───────────────────────────────────────────
 
-def get_score_distribution() -> Dict[str, Any]:
+DEFAULT_BUCKET_WIDTH = 10.0
+SCORE_RANGE_MAX = 100.0  # scores at or above the last edge land in the last bucket
+MIN_BUCKET_WIDTH = 0.1   # at most 1000 buckets
+PERCENTILES = (10, 50, 90)
+
+
+def _bucket_labels(width: float) -> List[str]:
+    count = math.ceil(SCORE_RANGE_MAX / width)
+    return [f"{i * width:g}-{min((i + 1) * width, SCORE_RANGE_MAX):g}" for i in range(count)]
+
+
+def get_score_distribution(bucket_width: float = DEFAULT_BUCKET_WIDTH,
+                           date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
     """
-    Returns score distribution across all quiz attempts:
-    - Histogram buckets (0-10, 10-20, ..., 90-100)
-    - Per-course average scores
+    Returns score distribution across quiz attempts:
+    - Histogram buckets of bucket_width points (0-10, 10-20, ..., 90-100 by default)
+    - Per-course average / min / max scores and p10 / p50 / p90
     - Pass/fail rates
+    Optionally restricted to attempts completed in an inclusive YYYY-MM-DD window
+    (raises ValueError on a bad width or date).
+
+    All-time figures come from the reporting rollups, with percentiles read
+    from idx_quiz_attempts_course_score; a time window is one filtered fetch
+    aggregated with NumPy.
     """
+    if not MIN_BUCKET_WIDTH <= bucket_width <= SCORE_RANGE_MAX:
+        raise ValueError(f"bucket_width must be between {MIN_BUCKET_WIDTH:g} and {SCORE_RANGE_MAX:g}")
+    start, end = parse_date_range(date_from, date_to)
+    labels = _bucket_labels(bucket_width)
+
     conn = get_db()
-    cur = conn.cursor()
+    try:
+        if start or end:
+            counts, passes, per_course = _windowed_score_stats(conn, bucket_width, len(labels), start, end)
+        else:
+            counts, passes = _score_histogram(conn, bucket_width, len(labels))
+            per_course = _course_score_stats(conn)
+    finally:
+        conn.close()
+
+    per_course.sort(key=lambda c: c["avg_score"], reverse=True)
+    total_attempts = sum(counts)
+    pass_count = sum(passes)
+    return {
+        "total_attempts": total_attempts,
+        "pass_count": pass_count,
+        "fail_count": total_attempts - pass_count,
+        "pass_rate": round((pass_count / total_attempts * 100) if total_attempts else 0, 1),
+        "bucket_width": bucket_width,
+        "date_from": date_from,
+        "date_to": date_to,
+        "distribution": dict(zip(labels, counts)),
+        "per_course": per_course,
+    }
 
-    # All scores
-    scores = cur.execute("""
-        SELECT qa.score, qa.passed, COALESCE(c.title, qa.course_id) AS course_title
-        FROM quiz_attempts qa
-        LEFT JOIN courses c ON qa.course_id = c.id
-        ORDER BY qa.completed_at DESC
-    """).fetchall()
 
-    # Histogram: 10-point buckets
-    buckets = {f"{i*10}-{i*10+10}": 0 for i in range(10)}
-    pass_count = 0
-    fail_count = 0
-
-    for s in scores:
-        score = s["score"] or 0
-        bucket_idx = min(int(score // 10), 9)
-        key = f"{bucket_idx*10}-{bucket_idx*10+10}"
-        buckets[key] += 1
-        if s["passed"]:
-            pass_count += 1
-        else:
-            fail_count += 1
+def _course_entry(title: str, attempts: int, avg_score, min_score, max_score,
+                  passed: int, percentiles: List[Optional[float]]) -> Dict[str, Any]:
+    entry = {
+        "course": title,
+        "attempts": attempts,
+        "avg_score": avg_score or 0,
+        "min_score": min_score or 0,
+        "max_score": max_score or 0,
+        "pass_rate": round((passed / attempts * 100) if attempts else 0, 1),
+    }
+    for p, value in zip(PERCENTILES, percentiles):
+        entry[f"p{p}"] = round(value, 1) if value is not None else 0
+    return entry
+
+
+def _score_histogram(conn, width: float, bucket_count: int) -> tuple:
+    """All-time histogram: rollup buckets for the default width, else one aggregate query."""
+    counts, passes = [0] * bucket_count, [0] * bucket_count
+    if width == DEFAULT_BUCKET_WIDTH:
+        reporting_rollups.ensure_built(conn)
+        rows = conn.execute("SELECT bucket, attempts, passed FROM rollup_score_buckets").fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT MIN(MAX(CAST(COALESCE(score, 0) / ? AS INTEGER), 0), ?) AS bucket,
+                   COUNT(*) AS attempts, SUM(CASE WHEN passed THEN 1 ELSE 0 END) AS passed
+            FROM quiz_attempts
+            GROUP BY bucket
+        """, (width, bucket_count - 1)).fetchall()
+    for r in rows:
+        counts[r["bucket"]] += r["attempts"]
+        passes[r["bucket"]] += r["passed"]
+    return counts, passes
+
 
-    # Per-course averages
-    course_scores = cur.execute("""
+def _course_score_stats(conn) -> List[Dict[str, Any]]:
+    """All-time per-course stats from rollup_course_stats, plus percentiles."""
+    reporting_rollups.ensure_built(conn)
+    rows = conn.execute("""
         SELECT
-            COALESCE(c.title, qa.course_id) AS course_title,
-            COUNT(*) AS attempts,
-            ROUND(AVG(qa.score), 1) AS avg_score,
-            ROUND(MIN(qa.score), 1) AS min_score,
-            ROUND(MAX(qa.score), 1) AS max_score,
-            SUM(CASE WHEN qa.passed THEN 1 ELSE 0 END) AS passed_count
+            r.course_id,
+            COALESCE(c.title, r.course_id) AS course_title,
+            r.attempts, r.scored, r.passed,
+            ROUND(r.score_sum / NULLIF(r.scored, 0), 1) AS avg_score,
+            ROUND(r.min_score, 1) AS min_score,
+            ROUND(r.max_score, 1) AS max_score
+        FROM rollup_course_stats r
+        LEFT JOIN courses c ON r.course_id = c.id
+        WHERE r.attempts > 0
+    """).fetchall()
+    return [
+        _course_entry(r["course_title"], r["attempts"], r["avg_score"], r["min_score"], r["max_score"],
+                      r["passed"], [_indexed_percentile(conn, r["course_id"], r["scored"], p) for p in PERCENTILES])
+        for r in rows
+    ]
+
+
+def _indexed_percentile(conn, course_id: str, count: int, pct: float) -> Optional[float]:
+    """
+    Linear-interpolated percentile (same definition as numpy.percentile) of a
+    course's scores: the two neighbouring ranks are read off
+    idx_quiz_attempts_course_score, without loading the scores into Python.
+    """
+    if not count:
+        return None
+    position = (count - 1) * pct / 100
+    lower = int(position)
+    values = [r[0] for r in conn.execute("""
+        SELECT score FROM quiz_attempts
+        WHERE course_id = ? AND score IS NOT NULL
+        ORDER BY score
+        LIMIT 2 OFFSET ?
+    """, (course_id, lower))]
+    if len(values) == 1 or position == lower:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (position - lower)
+
+
+def _windowed_score_stats(conn, width: float, bucket_count: int,
+                          start: Optional[str], end: Optional[str]) -> tuple:
+    """Histogram and per-course stats for attempts completed in [start, end), with NumPy."""
+    where, params = [], []
+    if start:
+        where.append("qa.completed_at >= ?")
+        params.append(start)
+    if end:
+        where.append("qa.completed_at < ?")
+        params.append(end)
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(f"""
+        SELECT qa.course_id, COALESCE(c.title, qa.course_id), qa.score, CASE WHEN qa.passed THEN 1 ELSE 0 END
         FROM quiz_attempts qa
         LEFT JOIN courses c ON qa.course_id = c.id
-        GROUP BY qa.course_id
-        ORDER BY avg_score DESC
-    """).fetchall()
+        WHERE {" AND ".join(where)}
+        ORDER BY qa.course_id
+    """, params).fetchall()
+    if not rows:
+        return [0] * bucket_count, [0] * bucket_count, []
 
-    per_course = []
-    for row in course_scores:
-        per_course.append({
-            "course": row["course_title"],
-            "attempts": row["attempts"],
-            "avg_score": row["avg_score"] or 0,
-            "min_score": row["min_score"] or 0,
-            "max_score": row["max_score"] or 0,
-            "pass_rate": round((row["passed_count"] / row["attempts"] * 100) if row["attempts"] else 0, 1),
-        })
+    course_ids, titles, scores, passed = zip(*rows)
+    scores = np.array(scores, dtype=float)  # None → nan
+    passed = np.array(passed, dtype=np.int64)
 
-    conn.close()
-    return {
-        "total_attempts": len(scores),
-        "pass_count": pass_count,
-        "fail_count": fail_count,
-        "pass_rate": round((pass_count / len(scores) * 100) if scores else 0, 1),
-        "distribution": buckets,
-        "per_course": per_course,
-    }
+    buckets = np.clip(np.floor_divide(np.nan_to_num(scores), width), 0, bucket_count - 1).astype(np.int64)
+    counts = np.bincount(buckets, minlength=bucket_count)
+    passes = np.bincount(buckets, weights=passed, minlength=bucket_count).astype(np.int64)
+
+    per_course = []
+    # Split on course_id (the sort key): courses may share a title
+    boundaries = [0] + [i for i in range(1, len(course_ids)) if course_ids[i] != course_ids[i - 1]] + [len(course_ids)]
+    for lo, hi in zip(boundaries, boundaries[1:]):
+        course_scores = scores[lo:hi]
+        scored = course_scores[~np.isnan(course_scores)]
+        has_scores = scored.size > 0
+        per_course.append(_course_entry(
+            titles[lo], hi - lo,
+            round(float(scored.mean()), 1) if has_scores else None,
+            round(float(scored.min()), 1) if has_scores else None,
+            round(float(scored.max()), 1) if has_scores else None,
+            int(passed[lo:hi].sum()),
+            [float(v) for v in np.percentile(scored, PERCENTILES)] if has_scores else [None] * len(PERCENTILES),
+        ))
+    return counts.tolist(), passes.tolist(), per_course
 
 
 # ─── Compliance Status ──────────────────────────────────────────────────────
 
-def get_compliance_report() -> Dict[str, Any]:
+# Mandatory courses; if none are flagged, every course is tracked
+_MANDATORY_COURSES = "(is_mandatory = 1 OR NOT EXISTS (SELECT 1 FROM courses WHERE is_mandatory = 1))"
+
+
+def _mandatory_courses(cur) -> List[sqlite3.Row]:
+    return cur.execute(f"SELECT id, title FROM courses WHERE {_MANDATORY_COURSES} ORDER BY rowid").fetchall()
+
+
+def _compliance_rows(cur, department: Optional[str] = None,
+                     limit: Optional[int] = None, offset: int = 0):
+    """
+    One set-based query: the page of active users crossed with the mandatory
+    courses, LEFT JOIN enrollments (served by idx_enrollments_user_course).
+    Rows come back ordered by user, then course. There is deliberately no
+    GROUP BY: it makes SQLite build a temporary automatic index instead of
+    using ours, so duplicate enrollments are collapsed while folding.
+    """
+    where, params = "is_active = 1", []
+    if department:
+        where += " AND department = ?"
+        params.append(department)
+    page = ""
+    if limit is not None:
+        page = "LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+    return cur.execute(f"""
+        WITH
+        page AS (
+            SELECT id, username, name, department FROM users
+            WHERE {where}
+            ORDER BY name, id
+            {page}
+        ),
+        mc AS MATERIALIZED (
+            SELECT rowid AS ord, id, title FROM courses WHERE {_MANDATORY_COURSES}
+        )
+        SELECT
+            p.id AS user_id, p.username, p.name, p.department,
+            mc.id AS course_id, mc.title AS course_title,
+            e.status, e.progress
+        FROM page p
+        LEFT JOIN mc ON 1  -- cross join that still lists users when there are no courses
+        LEFT JOIN enrollments e ON e.user_id = p.id AND e.course_id = mc.id
+        ORDER BY p.name, p.id, mc.ord
+    """, params)
+
+
+def _iter_compliance_users(cursor) -> Iterator[Dict[str, Any]]:
+    """
+    Fold the per-(user, course) rows of _compliance_rows into one dict per
+    user. Duplicate enrollments for a pair keep the best one (completed
+    first, then highest progress).
+    """
+    cursor.row_factory = None  # plain tuples: this loop runs once per (user, course)
+    rows = iter(lambda: cursor.fetchmany(STREAM_FETCH_SIZE), [])
+    flat = (row for batch in rows for row in batch)
+    for (user_id, username, name, department), user_rows in groupby(flat, key=lambda r: r[:4]):
+        courses: Dict[str, Dict[str, Any]] = {}
+        for _, _, _, _, course_id, course_title, status, progress in user_rows:
+            if course_id is None:
+                continue
+            current = courses.get(course_id)
+            if current is not None and (status == "completed", progress or 0) <= \
+                    (current["status"] == "completed", current["progress"]):
+                continue
+            courses[course_id] = {
+                "course_id": course_id,
+                "course_title": course_title,
+                "status": status or "not_enrolled",
+                "progress": progress or 0,
+            }
+        courses_list = list(courses.values())
+        yield {
+            "user_id": user_id,
+            "username": username,
+            "name": name or username,
+            "department": department or "—",
+            "courses": courses_list,
+            "compliant": bool(courses_list) and all(c["status"] == "completed" for c in courses_list),
+        }
+
+
+def _compliance_summary(cur, department: Optional[str] = None) -> Dict[str, int]:
+    """Total and compliant user counts for the whole (filtered) population, in one query."""
+    where, params = "u.is_active = 1", []
+    if department:
+        where += " AND u.department = ?"
+        params.append(department)
+    row = cur.execute(f"""
+        WITH
+        mc AS (SELECT id FROM courses WHERE {_MANDATORY_COURSES}),
+        done AS (
+            SELECT e.user_id, COUNT(DISTINCT e.course_id) AS n
+            FROM enrollments e JOIN mc ON mc.id = e.course_id
+            WHERE e.status = 'completed'
+            GROUP BY e.user_id
+        )
+        SELECT
+            COUNT(*) AS total_users,
+            SUM(CASE WHEN (SELECT COUNT(*) FROM mc) > 0
+                      AND COALESCE(done.n, 0) = (SELECT COUNT(*) FROM mc) THEN 1 ELSE 0 END) AS compliant_users
+        FROM users u
+        LEFT JOIN done ON done.user_id = u.id
+        WHERE {where}
+    """, params).fetchone()
+    return {"total_users": row["total_users"], "compliant_users": row["compliant_users"] or 0}
+
+
+def get_compliance_report(department: Optional[str] = None,
+                          limit: Optional[int] = None, offset: int = 0) -> Dict[str, Any]:
     """
     Shows mandatory course completion status per user.
     Mandatory = courses where is_mandatory = 1.
+    Summary counts cover every matching user; `users` holds the requested
+    page (all matching users when limit is None).
     """
     conn = get_db()
-    cur = conn.cursor()
-
-    mandatory_courses = cur.execute(
-        "SELECT id, title FROM courses WHERE is_mandatory = 1"
-    ).fetchall()
-
-    if not mandatory_courses:
-        # If no mandatory flag column, treat all courses as trackable
-        mandatory_courses = cur.execute("SELECT id, title FROM courses").fetchall()
-
-    active_users = cur.execute(
-        "SELECT id, username, name, department FROM users WHERE is_active = 1"
-    ).fetchall()
-
-    compliance = []
-    total_compliant = 0
-
-    for user in active_users:
-        user_courses = []
-        all_complete = True
-        for mc in mandatory_courses:
-            enrollment = cur.execute(
-                "SELECT status, progress FROM enrollments WHERE user_id = ? AND course_id = ?",
-                (user["id"], mc["id"])
-            ).fetchone()
-
-            status = "not_enrolled"
-            progress = 0
-            if enrollment:
-                status = enrollment["status"]
-                progress = enrollment["progress"] or 0
-
-            if status != "completed":
-                all_complete = False
-
-            user_courses.append({
-                "course_id": mc["id"],
-                "course_title": mc["title"],
-                "status": status,
-                "progress": progress,
-            })
-
-        if all_complete and len(mandatory_courses) > 0:
-            total_compliant += 1
-
-        compliance.append({
-            "user_id": user["id"],
-            "username": user["username"],
-            "name": user["name"] or user["username"],
-            "department": user["department"] or "—",
-            "courses": user_courses,
-            "compliant": all_complete and len(mandatory_courses) > 0,
-        })
-
-    conn.close()
+    try:
+        cur = conn.cursor()
+        mandatory_courses = _mandatory_courses(cur)
+        summary = _compliance_summary(cur, department)
+        users = list(_iter_compliance_users(_compliance_rows(cur, department, limit, offset)))
+    finally:
+        conn.close()
+
+    total_users = summary["total_users"]
     return {
         "mandatory_course_count": len(mandatory_courses),
-        "total_users": len(active_users),
-        "compliant_users": total_compliant,
-        "compliance_rate": round((total_compliant / len(active_users) * 100) if active_users else 0, 1),
-        "users": compliance,
+        "total_users": total_users,
+        "compliant_users": summary["compliant_users"],
+        "compliance_rate": round((summary["compliant_users"] / total_users * 100) if total_users else 0, 1),
+        "department": department,
+        "limit": limit,
+        "offset": offset,
+        "users": users,
     }
 
 
 # ─── CSV Export ──────────────────────────────────────────────────────────────
+#
+# Exports are generators for StreamingResponse: rows are read with fetchmany
+# and written out STREAM_FETCH_SIZE at a time, so memory stays constant no
+# matter how much history is exported.
 
-def export_team_csv() -> str:
-    """Export team overview as CSV string."""
-    data = get_team_overview()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Name", "Username", "Department", "Role", "Enrolled", "Completed", "Completion %", "Avg Score", "Last Activity"])
-    for m in data["members"]:
-        writer.writerow([
-            m["name"], m["username"], m["department"], m["role"],
-            m["enrolled"], m["completed"], m["completion_rate"],
-            m["avg_score"], m["last_activity"]
-        ])
-    return output.getvalue()
-
-
-def export_scores_csv() -> str:
-    """Export all quiz attempt scores as CSV string."""
-    conn = get_db()
-    cur = conn.cursor()
-    rows = cur.execute("""
-        SELECT
-            u.name, u.username, u.department,
-            COALESCE(c.title, qa.course_id) AS course_title,
-            qa.score, qa.percentage,
-            qa.passed, qa.time_spent_seconds, qa.completed_at
-        FROM quiz_attempts qa
-        LEFT JOIN users u ON qa.user_id = u.id
-        LEFT JOIN courses c ON qa.course_id = c.id
-        ORDER BY qa.completed_at DESC
-    """).fetchall()
-    conn.close()
+def _fetch_rows(cursor) -> Iterator[sqlite3.Row]:
+    for batch in iter(lambda: cursor.fetchmany(STREAM_FETCH_SIZE), []):
+        yield from batch
 
+
+def _csv_chunks(header: List[str], rows: Iterator[List[Any]]) -> Iterator[str]:
+    """Render rows as CSV, yielding one string per STREAM_FETCH_SIZE rows."""
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(["Name", "Username", "Department", "Course", "Score", "Percentage", "Passed", "Time (sec)", "Date"])
-    for r in rows:
-        writer.writerow([
-            r["name"] or r["username"] or "—",
-            r["username"] or "—",
-            r["department"] or "—",
-            r["course_title"],
-            r["score"], r["percentage"],
-            "Yes" if r["passed"] else "No",
-            r["time_spent_seconds"],
-            r["completed_at"],
-        ])
-    return output.getvalue()
-
-
-def export_compliance_csv() -> str:
-    """Export compliance report as CSV string."""
-    data = get_compliance_report()
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    course_titles = [c["course_title"] for c in data["users"][0]["courses"]] if data["users"] else []
-    writer.writerow(["Name", "Username", "Department", "Compliant"] + course_titles)
-
-    for u in data["users"]:
-        row = [u["name"], u["username"], u["department"], "Yes" if u["compliant"] else "No"]
-        for c in u["courses"]:
-            row.append(f'{c["status"]} ({c["progress"]}%)')
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
         writer.writerow(row)
+        if i % STREAM_FETCH_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
 
-    return output.getvalue()
+def parse_date_range(date_from: Optional[str], date_to: Optional[str]) -> tuple:
+    """
+    Validate YYYY-MM-DD bounds (both inclusive) and return them as
+    ISO-string bounds [start, end) for comparing against stored timestamps.
+    Raises ValueError on a malformed date.
+    """
+    start = end = None
+    try:
+        if date_from:
+            start = datetime.strptime(date_from, "%Y-%m-%d").date().isoformat()
+        if date_to:
+            end = (datetime.strptime(date_to, "%Y-%m-%d").date() + timedelta(days=1)).isoformat()
+    except ValueError:
+        raise ValueError("Dates must be formatted as YYYY-MM-DD")
+    return start, end
+
+
+def export_team_csv(department: Optional[str] = None) -> Iterator[str]:
+    """Stream the team overview as CSV."""
+    conn = get_db(check_same_thread=False)
+    try:
+        reporting_rollups.ensure_built(conn)
+        members = (_team_member(r) for r in _fetch_rows(_team_member_rows(conn.cursor(), department)))
+        yield from _csv_chunks(
+            ["Name", "Username", "Department", "Role", "Enrolled", "Completed", "Completion %", "Avg Score", "Last Activity"],
+            ([m["name"], m["username"], m["department"], m["role"],
+              m["enrolled"], m["completed"], m["completion_rate"],
+              m["avg_score"], m["last_activity"]] for m in members),
+        )
+    finally:
+        conn.close()
+
+
+def export_scores_csv(department: Optional[str] = None,
+                      date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream quiz attempt scores as CSV, newest first.
+    Optional filters: the user's department and an inclusive YYYY-MM-DD range
+    on the attempt date (validate with parse_date_range before streaming).
+    """
+    start, end = parse_date_range(date_from, date_to)
+    where, params = [], []
+    if department:
+        where.append("u.department = ?")
+        params.append(department)
+    if start:
+        where.append("qa.completed_at >= ?")
+        params.append(start)
+    if end:
+        where.append("qa.completed_at < ?")
+        params.append(end)
+
+    conn = get_db(check_same_thread=False)
+    try:
+        # ORDER BY walks idx_quiz_attempts_completed, so the first rows go out
+        # without sorting the whole history first
+        cursor = conn.execute(f"""
+            SELECT
+                u.name, u.username, u.department,
+                COALESCE(c.title, qa.course_id) AS course_title,
+                qa.score, qa.percentage,
+                qa.passed, qa.time_spent_seconds, qa.completed_at
+            FROM quiz_attempts qa
+            LEFT JOIN users u ON qa.user_id = u.id
+            LEFT JOIN courses c ON qa.course_id = c.id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY qa.completed_at DESC
+        """, params)
+        yield from _csv_chunks(
+            ["Name", "Username", "Department", "Course", "Score", "Percentage", "Passed", "Time (sec)", "Date"],
+            ([r["name"] or r["username"] or "—",
+              r["username"] or "—",
+              r["department"] or "—",
+              r["course_title"],
+              r["score"], r["percentage"],
+              "Yes" if r["passed"] else "No",
+              r["time_spent_seconds"],
+              r["completed_at"]] for r in _fetch_rows(cursor)),
+        )
+    finally:
+        conn.close()
+
+
+def export_compliance_csv(department: Optional[str] = None) -> Iterator[str]:
+    """Stream the compliance report as CSV."""
+    conn = get_db(check_same_thread=False)
+    try:
+        cur = conn.cursor()
+        course_titles = [c["title"] for c in _mandatory_courses(cur)]
+        users = _iter_compliance_users(_compliance_rows(cur, department))
+        yield from _csv_chunks(
+            ["Name", "Username", "Department", "Compliant"] + course_titles,
+            ([u["name"], u["username"], u["department"], "Yes" if u["compliant"] else "No"]
+             + [f'{c["status"]} ({c["progress"]}%)' for c in u["courses"]] for u in users),
+        )
+    finally:
+        conn.close()
+
+
+# ─── Columnar Export (Parquet / Arrow IPC) ──────────────────────────────────
+#
+# Raw history for analytics tools, with typed columns instead of CSV text.
+# Needs pyarrow (pip install pyarrow); columnar_available() reports whether
+# it is installed. Rows go from the SQLite cursor into Arrow record batches
+# of COLUMNAR_BATCH_ROWS and are written out batch by batch. Course and date
+# filters run in SQLite, so excluded rows are never read into Python.
+
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    # IPC stream format: unlike the file format it allows a fresh dictionary per batch
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# dataset -> (table, date column used by date_from / date_to, [(column, type)])
+# Types: str, cat (dictionary-encoded str), float, int, bool, ts (ISO text → timestamp)
+COLUMNAR_DATASETS = {
+    "quiz_attempts": ("quiz_attempts", "completed_at", [
+        ("id", "str"), ("user_id", "str"), ("quiz_id", "str"), ("course_id", "cat"),
+        ("score", "float"), ("total_points", "float"), ("percentage", "float"), ("passed", "bool"),
+        ("started_at", "ts"), ("completed_at", "ts"), ("time_spent_seconds", "int"),
+    ]),
+    "enrollments": ("enrollments", "enrolled_at", [
+        ("id", "str"), ("user_id", "str"), ("course_id", "cat"), ("status", "cat"),
+        ("enrolled_at", "ts"), ("completed_at", "ts"), ("progress", "float"),
+    ]),
+    "module_progress": ("module_progress", "started_at", [
+        ("id", "str"), ("user_id", "str"), ("module_id", "str"), ("course_id", "cat"),
+        ("status", "cat"), ("started_at", "ts"), ("completed_at", "ts"), ("score", "float"),
+    ]),
+}
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def _arrow_type(kind: str):
+    return {
+        "str": pa.string(),
+        "cat": pa.dictionary(pa.int32(), pa.string()),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "bool": pa.bool_(),
+        "ts": pa.timestamp("us"),
+    }[kind]
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return ts.replace(tzinfo=None) if ts.tzinfo is None else ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _arrow_column(values: tuple, kind: str):
+    if kind == "ts":
+        try:
+            # Vectorized ISO-8601 parse; falls back per value for odd/offset timestamps
+            return pa.array(values, pa.string()).cast(pa.timestamp("us"))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return pa.array([_parse_timestamp(v) for v in values], pa.timestamp("us"))
+    if kind == "cat":
+        return pa.array(values, pa.string()).dictionary_encode()
+    if kind == "bool":
+        return pa.array(values, pa.int64()).cast(pa.bool_())
+    return pa.array(values, _arrow_type(kind))
+
+
+class _ChunkSink:
+    """Write-only file object that buffers writer output until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def export_columnar(dataset: str, fmt: str = "parquet", course_id: Optional[str] = None,
+                    date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Stream a raw history table as Parquet (zstd, one row group per batch)
+    or an Arrow IPC stream (zstd-compressed buffers). Filters: course_id and an inclusive YYYY-MM-DD
+    range on the dataset's date column. Validate arguments before streaming;
+    raises ValueError for an unknown dataset/format or bad dates.
+    """
+    if pa is None:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)")
+    if dataset not in COLUMNAR_DATASETS:
+        raise ValueError(f"Unknown dataset. Must be one of: {', '.join(COLUMNAR_DATASETS)}")
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown format. Must be one of: {', '.join(COLUMNAR_FORMATS)}")
+    table, date_column, columns = COLUMNAR_DATASETS[dataset]
+    start, end = parse_date_range(date_from, date_to)
+    return _columnar_batches(table, date_column, columns, fmt, course_id, start, end)
+
+
+def _columnar_batches(table, date_column, columns, fmt, course_id, start, end) -> Iterator[bytes]:
+    where, params = [], []
+    if course_id:
+        where.append("course_id = ?")
+        params.append(course_id)
+    if start:
+        where.append(f"{date_column} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{date_column} < ?")
+        params.append(end)
+
+    schema = pa.schema([(name, _arrow_type(kind)) for name, kind in columns])
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa_ipc.new_stream(sink, schema, options=pa_ipc.IpcWriteOptions(compression="zstd"))
+
+    conn = get_db(check_same_thread=False)
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT {", ".join(name for name, _ in columns)} FROM {table}
+            {"WHERE " + " AND ".join(where) if where else ""}
+        """, params)
+        for rows in iter(lambda: cursor.fetchmany(COLUMNAR_BATCH_ROWS), []):
+            arrays = [_arrow_column(values, kind) for values, (_, kind) in zip(zip(*rows), columns)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    finally:
+        conn.close()
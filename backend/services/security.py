@@ -1,28 +1,38 @@
 """
 Security Hardening Module
-- Audit logging middleware (every request → audit_log)
-- Rate limiting (login/register brute-force protection)
-- Security headers middleware
+- Security middleware (pure ASGI) combining:
+  - Audit logging (every /api/* request → a daily request_log partition, batched
+    in the background, with per-minute rollups for the dashboard)
+  - Rate limiting (login/register brute-force protection)
+  - Security headers
+  - Latency histograms per route template / status class / role (services.metrics)
 - Input sanitization helpers
 - Document access control per role
 """
 
 import os
 import re
+import json
 import time
+import queue
+import atexit
+import shutil
 import sqlite3
+import asyncio
+import threading
 import html
-from collections import defaultdict
-from datetime import datetime, timezone
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import JSONResponse
+
+from services import auth_service, metrics
 
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "courses.db")
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "courses.db"))
 
 # Rate-limit settings (per IP)
 RATE_LIMIT_WINDOW = 60        # seconds
@@ -30,6 +40,23 @@ LOGIN_MAX_ATTEMPTS = 10       # max login attempts per window
 REGISTER_MAX_ATTEMPTS = 5     # max register attempts per window
 GENERAL_MAX_REQUESTS = 200    # max total requests per window
 
+# "memory" (per process) or "sqlite" (shared by every worker on the host)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# Its own file: counters are written on every request and must not queue behind
+# (or hold) the app database's write lock
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(os.path.dirname(DB_PATH), "rate_limit.db"))
+# Most IPs tracked by the in-memory limiter (least recently seen are evicted)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Audit writer: queue bound, rows per transaction, max delay before a flush
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_BATCH_MAX = int(os.getenv("AUDIT_BATCH_MAX", "500"))
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "250"))
+# Overflow file for records that don't fit in the queue ("" = drop them)
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "")
+# Days of request_log partitions and rollups kept (0 = keep forever)
+REQUEST_LOG_RETENTION_DAYS = int(os.getenv("REQUEST_LOG_RETENTION_DAYS", "30"))
+
 # Paths that should be audit-logged (regex patterns)
 AUDIT_PATHS = re.compile(r"^/api/")
 
@@ -45,11 +72,11 @@ def _conn():
     return conn
 
 
-def _ensure_tables():
-    """Ensure audit tables exist with the right schema."""
-    conn = _conn()
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS request_log (
+# request_log is partitioned by UTC day into request_log_YYYYMMDD tables, so
+# retention is a DROP TABLE and today's queries only touch today's rows.  The
+# unpartitioned request_log table holds rows written before partitioning; it is
+# still read by get_request_log and trimmed by the retention policy.
+_REQUEST_LOG_COLUMNS = """
             id         INTEGER PRIMARY KEY AUTOINCREMENT,
             method     TEXT NOT NULL,
             path       TEXT NOT NULL,
@@ -61,186 +88,740 @@ def _ensure_tables():
             user_agent TEXT DEFAULT '',
             duration_ms REAL DEFAULT 0,
             created_at TEXT NOT NULL
-        );
+"""
+
+_PARTITION_GLOB = "request_log_[0-9]*"
+
+# Per-minute counters maintained by the audit writer in the same transaction
+# as the rows they count (summed columns, then duration_max_ms)
+_MINUTE_COUNTERS = (
+    "requests", "status_2xx", "status_3xx", "status_4xx", "status_5xx",
+    "failed_logins", "forbidden", "rate_limited", "duration_sum_ms",
+)
+
+_UPSERT_MINUTE = f"""INSERT INTO request_log_minute (minute, {", ".join(_MINUTE_COUNTERS)}, duration_max_ms)
+    VALUES (?, {", ".join("?" for _ in _MINUTE_COUNTERS)}, ?)
+    ON CONFLICT(minute) DO UPDATE SET
+        {", ".join(f"{c} = {c} + excluded.{c}" for c in _MINUTE_COUNTERS)},
+        duration_max_ms = MAX(duration_max_ms, excluded.duration_max_ms)"""
+
+
+def _partition_name(day: str) -> str:
+    """request_log partition for a YYYY-MM-DD day."""
+    return f"request_log_{day.replace('-', '')}"
+
+
+def _create_partition(conn, day: str) -> str:
+    table = _partition_name(day)
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {table} ({_REQUEST_LOG_COLUMNS});
+        CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table}(created_at);
+        CREATE INDEX IF NOT EXISTS idx_{table}_user    ON {table}(user_id);
+    """)
+    return table
+
+
+def _partitions(conn) -> list:
+    """Partition table names, newest day first."""
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name GLOB ? ORDER BY name DESC",
+        (_PARTITION_GLOB,),
+    )]
+
+
+def _retention_cutoff(days: int) -> Optional[str]:
+    if days <= 0:
+        return None
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _ensure_tables():
+    """Ensure audit tables exist with the right schema."""
+    conn = _conn()
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS request_log ({_REQUEST_LOG_COLUMNS});
         CREATE INDEX IF NOT EXISTS idx_request_log_created ON request_log(created_at);
         CREATE INDEX IF NOT EXISTS idx_request_log_user    ON request_log(user_id);
+
+        CREATE TABLE IF NOT EXISTS request_log_minute (
+            minute TEXT PRIMARY KEY,  -- YYYY-MM-DDTHH:MM (UTC)
+            {", ".join(f"{c} {'REAL' if c == 'duration_sum_ms' else 'INTEGER'} NOT NULL DEFAULT 0"
+                       for c in _MINUTE_COUNTERS)},
+            duration_max_ms REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS request_log_daily_ips (
+            day TEXT NOT NULL,
+            ip_address TEXT NOT NULL,
+            PRIMARY KEY (day, ip_address)
+        ) WITHOUT ROWID;
+
+        -- One row once the rollups include the unpartitioned request_log rows
+        CREATE TABLE IF NOT EXISTS request_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            backfilled_at TEXT NOT NULL
+        );
     """)
+    if conn.execute("SELECT 1 FROM request_log_state WHERE id = 1").fetchone() is None:
+        _backfill_rollups(conn)
     conn.commit()
     conn.close()
 
 
+def _backfill_rollups(conn):
+    """Count the existing (unpartitioned) request_log rows into the rollups, once."""
+    cutoff = _retention_cutoff(REQUEST_LOG_RETENTION_DAYS) or ""
+    conn.execute(f"""
+        INSERT INTO request_log_minute (minute, {", ".join(_MINUTE_COUNTERS)}, duration_max_ms)
+        SELECT substr(created_at, 1, 16),
+               COUNT(*),
+               SUM(status BETWEEN 200 AND 299), SUM(status BETWEEN 300 AND 399),
+               SUM(status BETWEEN 400 AND 499), SUM(status BETWEEN 500 AND 599),
+               SUM(status = 401 AND path LIKE '%/auth/login%'),
+               SUM(status = 403), SUM(status = 429),
+               COALESCE(SUM(duration_ms), 0), COALESCE(MAX(duration_ms), 0)
+        FROM request_log
+        WHERE created_at >= ?
+        GROUP BY 1
+        ON CONFLICT(minute) DO UPDATE SET
+            {", ".join(f"{c} = {c} + excluded.{c}" for c in _MINUTE_COUNTERS)},
+            duration_max_ms = MAX(duration_max_ms, excluded.duration_max_ms)
+    """, (cutoff,))
+    conn.execute("""
+        INSERT OR IGNORE INTO request_log_daily_ips (day, ip_address)
+        SELECT DISTINCT substr(created_at, 1, 10), ip_address FROM request_log WHERE created_at >= ?
+    """, (cutoff,))
+    conn.execute(
+        "INSERT INTO request_log_state (id, backfilled_at) VALUES (1, ?)",
+        (datetime.now(timezone.utc).isoformat(),),
+    )
+
+
+def apply_request_log_retention(conn=None, days: int = REQUEST_LOG_RETENTION_DAYS,
+                                batch_size: int = 5000) -> dict:
+    """
+    Drop request_log partitions and rollups older than `days`, and trim the
+    unpartitioned request_log table in batches.  Called by the audit writer
+    once per UTC day.
+    """
+    cutoff = _retention_cutoff(days)
+    result = {"partitions_dropped": 0, "legacy_rows_deleted": 0, "minutes_deleted": 0}
+    if cutoff is None:
+        return result
+    close = conn is None
+    if conn is None:
+        conn = _conn()
+    try:
+        oldest_kept = _partition_name(cutoff)
+        for table in _partitions(conn):
+            if table < oldest_kept:
+                conn.execute(f"DROP TABLE {table}")
+                result["partitions_dropped"] += 1
+        with conn:
+            result["minutes_deleted"] = conn.execute(
+                "DELETE FROM request_log_minute WHERE minute < ?", (cutoff,)
+            ).rowcount
+            conn.execute("DELETE FROM request_log_daily_ips WHERE day < ?", (cutoff,))
+        while True:
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM request_log WHERE id IN "
+                    "(SELECT id FROM request_log WHERE created_at < ? LIMIT ?)",
+                    (cutoff, batch_size),
+                ).rowcount
+            result["legacy_rows_deleted"] += deleted
+            if deleted < batch_size:
+                break
+        if result["partitions_dropped"] or result["legacy_rows_deleted"]:
+            print(f"[audit-log] Retention ({days}d): dropped {result['partitions_dropped']} partitions, "
+                  f"{result['legacy_rows_deleted']} legacy rows")
+        return result
+    finally:
+        if close:
+            conn.close()
+
+
 _ensure_tables()
 
 
-# ─── Rate Limiter (in-memory, per-IP) ────────────────────────────────────────
+# ─── Rate Limiter (sliding-window counters, per-IP) ──────────────────────────
+# Each IP keeps request counts for the current and previous fixed windows; the
+# sliding-window estimate is current + previous × (unused part of the previous
+# window).  Checks are O(1) and only the last two windows are ever stored.
 
-class RateLimiter:
-    """Simple sliding-window rate limiter keyed by IP address."""
+_GENERAL, _LOGIN, _REGISTER = range(3)
+
+
+def _bucket_for(path: str) -> int:
+    if "/api/auth/login" in path:
+        return _LOGIN
+    if "/api/auth/register" in path:
+        return _REGISTER
+    return _GENERAL
 
-    def __init__(self):
-        # { ip: [(timestamp, path_bucket), ...] }
-        self._hits: dict[str, list] = defaultdict(list)
 
-    def _cleanup(self, ip: str):
-        cutoff = time.time() - RATE_LIMIT_WINDOW
-        self._hits[ip] = [h for h in self._hits[ip] if h[0] > cutoff]
+def _limit_error(bucket: int, counts: list) -> Optional[str]:
+    """counts: estimated requests per bucket within the sliding window."""
+    if bucket == _LOGIN and counts[_LOGIN] >= LOGIN_MAX_ATTEMPTS:
+        return f"Too many login attempts. Try again in {RATE_LIMIT_WINDOW}s."
+    if bucket == _REGISTER and counts[_REGISTER] >= REGISTER_MAX_ATTEMPTS:
+        return f"Too many registration attempts. Try again in {RATE_LIMIT_WINDOW}s."
+    if sum(counts) >= GENERAL_MAX_REQUESTS:
+        return f"Rate limit exceeded ({GENERAL_MAX_REQUESTS} req/{RATE_LIMIT_WINDOW}s)."
+    return None
+
+
+def _window_position(now: float) -> tuple:
+    """(current window number, weight of the previous window)."""
+    window = int(now // RATE_LIMIT_WINDOW)
+    return window, 1.0 - (now % RATE_LIMIT_WINDOW) / RATE_LIMIT_WINDOW
+
+
+class RateLimiter:
+    """
+    In-memory sliding-window rate limiter keyed by IP address.
+    Keys idle for a full window are expired, and at most RATE_LIMIT_MAX_KEYS
+    are tracked (least recently seen IPs are evicted first).
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        # { ip: [window, cur_general, cur_login, cur_register, prev_general, prev_login, prev_register] }
+        # ordered least → most recently seen
+        self._keys: "OrderedDict[str, list]" = OrderedDict()
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
 
     def check(self, ip: str, path: str) -> Optional[str]:
         """
         Returns an error message if rate limited, else None.
         """
-        self._cleanup(ip)
-        hits = self._hits[ip]
-
-        # Count by bucket
-        login_count = sum(1 for _, p in hits if p == "login")
-        register_count = sum(1 for _, p in hits if p == "register")
-        total_count = len(hits)
-
-        # Determine bucket for this request
-        bucket = "general"
-        if "/api/auth/login" in path:
-            bucket = "login"
-            if login_count >= LOGIN_MAX_ATTEMPTS:
-                return f"Too many login attempts. Try again in {RATE_LIMIT_WINDOW}s."
-        elif "/api/auth/register" in path:
-            bucket = "register"
-            if register_count >= REGISTER_MAX_ATTEMPTS:
-                return f"Too many registration attempts. Try again in {RATE_LIMIT_WINDOW}s."
-
-        if total_count >= GENERAL_MAX_REQUESTS:
-            return f"Rate limit exceeded ({GENERAL_MAX_REQUESTS} req/{RATE_LIMIT_WINDOW}s)."
-
-        # Record this hit
-        self._hits[ip].append((time.time(), bucket))
-        return None
+        window, weight = _window_position(time.time())
+        bucket = _bucket_for(path)
+
+        with self._lock:
+            entry = self._keys.get(ip)
+            if entry is None:
+                entry = self._keys[ip] = [window, 0, 0, 0, 0, 0, 0]
+                if len(self._keys) > self._max_keys:
+                    self._keys.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._keys.move_to_end(ip)
+                if entry[0] != window:
+                    entry[4:7] = entry[1:4] if entry[0] == window - 1 else [0, 0, 0]
+                    entry[1:4] = [0, 0, 0]
+                    entry[0] = window
+            self._expire(window)
+
+            counts = [entry[1 + b] + entry[4 + b] * weight for b in range(3)]
+            error = _limit_error(bucket, counts)
+            if error is None:
+                entry[1 + bucket] += 1
+            return error
+
+    async def check_async(self, ip: str, path: str) -> Optional[str]:
+        """check() from the event loop: in-memory and lock-protected for microseconds, so inline."""
+        return self.check(ip, path)
+
+    def _expire(self, window: int):
+        # The least recently seen key is first; anything older than the
+        # previous window no longer contributes to any estimate
+        while self._keys:
+            entry = next(iter(self._keys.values()))
+            if entry[0] >= window - 1:
+                break
+            self._keys.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "tracked_keys": len(self._keys),
+            "max_keys": self._max_keys,
+            "expired_keys": self.expired,
+            "evicted_keys": self.evicted,
+        }
+
 
+class SQLiteRateLimiter:
+    """
+    Same limits, with counters in a shared SQLite table so they hold across
+    uvicorn workers.  Fails open (allows the request) if the database errors.
+    The middleware calls check_async, which runs the transaction on one
+    dedicated thread so a busy database never blocks the event loop.
+    """
 
-_rate_limiter = RateLimiter()
+    CLEANUP_EVERY = 1000  # checks between purges of expired windows
+
+    def __init__(self, db_path: str = RATE_LIMIT_DB_PATH):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=2.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                key TEXT NOT NULL,
+                window INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (key, window, bucket)
+            ) WITHOUT ROWID
+        """)
+        self._lock = threading.Lock()
+        self._checks = 0
+        self.errors = 0
+        # One thread: checks are serialised by the lock anyway, and waiting
+        # checks must not occupy Starlette's shared threadpool
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
 
+    def check(self, ip: str, path: str) -> Optional[str]:
+        window, weight = _window_position(time.time())
+        bucket = _bucket_for(path)
 
-# ─── Audit Logging Middleware ─────────────────────────────────────────────────
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                counts = [0.0, 0.0, 0.0]
+                for w, b, count in self._conn.execute(
+                    "SELECT window, bucket, count FROM rate_limit_counters WHERE key=? AND window>=?",
+                    (ip, window - 1),
+                ):
+                    counts[b] += count if w == window else count * weight
+                error = _limit_error(bucket, counts)
+                if error is None:
+                    self._conn.execute(
+                        """INSERT INTO rate_limit_counters (key, window, bucket, count) VALUES (?,?,?,1)
+                           ON CONFLICT(key, window, bucket) DO UPDATE SET count = count + 1""",
+                        (ip, window, bucket),
+                    )
+                self._checks += 1
+                if self._checks % self.CLEANUP_EVERY == 0:
+                    self._conn.execute("DELETE FROM rate_limit_counters WHERE window < ?", (window - 1,))
+                self._conn.execute("COMMIT")
+                return error
+            except sqlite3.Error as e:
+                self.errors += 1
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                print(f"⚠️ Rate limiter database error (allowing request): {e}")
+                return None
+
+    async def check_async(self, ip: str, path: str) -> Optional[str]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.check, ip, path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tracked = self._conn.execute("SELECT COUNT(DISTINCT key) FROM rate_limit_counters").fetchone()[0]
+        return {"backend": "sqlite", "tracked_keys": tracked, "errors": self.errors}
+
+
+_rate_limiter = SQLiteRateLimiter() if RATE_LIMIT_BACKEND == "sqlite" else RateLimiter()
+
+
+# ─── Audit helpers ───────────────────────────────────────────────────────────
+
+_INSERT_REQUEST_LOG = """INSERT INTO request_log
+    (method, path, status, user_id, username, role, ip_address, user_agent, duration_ms, created_at)
+    VALUES (?,?,?,?,?,?,?,?,?,?)"""
+
+
+def _minute_deltas(batch: list) -> dict:
+    """{minute: [*_MINUTE_COUNTERS, duration_max_ms]} for a batch of audit records."""
+    minutes = {}
+    for method, path, status, _, _, _, _, _, duration_ms, created_at in batch:
+        m = minutes.get(created_at[:16])
+        if m is None:
+            m = minutes[created_at[:16]] = [0] * (len(_MINUTE_COUNTERS) + 1)
+        m[0] += 1
+        if 200 <= status < 600:
+            m[status // 100 - 1] += 1  # status_2xx .. status_5xx
+        if status == 401 and "/auth/login" in path:
+            m[5] += 1
+        elif status == 403:
+            m[6] += 1
+        elif status == 429:
+            m[7] += 1
+        m[8] += duration_ms
+        m[9] = max(m[9], duration_ms)
+    return minutes
+
+
+def _spill_record(line: str) -> Optional[tuple]:
+    """One spilled request_log row, or None if the line is malformed."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, list) or len(record) != 10:
+        return None
+    status, duration_ms, created_at = record[2], record[8], record[9]
+    if (not isinstance(status, int) or isinstance(status, bool)
+            or not isinstance(duration_ms, (int, float)) or isinstance(duration_ms, bool)
+            or not isinstance(created_at, str) or len(created_at) < 16
+            or not all(isinstance(v, str) for v in record[:2] + record[3:8])):
+        return None
+    return tuple(record)
+
+
+_STOP = object()
 
-class AuditLoggingMiddleware(BaseHTTPMiddleware):
+
+class AuditLogWriter:
     """
-    Logs every /api/* request to the request_log table.
-    Records: method, path, response status, user info (from JWT), IP, UA, duration.
+    Writes request_log rows from a background thread.
+
+    The request path only does a non-blocking queue put.  The writer thread
+    drains the bounded queue and inserts up to AUDIT_BATCH_MAX rows per
+    transaction, at least every AUDIT_FLUSH_MS, on one persistent connection.
+    Rows go to their day's partition; the per-minute rollups and the daily
+    unique-IP set are updated in the same transaction, and retention runs on
+    the first batch of each UTC day.
+    When the queue is full, records are appended to AUDIT_SPILL_PATH (and
+    replayed on the next start) or dropped and counted.
     """
 
-    async def dispatch(self, request: Request, call_next):
-        start = time.time()
-        path = request.url.path
-
-        # Skip non-API and static requests
-        if not AUDIT_PATHS.match(path):
-            return await call_next(request)
-
-        # Extract user info from JWT if present
-        user_id = ""
-        username = ""
-        role = ""
-        auth_header = request.headers.get("Authorization", "")
-        if auth_header.startswith("Bearer "):
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=AUDIT_QUEUE_MAX)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._closed = False
+        self._partitions_seen: set = set()
+        self._retention_day = ""
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.spill_skipped = 0
+        self.errors = 0
+        self.last_batch_ms = 0.0
+        self.max_queue_depth_seen = 0
+
+    def enqueue(self, record: tuple):
+        """record: (method, path, status, user_id, username, role, ip, user_agent, duration_ms, created_at)"""
+        if self._thread is None:
+            self._start()
+        if self._closed:
+            self._overflow(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._overflow(record)
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
             try:
-                import jwt as _jwt
-                token = auth_header[7:]
-                secret = os.getenv("JWT_SECRET", "edu-assist-pro-secret-change-in-prod-2026")
-                payload = _jwt.decode(token, secret, algorithms=["HS256"])
-                user_id = payload.get("sub", "")
-                username = payload.get("username", "")
-                role = payload.get("role", "")
-            except Exception:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
                 pass
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": AUDIT_QUEUE_MAX,
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed_from_spill": self.replayed,
+            "spill_skipped": self.spill_skipped,
+            "errors": self.errors,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
 
-        # Call the actual endpoint
-        response = await call_next(request)
-        duration_ms = (time.time() - start) * 1000
+    # ── internals ──
 
-        # Async-safe: write log in a non-blocking way
-        ip = request.client.host if request.client else ""
-        ua = request.headers.get("User-Agent", "")[:200]
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
 
+    def _overflow(self, record: tuple):
+        if AUDIT_SPILL_PATH:
+            try:
+                with self._spill_lock:
+                    # 0600: records carry usernames and client IPs
+                    fd = os.open(AUDIT_SPILL_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+                    with os.fdopen(fd, "a") as f:
+                        f.write(json.dumps(record) + "\n")
+                    self.spilled += 1
+                return
+            except OSError as e:
+                print(f"[audit-log] Could not spill request log record: {e}")
+        self.dropped += 1
+
+    def _run(self):
+        """
+        Writer loop.  Any error is counted and logged and the thread carries on;
+        a dead writer would silently turn every later record into spill or drops.
+        """
+        conn = self._connect()
+        if conn is None:
+            return
         try:
-            conn = _conn()
-            conn.execute(
-                """INSERT INTO request_log
-                   (method, path, status, user_id, username, role, ip_address, user_agent, duration_ms, created_at)
-                   VALUES (?,?,?,?,?,?,?,?,?,?)""",
-                (
-                    request.method,
-                    path,
-                    response.status_code,
-                    user_id,
-                    username,
-                    role,
-                    ip,
-                    ua,
-                    round(duration_ms, 2),
-                    datetime.now(timezone.utc).isoformat(),
-                ),
-            )
-            conn.commit()
+            try:
+                self._replay_spill(conn)
+            except Exception as e:
+                self.errors += 1
+                print(f"[audit-log] Error replaying spilled records: {e!r}")
+            stopping = False
+            while not stopping:
+                batch = []
+                try:
+                    batch, stopping = self._next_batch()
+                    if batch:
+                        self.max_queue_depth_seen = max(self.max_queue_depth_seen, len(batch) + self._queue.qsize())
+                        self._flush(conn, batch)
+                except Exception as e:
+                    self.errors += 1
+                    self.dropped += len(batch)
+                    print(f"[audit-log] Writer error, {len(batch)} request log rows lost: {e!r}")
+        finally:
             conn.close()
-        except Exception as e:
-            print(f"[audit-log] Error writing request log: {e}")
 
-        return response
+    def _connect(self):
+        """The writer's connection, retried until it opens (None if closed meanwhile)."""
+        while True:
+            try:
+                return _conn()
+            except Exception as e:
+                self.errors += 1
+                print(f"[audit-log] Could not open the request log database: {e!r}")
+            if self._closed:
+                return None
+            time.sleep(1.0)
+
+    def _next_batch(self) -> tuple:
+        """Up to AUDIT_BATCH_MAX queued records, waiting at most AUDIT_FLUSH_MS after the first."""
+        batch = []
+        try:
+            item = self._queue.get(timeout=1.0)
+        except queue.Empty:
+            return batch, False
+        deadline = time.monotonic() + AUDIT_FLUSH_MS / 1000.0
+        while True:
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            if len(batch) >= AUDIT_BATCH_MAX:
+                return batch, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
 
+    def _flush(self, conn, batch: list) -> bool:
+        """Write one batch in one transaction; False if it was lost (counted as dropped)."""
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if today != self._retention_day:
+            self._retention_day = today
+            self._partitions_seen.clear()
+            try:
+                apply_request_log_retention(conn)
+            except Exception as e:
+                print(f"[audit-log] Error applying request log retention: {e}")
 
-# ─── Rate Limiting Middleware ─────────────────────────────────────────────────
+        start = time.monotonic()
+        try:
+            by_day = {}
+            for record in batch:
+                by_day.setdefault(record[9][:10], []).append(record)
+            for day in by_day.keys() - self._partitions_seen:
+                _create_partition(conn, day)
+                self._partitions_seen.add(day)
+
+            with conn, metrics.db_timer("audit_log_write"):
+                for day, records in by_day.items():
+                    conn.executemany(_INSERT_REQUEST_LOG.replace("INTO request_log", f"INTO {_partition_name(day)}"), records)
+                conn.executemany(_UPSERT_MINUTE, [(m, *v) for m, v in _minute_deltas(batch).items()])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO request_log_daily_ips (day, ip_address) VALUES (?, ?)",
+                    {(r[9][:10], r[6]) for r in batch},
+                )
+            self.written += len(batch)
+            self.batches += 1
+            return True
+        except sqlite3.Error as e:
+            self.errors += 1
+            self.dropped += len(batch)
+            print(f"[audit-log] Error writing {len(batch)} request log rows: {e}")
+            return False
+        finally:
+            self.last_batch_ms = (time.monotonic() - start) * 1000
+
+    def _replay_spill(self, conn):
+        """
+        Load rows spilled during a previous overload back into the request log.
+        Malformed lines are skipped one by one; a replay file left by an
+        interrupted replay is picked up first.
+        """
+        if not AUDIT_SPILL_PATH:
+            return
+        replay_path = AUDIT_SPILL_PATH + ".replaying"
+        with self._spill_lock:
+            if os.path.exists(AUDIT_SPILL_PATH):
+                if os.path.exists(replay_path):
+                    with open(replay_path, "a") as dst, open(AUDIT_SPILL_PATH) as src:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(AUDIT_SPILL_PATH)
+                else:
+                    os.replace(AUDIT_SPILL_PATH, replay_path)
+        if not os.path.exists(replay_path):
+            return
+        batch = []
+        with open(replay_path) as f:
+            for line in f:
+                record = _spill_record(line)
+                if record is None:
+                    if line.strip():
+                        self.spill_skipped += 1
+                    continue
+                batch.append(record)
+                if len(batch) >= AUDIT_BATCH_MAX:
+                    if self._flush(conn, batch):
+                        self.replayed += len(batch)
+                    batch = []
+        if batch and self._flush(conn, batch):
+            self.replayed += len(batch)
+        os.remove(replay_path)
+        print(f"[audit-log] Replayed {self.replayed} spilled request log records"
+              + (f" ({self.spill_skipped} malformed lines skipped)" if self.spill_skipped else ""))
+
+
+audit_writer = AuditLogWriter()
+
+
+# ─── Security Headers ────────────────────────────────────────────────────────
+
+# Standard security headers (also applied by StaticAssetsMiddleware, which
+# serves /static outside the security middleware)
+SECURITY_HEADERS = {
+    # Prevent MIME-type sniffing
+    "X-Content-Type-Options": "nosniff",
+    # Prevent clickjacking
+    "X-Frame-Options": "DENY",
+    # XSS protection (legacy browsers)
+    "X-XSS-Protection": "1; mode=block",
+    # Referrer policy
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    # Permissions policy
+    "Permissions-Policy": "camera=(), microphone=(), geolocation=()",
+    # Strict transport (when behind HTTPS proxy)
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """
-    Applies rate limiting per IP.  Returns 429 if limit exceeded.
-    """
+# Pre-encoded for ASGI header lists
+SECURITY_HEADERS_RAW = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in SECURITY_HEADERS.items()]
+_SECURITY_HEADER_NAMES = {k for k, _ in SECURITY_HEADERS_RAW}
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
+# Cache control for API responses (unless the endpoint chose its own,
+# e.g. ETag-revalidated catalog responses)
+_API_NO_CACHE_RAW = [
+    (b"cache-control", b"no-store, no-cache, must-revalidate"),
+    (b"pragma", b"no-cache"),
+]
 
-        # Skip static assets and health checks
-        if RATE_EXEMPT.match(path):
-            return await call_next(request)
 
-        ip = request.client.host if request.client else "unknown"
-        error = _rate_limiter.check(ip, path)
-        if error:
-            return JSONResponse(
-                status_code=429,
-                content={"detail": error},
-                headers={"Retry-After": str(RATE_LIMIT_WINDOW)},
-            )
+# ─── Security Middleware (pure ASGI) ─────────────────────────────────────────
 
-        return await call_next(request)
+class SecurityMiddleware:
+    """
+    Rate limiting, security headers and audit logging in a single pass.
 
+    Pure ASGI: only the http.response.start message is touched (to inject
+    headers and capture the status), so response bodies — including
+    StreamingResponse — flow through without buffering or extra tasks.
+    """
 
-# ─── Security Headers Middleware ──────────────────────────────────────────────
+    def __init__(self, app):
+        self.app = app
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """
-    Adds standard security headers to every response.
-    """
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-
-        # Prevent MIME-type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        # Prevent clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
-        # XSS protection (legacy browsers)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        # Referrer policy
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        # Permissions policy
-        response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
-        # Strict transport (when behind HTTPS proxy)
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        # Cache control for API responses
-        if request.url.path.startswith("/api/"):
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-
-        return response
+        start = time.time()
+        path = scope["path"]
+        client = scope.get("client")
+        ip = client[0] if client else ""
+        is_api = path.startswith("/api/")
+        audited = AUDIT_PATHS.match(path) is not None
+
+        authorization = ""
+        user_agent = ""
+        for key, value in scope["headers"]:
+            if key == b"authorization":
+                authorization = value.decode("latin-1")
+            elif key == b"user-agent":
+                user_agent = value.decode("latin-1")
+
+        # Request-scoped auth context: the JWT is verified once here and read
+        # back by the auth dependencies via request.state.auth
+        auth = auth_service.verify_token(authorization[7:]) if authorization.startswith("Bearer ") else None
+        scope.setdefault("state", {})["auth"] = auth
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [h for h in message.get("headers", []) if h[0] not in _SECURITY_HEADER_NAMES]
+                headers.extend(SECURITY_HEADERS_RAW)
+                if is_api and not any(k == b"cache-control" for k, _ in headers):
+                    headers.extend(_API_NO_CACHE_RAW)
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            # Rate limiting (skip static assets and health checks)
+            error = None if RATE_EXEMPT.match(path) else await _rate_limiter.check_async(ip or "unknown", path)
+            if error:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": error},
+                    headers={"Retry-After": str(RATE_LIMIT_WINDOW)},
+                )
+                await response(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            metrics.observe_request(
+                getattr(route, "path", None), scope["method"], status,
+                auth.get("role", "") if auth else "", time.time() - start,
+            )
+            if audited:
+                audit_writer.enqueue((
+                    scope["method"],
+                    path,
+                    status,
+                    auth.get("sub", "") if auth else "",
+                    auth.get("username", "") if auth else "",
+                    auth.get("role", "") if auth else "",
+                    ip,
+                    user_agent[:200],
+                    round((time.time() - start) * 1000, 2),
+                    datetime.now(timezone.utc).isoformat(),
+                ))
 
 
 # ─── Input Sanitization ──────────────────────────────────────────────────────
@@ -301,23 +882,31 @@ def get_request_log(
     path_contains: Optional[str] = None,
     user_id: Optional[str] = None,
 ) -> list:
-    """Query the request_log for the admin panel."""
+    """
+    Query the request log for the admin panel: newest partitions first, then
+    the unpartitioned request_log table, until `limit` rows are found.
+    """
     conn = _conn()
     try:
-        query = "SELECT * FROM request_log WHERE 1=1"
+        where = "WHERE 1=1"
         params = []
         if method:
-            query += " AND method=?"
+            where += " AND method=?"
             params.append(method.upper())
         if path_contains:
-            query += " AND path LIKE ?"
+            where += " AND path LIKE ?"
             params.append(f"%{path_contains}%")
         if user_id:
-            query += " AND user_id=?"
+            where += " AND user_id=?"
             params.append(user_id)
-        query += " ORDER BY created_at DESC LIMIT ?"
-        params.append(limit)
-        rows = conn.execute(query, params).fetchall()
+        rows = []
+        for table in _partitions(conn) + ["request_log"]:
+            if len(rows) >= limit:
+                break
+            rows.extend(conn.execute(
+                f"SELECT * FROM {table} {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit - len(rows)),
+            ).fetchall())
         return [dict(r) for r in rows]
     finally:
         conn.close()
@@ -325,53 +914,45 @@ def get_request_log(
 
 def get_security_stats() -> dict:
     """
-    Return security-relevant stats for the admin dashboard.
+    Return security-relevant stats for the admin dashboard, from the
+    per-minute rollups and the daily unique-IP set in one query.  Latency
+    percentiles come from this worker's request histograms.
     """
     conn = _conn()
     try:
-        # Total requests today
         today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        total_today = conn.execute(
-            "SELECT COUNT(*) FROM request_log WHERE created_at >= ?", (today,)
-        ).fetchone()[0]
-
-        # Failed auth attempts (401s on login)
-        failed_logins = conn.execute(
-            "SELECT COUNT(*) FROM request_log WHERE path LIKE '%/auth/login%' AND status=401 AND created_at >= ?",
-            (today,),
-        ).fetchone()[0]
-
-        # 403 Forbidden (unauthorized access attempts)
-        forbidden_count = conn.execute(
-            "SELECT COUNT(*) FROM request_log WHERE status=403 AND created_at >= ?",
-            (today,),
-        ).fetchone()[0]
-
-        # 429 Rate limited
-        rate_limited = conn.execute(
-            "SELECT COUNT(*) FROM request_log WHERE status=429 AND created_at >= ?",
-            (today,),
-        ).fetchone()[0]
-
-        # Unique IPs today
-        unique_ips = conn.execute(
-            "SELECT COUNT(DISTINCT ip_address) FROM request_log WHERE created_at >= ?",
-            (today,),
-        ).fetchone()[0]
-
-        # Average response time
-        avg_ms = conn.execute(
-            "SELECT AVG(duration_ms) FROM request_log WHERE created_at >= ?",
-            (today,),
-        ).fetchone()[0] or 0
+        row = conn.execute("""
+            SELECT
+                COALESCE(SUM(requests), 0)        AS total_today,
+                COALESCE(SUM(failed_logins), 0)   AS failed_logins,
+                COALESCE(SUM(forbidden), 0)       AS forbidden_count,
+                COALESCE(SUM(rate_limited), 0)    AS rate_limited,
+                COALESCE(SUM(status_5xx), 0)      AS server_errors,
+                COALESCE(SUM(duration_sum_ms), 0) AS duration_sum_ms,
+                COALESCE(MAX(duration_max_ms), 0) AS max_ms,
+                (SELECT COUNT(*) FROM request_log_daily_ips WHERE day = ?) AS unique_ips,
+                (SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name GLOB ?) AS partitions
+            FROM request_log_minute
+            WHERE minute >= ?
+        """, (today, _PARTITION_GLOB, today)).fetchone()
+        total_today = row["total_today"]
 
         return {
             "total_requests_today": total_today,
-            "failed_logins_today": failed_logins,
-            "forbidden_attempts_today": forbidden_count,
-            "rate_limited_today": rate_limited,
-            "unique_ips_today": unique_ips,
-            "avg_response_ms": round(avg_ms, 1),
+            "failed_logins_today": row["failed_logins"],
+            "forbidden_attempts_today": row["forbidden_count"],
+            "rate_limited_today": row["rate_limited"],
+            "server_errors_today": row["server_errors"],
+            "unique_ips_today": row["unique_ips"],
+            "avg_response_ms": round(row["duration_sum_ms"] / total_today, 1) if total_today else 0,
+            "max_response_ms": round(row["max_ms"], 1),
+            "latency": metrics.request_latency_summary(),
+            "request_log": {
+                "partitions": row["partitions"],
+                "retention_days": REQUEST_LOG_RETENTION_DAYS,
+            },
+            "audit_writer": audit_writer.stats(),
+            "rate_limiter": _rate_limiter.stats(),
         }
     finally:
         conn.close()
@@ -0,0 +1,147 @@
+"""
+Static Assets — serves the build_static.py output (static/dist) for /static/*.
+
+Pure ASGI middleware placed outermost, so asset requests skip the
+security middleware (audit, rate limit) and the rest of the stack entirely:
+- Precompressed .br / .gz siblings chosen by Accept-Encoding
+- Fingerprinted files (listed in manifest.json) are cached as immutable
+- Everything else (HTML, JSON data, images) is revalidated via ETag
+- Files are read once and kept in memory; a rebuild is picked up automatically
+
+Without a build (no static/dist/manifest.json) requests fall through to the
+regular StaticFiles mount, as in development.
+"""
+
+import os
+import json
+import time
+import hashlib
+import mimetypes
+from typing import Dict, Optional, Any
+
+from services.compression import negotiate_encoding
+from services.security import SECURITY_HEADERS_RAW
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+# How often (seconds) to check whether the build has been replaced
+MANIFEST_CHECK_INTERVAL = 2.0
+
+
+class StaticAssetsMiddleware:
+    def __init__(self, app, dist_dir: str = DIST_DIR, prefix: str = "/static/"):
+        self.app = app
+        self.dist_dir = os.path.realpath(dist_dir)
+        self.prefix = prefix
+        self._manifest_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._immutable: set = set()
+        self._assets: Dict[str, Dict[str, Any]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.prefix)
+            or not self._build_available()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        asset = self._asset(scope["path"][len(self.prefix):])
+        if asset is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        encoding = negotiate_encoding(
+            request_headers.get(b"accept-encoding", b"").decode("latin-1"),
+            [e for e in asset["bodies"] if e != "identity"],
+        )
+        etag = asset["etag"] if encoding is None else f'{asset["etag"][:-1]}-{encoding}"'
+        body = asset["bodies"][encoding or "identity"]
+
+        headers = [
+            (b"content-type", asset["content_type"]),
+            (b"cache-control", asset["cache_control"]),
+            (b"etag", etag.encode("latin-1")),
+        ] + SECURITY_HEADERS_RAW
+        if len(asset["bodies"]) > 1:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if if_none_match and (etag in if_none_match or if_none_match.strip() == "*"):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    # ── build / file cache ──
+
+    def _build_available(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._manifest_mtime is not None
+        self._next_check = now + MANIFEST_CHECK_INTERVAL
+
+        manifest_path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(manifest_path)
+        except OSError:
+            self._manifest_mtime = None
+            self._assets.clear()
+            return False
+        if mtime != self._manifest_mtime:
+            try:
+                with open(manifest_path) as f:
+                    self._immutable = set(json.load(f).values())
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read static manifest: {e}")
+                self._manifest_mtime = None
+                return False
+            self._assets.clear()
+            self._manifest_mtime = mtime
+        return True
+
+    def _asset(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        cached = self._assets.get(rel_path)
+        if cached is not None:
+            return cached
+
+        path = os.path.realpath(os.path.join(self.dist_dir, rel_path))
+        if not path.startswith(self.dist_dir + os.sep) or not os.path.isfile(path):
+            return None
+        if os.path.splitext(path)[1] in (".gz", ".br"):
+            return None  # siblings are only served through negotiation
+
+        with open(path, "rb") as f:
+            bodies = {"identity": f.read()}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, "rb") as f:
+                    bodies[encoding] = f.read()
+
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+
+        asset = {
+            "bodies": bodies,
+            "etag": f'"{hashlib.sha256(bodies["identity"]).hexdigest()[:16]}"',
+            "content_type": content_type.encode("latin-1"),
+            "cache_control": (IMMUTABLE_CACHE_CONTROL if rel_path in self._immutable
+                              else REVALIDATE_CACHE_CONTROL).encode("latin-1"),
+        }
+        self._assets[rel_path] = asset
+        return asset
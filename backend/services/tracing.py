@@ -0,0 +1,177 @@
+"""
+Tracing — per-request stage timings for the chat (RAG) pipeline.
+
+    with tracing.start_trace("chat") as trace:       # around one request
+        ...
+    @tracing.traced("embed")                         # on a pipeline stage
+    async def generate_embeddings(...): ...
+
+Spans live in a contextvar, so concurrent requests never mix and stages
+started from asyncio.gather() tasks land in the right trace.  Code run with
+run_in_executor needs tracing.bind(fn) to carry the context into the thread.
+
+Every span also feeds the rag_stage_duration_seconds histogram (services.metrics),
+traced request or not.  The last TRACE_BUFFER_SIZE traces are kept in memory
+and can be exported as Chrome trace JSON (chrome://tracing, Perfetto).
+"""
+
+import os
+import time
+import asyncio
+import functools
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from services import metrics
+
+# ─── Config ──────────────────────────────────────────────────────────────────
+
+# Completed traces kept for the Chrome trace export
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+
+class Trace:
+    """One traced request: spans as (name, start, end, depth, lane, error), perf_counter seconds."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str):
+        self.id = next(self._ids)
+        self.name = name
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[tuple] = []
+
+    def timings(self) -> Dict[str, Any]:
+        """Span timings relative to the start of the trace (the ChatResponse.timings payload)."""
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "total_ms": round((end - self.start) * 1000, 2),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - self.start) * 1000, 2),
+                    "duration_ms": round((stop - start) * 1000, 2),
+                    "depth": depth,
+                    **({"error": True} if error else {}),
+                }
+                for name, start, stop, depth, _, error in sorted(self.spans, key=lambda s: s[1])
+            ],
+        }
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_current_depth: contextvars.ContextVar = contextvars.ContextVar("trace_depth", default=0)
+_recent: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def _lane() -> int:
+    """The asyncio task (or thread) a span runs on, so parallel stages get their own row."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+# ─── Spans ───────────────────────────────────────────────────────────────────
+
+@contextmanager
+def start_trace(name: str):
+    """Collect the spans of everything run inside the block into a new Trace."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    depth_token = _current_depth.set(0)
+    try:
+        yield trace
+    finally:
+        trace.end = time.perf_counter()
+        _current_trace.reset(trace_token)
+        _current_depth.reset(depth_token)
+        _recent.append(trace)
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage: recorded in the current trace (if any) and the stage histogram."""
+    trace = _current_trace.get()
+    depth = _current_depth.get()
+    depth_token = _current_depth.set(depth + 1)
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_depth.reset(depth_token)
+        metrics.STAGE_LATENCY.observe(end - start, name)
+        if trace is not None:
+            trace.spans.append((name, start, end, depth, _lane(), error))
+
+
+def traced(name: str):
+    """Decorator: wrap a sync or async function in span(name)."""
+    def decorate(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn: Callable) -> Callable:
+    """fn bound to the caller's context, for run_in_executor (which doesn't copy it)."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# ─── Export ──────────────────────────────────────────────────────────────────
+
+def chrome_trace(limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Recent traces in the Chrome trace event format: one complete ("X") event
+    per trace and per span, one row per trace (plus one per parallel task or worker thread).
+    """
+    traces = list(_recent)
+    if limit is not None:
+        traces = traces[-limit:] if limit > 0 else []
+    pid = os.getpid()
+    events = []
+    for trace in traces:
+        end = trace.end if trace.end is not None else time.perf_counter()
+        base_us = trace.wall_start * 1_000_000
+        lanes: Dict[int, int] = {}
+        for name, start, stop, depth, lane, error in sorted(trace.spans, key=lambda s: s[1]):
+            lanes.setdefault(lane, len(lanes))
+        for lane_index in range(max(1, len(lanes))):
+            label = f"{trace.name} #{trace.id}" + (f" · lane {lane_index + 1}" if lane_index else "")
+            events.append({"name": "thread_name", "ph": "M", "pid": pid,
+                           "tid": trace.id * 1000 + lane_index, "args": {"name": label}})
+        events.append({
+            "name": trace.name, "cat": "request", "ph": "X", "pid": pid, "tid": trace.id * 1000,
+            "ts": round(base_us), "dur": round((end - trace.start) * 1_000_000),
+        })
+        for name, start, stop, depth, lane, error in trace.spans:
+            events.append({
+                "name": name, "cat": "stage", "ph": "X", "pid": pid,
+                "tid": trace.id * 1000 + lanes[lane],
+                "ts": round(base_us + (start - trace.start) * 1_000_000),
+                "dur": round((stop - start) * 1_000_000),
+                "args": {"depth": depth, **({"error": True} if error else {})},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -12,17 +12,22 @@ In production, replace with real TOTP / SMS / FIDO2 integrations.
 """
 
 import os
+import atexit
 import sqlite3
+import threading
 import uuid
 import secrets
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict
 
 import jwt
 
+from services import metrics
+
 # ─── Config ──────────────────────────────────────────────────────────────────
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "courses.db")
+DB_PATH = os.getenv("COURSES_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "courses.db"))
 JWT_SECRET = os.getenv("JWT_SECRET", "edu-assist-pro-secret-change-in-prod-2026")
 JWT_ALGORITHM = "HS256"
 
@@ -32,6 +37,15 @@ DEMO_CODE = "123456"
 # Temp token lifespan (minutes) – user must complete 2FA within this window
 TEMP_TOKEN_EXPIRE_MINUTES = 10
 
+# Challenge housekeeping: expired/used challenges are kept this long (the admin
+# dashboard reports the last 24h), then deleted in batches by a background sweeper
+CHALLENGE_RETENTION_HOURS = int(os.getenv("TWOFA_CHALLENGE_RETENTION_HOURS", "24"))
+CHALLENGE_SWEEP_INTERVAL_S = int(os.getenv("TWOFA_SWEEP_INTERVAL_S", "300"))
+CHALLENGE_SWEEP_BATCH = int(os.getenv("TWOFA_SWEEP_BATCH", "500"))
+
+# Pending challenges kept in memory so verification skips the lookup query
+HOT_CHALLENGES_MAX = int(os.getenv("TWOFA_HOT_CHALLENGES_MAX", "10000"))
+
 # Available 2FA methods
 AVAILABLE_METHODS = [
     {
@@ -64,6 +78,9 @@ AVAILABLE_METHODS = [
     },
 ]
 
+# Static method metadata, indexed once for the login / challenge hot path
+METHODS_BY_ID = {m["id"]: m for m in AVAILABLE_METHODS}
+
 
 # ─── DB helpers ──────────────────────────────────────────────────────────────
 
@@ -100,6 +117,17 @@ def _init_tables():
             created_at  TEXT NOT NULL,
             FOREIGN KEY (user_id) REFERENCES users(id)
         );
+
+        -- "invalidate pending challenges for this user" on every login
+        CREATE INDEX IF NOT EXISTS idx_twofa_challenges_user_pending
+            ON twofa_challenges(user_id, is_used);
+        -- sweeper range scan
+        CREATE INDEX IF NOT EXISTS idx_twofa_challenges_expires
+            ON twofa_challenges(expires_at);
+        -- covering index for verify_challenge (no table lookup; the query names it
+        -- with INDEXED BY, since the planner otherwise prefers the primary key)
+        CREATE INDEX IF NOT EXISTS idx_twofa_challenges_verify
+            ON twofa_challenges(id, is_used, user_id, code, expires_at);
     """)
     conn.commit()
     conn.close()
@@ -169,9 +197,8 @@ def get_user_2fa_settings(user_id: str) -> dict:
 
 def enable_2fa(user_id: str, method: str = "authenticator") -> dict:
     """Enable 2FA for a user with the specified preferred method."""
-    valid_methods = [m["id"] for m in AVAILABLE_METHODS]
-    if method not in valid_methods:
-        return {"error": f"Invalid method. Must be one of: {', '.join(valid_methods)}"}
+    if method not in METHODS_BY_ID:
+        return {"error": f"Invalid method. Must be one of: {', '.join(METHODS_BY_ID)}"}
 
     conn = _conn()
     try:
@@ -226,9 +253,8 @@ def disable_2fa(user_id: str) -> dict:
 
 def update_preferred_method(user_id: str, method: str) -> dict:
     """Update the user's preferred 2FA method."""
-    valid_methods = [m["id"] for m in AVAILABLE_METHODS]
-    if method not in valid_methods:
-        return {"error": f"Invalid method. Must be one of: {', '.join(valid_methods)}"}
+    if method not in METHODS_BY_ID:
+        return {"error": f"Invalid method. Must be one of: {', '.join(METHODS_BY_ID)}"}
 
     conn = _conn()
     try:
@@ -254,72 +280,231 @@ def create_challenge(user_id: str, method: str) -> dict:
       - hardware_key: initiate WebAuthn challenge
       - contact_admin: notify admin via email/chat
     """
-    challenge_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc)
-    expires_at = now + timedelta(minutes=5)
-
     conn = _conn()
     try:
-        # Invalidate any existing unused challenges for this user
-        conn.execute("""
-            UPDATE twofa_challenges SET is_used=1
-            WHERE user_id=? AND is_used=0
-        """, (user_id,))
-
-        conn.execute("""
-            INSERT INTO twofa_challenges (id, user_id, method, code, is_used, expires_at, created_at)
-            VALUES (?, ?, ?, ?, 0, ?, ?)
-        """, (challenge_id, user_id, method, DEMO_CODE, expires_at.isoformat(), now.isoformat()))
+        challenge = insert_challenge(conn, user_id, method)
         conn.commit()
-
-        # Get method info
-        method_info = next((m for m in AVAILABLE_METHODS if m["id"] == method), AVAILABLE_METHODS[0])
-
-        return {
-            "challenge_id": challenge_id,
-            "method": method,
-            "instructions": method_info["instructions"],
-            "expires_in_seconds": 300,
-            # In demo mode we hint at the code
-            "demo_hint": "For demo purposes, the code is 123456",
-        }
+        return challenge
     finally:
         conn.close()
 
 
+def insert_challenge(conn, user_id: str, method: str) -> dict:
+    """
+    Write a challenge on the caller's connection without committing, so the
+    login flow can batch it with its audit row in a single transaction.
+    """
+    challenge_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=5)
+
+    # Invalidate any existing unused challenges for this user
+    conn.execute("""
+        UPDATE twofa_challenges SET is_used=1
+        WHERE user_id=? AND is_used=0
+    """, (user_id,))
+
+    conn.execute("""
+        INSERT INTO twofa_challenges (id, user_id, method, code, is_used, expires_at, created_at)
+        VALUES (?, ?, ?, ?, 0, ?, ?)
+    """, (challenge_id, user_id, method, DEMO_CODE, expires_at.isoformat(), now.isoformat()))
+    _remember_challenge(challenge_id, user_id, DEMO_CODE, expires_at)
+    _ensure_sweeper()
+
+    method_info = METHODS_BY_ID.get(method, AVAILABLE_METHODS[0])
+
+    return {
+        "challenge_id": challenge_id,
+        "method": method,
+        "instructions": method_info["instructions"],
+        "expires_in_seconds": 300,
+        # In demo mode we hint at the code
+        "demo_hint": "For demo purposes, the code is 123456",
+    }
+
+
 def verify_challenge(challenge_id: str, code: str) -> dict:
     """
     Verify a 2FA challenge code.
     Returns { success: True } or { error: "..." }.
+
+    Pending challenges are looked up in the in-memory hot set first (falling
+    back to the covering index); the challenge is only consumed if the
+    conditional UPDATE in the database still finds it unused, so the hot set
+    never lets a code be replayed or used after invalidation elsewhere.
     """
-    conn = _conn()
+    challenge = _hot_challenge(challenge_id)
+    conn = None
     try:
-        row = conn.execute("""
-            SELECT * FROM twofa_challenges
-            WHERE id=? AND is_used=0
-        """, (challenge_id,)).fetchone()
-
-        if not row:
-            return {"error": "Invalid or expired verification code"}
+        if challenge is None:
+            conn = _conn()
+            row = conn.execute("""
+                SELECT user_id, code, expires_at
+                FROM twofa_challenges INDEXED BY idx_twofa_challenges_verify
+                WHERE id=? AND is_used=0
+            """, (challenge_id,)).fetchone()
+            if not row:
+                return {"error": "Invalid or expired verification code"}
+            challenge = (row["user_id"], row["code"], datetime.fromisoformat(row["expires_at"]))
+
+        user_id, expected_code, expires_at = challenge
 
         # Check expiry
-        expires_at = datetime.fromisoformat(row["expires_at"])
         if datetime.now(timezone.utc) > expires_at:
+            _forget_challenge(challenge_id)
+            conn = conn or _conn()
             conn.execute("UPDATE twofa_challenges SET is_used=1 WHERE id=?", (challenge_id,))
             conn.commit()
             return {"error": "Verification code has expired. Please request a new one."}
 
         # Check code (demo: always 123456)
-        if code != row["code"]:
+        if code != expected_code:
             return {"error": "Invalid verification code. Please try again."}
 
-        # Mark as used
-        conn.execute("UPDATE twofa_challenges SET is_used=1 WHERE id=?", (challenge_id,))
+        # Mark as used — only succeeds once, whichever worker gets there first
+        conn = conn or _conn()
+        claimed = conn.execute(
+            "UPDATE twofa_challenges SET is_used=1 WHERE id=? AND is_used=0", (challenge_id,)
+        ).rowcount
         conn.commit()
+        _forget_challenge(challenge_id)
+        if not claimed:
+            return {"error": "Invalid or expired verification code"}
 
-        return {"success": True, "user_id": row["user_id"]}
+        return {"success": True, "user_id": user_id}
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# ─── Pending challenge hot set ───────────────────────────────────────────────
+
+# challenge_id -> (user_id, code, expires_at); insertion ordered, oldest evicted
+_hot_challenges: "OrderedDict[str, tuple]" = OrderedDict()
+_hot_by_user: Dict[str, str] = {}
+_hot_lock = threading.Lock()
+_hot_stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+
+def _remember_challenge(challenge_id: str, user_id: str, code: str, expires_at: datetime):
+    with _hot_lock:
+        # A new challenge invalidates the user's previous one
+        previous = _hot_by_user.pop(user_id, None)
+        if previous is not None:
+            _hot_challenges.pop(previous, None)
+        _hot_challenges[challenge_id] = (user_id, code, expires_at)
+        _hot_by_user[user_id] = challenge_id
+        while len(_hot_challenges) > HOT_CHALLENGES_MAX:
+            old_id, (old_user, _, _) = _hot_challenges.popitem(last=False)
+            if _hot_by_user.get(old_user) == old_id:
+                del _hot_by_user[old_user]
+            _hot_stats["evicted"] += 1
+
+
+def _hot_challenge(challenge_id: str) -> Optional[tuple]:
+    with _hot_lock:
+        challenge = _hot_challenges.get(challenge_id)
+        _hot_stats["hits" if challenge is not None else "misses"] += 1
+    metrics.cache_lookup("twofa_challenge", challenge is not None)
+    return challenge
+
+
+def _forget_challenge(challenge_id: str):
+    with _hot_lock:
+        challenge = _hot_challenges.pop(challenge_id, None)
+        if challenge is not None and _hot_by_user.get(challenge[0]) == challenge_id:
+            del _hot_by_user[challenge[0]]
+
+
+def _prune_hot_challenges():
+    now = datetime.now(timezone.utc)
+    with _hot_lock:
+        for challenge_id, (user_id, _, expires_at) in list(_hot_challenges.items()):
+            if expires_at < now:
+                del _hot_challenges[challenge_id]
+                if _hot_by_user.get(user_id) == challenge_id:
+                    del _hot_by_user[user_id]
+
+
+# ─── Challenge sweeper ───────────────────────────────────────────────────────
+
+_sweeper: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+_sweeper_lock = threading.Lock()
+_sweep_stats = {"runs": 0, "deleted": 0, "last_run": None, "errors": 0}
+
+
+def sweep_challenges(batch_size: int = CHALLENGE_SWEEP_BATCH) -> int:
+    """
+    Delete challenges that expired more than CHALLENGE_RETENTION_HOURS ago
+    (used or not), batch_size rows per transaction so logins are never
+    blocked behind one long delete. Returns the number of rows deleted.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=CHALLENGE_RETENTION_HOURS)).isoformat()
+    deleted = 0
+    conn = _conn()
+    try:
+        while True:
+            n = conn.execute("""
+                DELETE FROM twofa_challenges WHERE rowid IN (
+                    SELECT rowid FROM twofa_challenges WHERE expires_at < ? LIMIT ?
+                )
+            """, (cutoff, batch_size)).rowcount
+            conn.commit()
+            deleted += n
+            if n < batch_size:
+                break
     finally:
         conn.close()
+    _prune_hot_challenges()
+    _sweep_stats["runs"] += 1
+    _sweep_stats["deleted"] += deleted
+    _sweep_stats["last_run"] = datetime.now(timezone.utc).isoformat()
+    return deleted
+
+
+def _sweep_loop():
+    while not _sweeper_stop.is_set():
+        try:
+            deleted = sweep_challenges()
+            if deleted:
+                print(f"🧹 Purged {deleted} expired 2FA challenges")
+        except sqlite3.Error as e:
+            _sweep_stats["errors"] += 1
+            print(f"⚠️ 2FA challenge sweep failed: {e}")
+        _sweeper_stop.wait(CHALLENGE_SWEEP_INTERVAL_S)
+
+
+def _ensure_sweeper():
+    """Start the sweeper thread on first use (CHALLENGE_SWEEP_INTERVAL_S=0 disables it)."""
+    global _sweeper
+    if _sweeper is not None or CHALLENGE_SWEEP_INTERVAL_S <= 0:
+        return
+    with _sweeper_lock:
+        if _sweeper is None and not _sweeper_stop.is_set():
+            _sweeper = threading.Thread(target=_sweep_loop, name="twofa-sweeper", daemon=True)
+            _sweeper.start()
+            atexit.register(stop_challenge_sweeper)
+
+
+def stop_challenge_sweeper(timeout: float = 5.0):
+    _sweeper_stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout)
+
+
+def get_challenge_housekeeping_stats() -> dict:
+    with _hot_lock:
+        hot = {"pending_in_memory": len(_hot_challenges), "capacity": HOT_CHALLENGES_MAX, **_hot_stats}
+    return {
+        "hot_set": hot,
+        "sweeper": {
+            **_sweep_stats,
+            "running": _sweeper is not None and _sweeper.is_alive(),
+            "interval_s": CHALLENGE_SWEEP_INTERVAL_S,
+            "retention_hours": CHALLENGE_RETENTION_HOURS,
+        },
+    }
 
 
 # ─── Admin helpers ───────────────────────────────────────────────────────────
@@ -352,6 +537,7 @@ def get_all_2fa_stats() -> dict:
             "adoption_rate": round((enabled_count / max(total_users, 1)) * 100, 1),
             "method_breakdown": method_counts,
             "challenges_last_24h": recent_challenges,
+            "challenge_housekeeping": get_challenge_housekeeping_stats(),
         }
     finally:
         conn.close()
@@ -9,6 +9,8 @@ from datetime import datetime
 import hashlib
 from sentence_transformers import SentenceTransformer
 import os
+from services.embedding_service import EmbeddingClient
+from services import metrics, tracing
 
 class VectorStore:
     def __init__(self, db_path: str = "vector_store.db", model_name: str = "all-MiniLM-L6-v2"):
@@ -20,6 +22,10 @@ class VectorStore:
         self.embedding_model: Optional[SentenceTransformer] = None
         self.embedding_dimension = 384  # Default for all-MiniLM-L6-v2
         
+        # Shared out-of-process embedding service (one model for all web workers).
+        # When EMBEDDING_SERVICE_ADDRESS is unset the model is loaded in-process.
+        self.embedding_client: Optional[EmbeddingClient] = EmbeddingClient.from_env()
+        
         # Initialize database synchronously
         self._sync_init_db()
     
@@ -80,20 +86,28 @@ class VectorStore:
                 lambda: SentenceTransformer(self.model_name)
             )
     
+    @tracing.traced("embed")
     async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts
         """
-        await self._load_embedding_model()
-        if self.embedding_model is None:
-            raise Exception("Failed to load embedding model")
-        
-        loop = asyncio.get_event_loop()
-        embeddings = await loop.run_in_executor(
-            None,
-            lambda: self.embedding_model.encode(texts, convert_to_numpy=True)  # type: ignore
-        )
-        return embeddings
+        backend = "service" if self.embedding_client is not None else "local"
+        metrics.EMBEDDING_CALLS.inc(backend)
+        metrics.EMBEDDING_TEXTS.inc(backend, amount=len(texts))
+        with metrics.EMBEDDING_LATENCY.time(backend):
+            if self.embedding_client is not None:
+                return await self.embedding_client.encode(texts)
+            
+            await self._load_embedding_model()
+            if self.embedding_model is None:
+                raise Exception("Failed to load embedding model")
+            
+            loop = asyncio.get_event_loop()
+            embeddings = await loop.run_in_executor(
+                None,
+                lambda: self.embedding_model.encode(texts, convert_to_numpy=True)  # type: ignore
+            )
+            return embeddings
     
     async def store_document_chunks(self, chunks: List[Dict[str, Any]], filename: str, subject: str) -> str:
         """
@@ -181,7 +195,7 @@ class VectorStore:
             loop = asyncio.get_event_loop()
             results = await loop.run_in_executor(
                 None,
-                self._sync_similarity_search,
+                tracing.bind(self._sync_similarity_search),
                 query_embedding,
                 top_k,
                 subject_filter
@@ -192,6 +206,7 @@ class VectorStore:
         except Exception as e:
             raise Exception(f"Error performing similarity search: {str(e)}")
     
+    @tracing.traced("vector_search")
     def _sync_similarity_search(self, query_embedding: np.ndarray, top_k: int, 
                                subject_filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -201,22 +216,23 @@ class VectorStore:
         cursor = conn.cursor()
         
         try:
-            # Build query with optional subject filter
-            if subject_filter:
-                cursor.execute('''
-                    SELECT c.id, c.text, c.embedding, c.metadata, d.filename, d.subject
-                    FROM chunks c
-                    JOIN documents d ON c.document_id = d.id
-                    WHERE d.subject = ?
-                ''', (subject_filter,))
-            else:
-                cursor.execute('''
-                    SELECT c.id, c.text, c.embedding, c.metadata, d.filename, d.subject
-                    FROM chunks c
-                    JOIN documents d ON c.document_id = d.id
-                ''')
+            with metrics.db_timer("vector_search_fetch"), tracing.span("vector_search.fetch"):
+                # Build query with optional subject filter
+                if subject_filter:
+                    cursor.execute('''
+                        SELECT c.id, c.text, c.embedding, c.metadata, d.filename, d.subject
+                        FROM chunks c
+                        JOIN documents d ON c.document_id = d.id
+                        WHERE d.subject = ?
+                    ''', (subject_filter,))
+                else:
+                    cursor.execute('''
+                        SELECT c.id, c.text, c.embedding, c.metadata, d.filename, d.subject
+                        FROM chunks c
+                        JOIN documents d ON c.document_id = d.id
+                    ''')
             
-            rows = cursor.fetchall()
+                rows = cursor.fetchall()
             
             if not rows:
                 return []
@@ -333,7 +349,6 @@ class VectorStore:
         Check if vector store is working
         """
         try:
-            await self._load_embedding_model()
             # Test embedding generation
             test_embeddings = await self.generate_embeddings(["test"])
             return test_embeddings is not None and len(test_embeddings) > 0
@@ -5,6 +5,7 @@ import os
 from typing import List, Dict, Any
 import json
 from urllib.parse import quote_plus
+from services import tracing
 
 class WebSearchService:
     def __init__(self):
@@ -15,11 +16,13 @@ class WebSearchService:
         - Google Custom Search (requires API key)
         - Bing Search (requires API key)
         """
-        self.ddg_base_url = "https://api.duckduckgo.com/"
+        # Overridable so benchmarks can point it at a local stand-in
+        self.ddg_base_url = os.getenv("DDG_API_URL", "https://api.duckduckgo.com/")
         self.google_api_key = os.getenv("GOOGLE_SEARCH_API_KEY")
         self.google_search_engine_id = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
         self.bing_api_key = os.getenv("BING_SEARCH_API_KEY")
         
+    @tracing.traced("web_search")
     async def search(self, query: str, num_results: int = 5) -> List[Dict[str, Any]]:
         """
         Perform web search and return formatted results
@@ -204,6 +207,7 @@ class WebSearchService:
         
         return educational_resources
     
+    @tracing.traced("page_fetch")
     async def get_page_content(self, url: str, max_chars: int = 2000) -> str:
         """
         Fetch and extract content from a webpage
@@ -0,0 +1,52 @@
+"""
+GroqService rate pacing: token buckets hand out tokens by priority.
+
+Run from backend/:
+    python -m pytest -q tests
+"""
+
+import asyncio
+
+from services.groq_service import _TokenBucket, PRIORITY_CHAT, PRIORITY_QUIZ
+
+
+def test_chat_is_served_before_queued_quiz_calls_on_an_empty_bucket():
+    async def main():
+        bucket = _TokenBucket(per_minute=600)  # one token every 0.1 s
+        await bucket.acquire(600)  # drain it
+        served = []
+
+        async def call(name, priority):
+            await bucket.acquire(1, priority)
+            served.append(name)
+
+        quizzes = [asyncio.ensure_future(call(f"quiz-{i}", PRIORITY_QUIZ)) for i in range(3)]
+        await asyncio.sleep(0.02)
+        assert bucket.waiting == 3
+        chat = asyncio.ensure_future(call("chat", PRIORITY_CHAT))
+        await asyncio.gather(*quizzes, chat)
+        return served
+
+    assert asyncio.run(main()) == ["chat", "quiz-0", "quiz-1", "quiz-2"]
+
+
+def test_cancelled_waiter_does_not_hold_up_the_queue():
+    async def main():
+        bucket = _TokenBucket(per_minute=600)
+        await bucket.acquire(600)
+        served = []
+
+        async def call(name, priority):
+            await bucket.acquire(1, priority)
+            served.append(name)
+
+        chat = asyncio.ensure_future(call("chat", PRIORITY_CHAT))
+        quiz = asyncio.ensure_future(call("quiz", PRIORITY_QUIZ))
+        await asyncio.sleep(0.02)
+        chat.cancel()
+        await asyncio.wait_for(quiz, timeout=1.0)
+        return served, bucket.waiting
+
+    served, waiting = asyncio.run(main())
+    assert served == ["quiz"]
+    assert waiting == 0
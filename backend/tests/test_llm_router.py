@@ -0,0 +1,350 @@
+"""
+LLMRouter hedging, failover and circuit breaking against two local HTTP
+stand-ins (aiohttp servers with controlled latency and 5xx responses), both
+through a minimal HTTP provider and through the real GroqService and
+OpenAIService pointed at the stand-ins.
+
+Run from backend/:
+    python -m pytest -q tests
+"""
+
+import time
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from services import groq_service, llm_router
+from services.groq_service import GroqService
+from services.llm_router import LLMRouter
+from services.openai_service import OpenAIService
+
+MESSAGES = [{"role": "user", "content": "What is phishing?"}]
+
+
+class StandIn:
+    """
+    A completion endpoint whose latency and status can be changed mid-test.
+    Serves /complete for HttpService and the OpenAI-compatible routes the
+    Groq (/openai/v1/...) and OpenAI (/v1/...) SDKs call.
+    """
+
+    def __init__(self, name: str, latency: float = 0.0, status: int = 200):
+        self.name = name
+        self.latency = latency
+        self.status = status
+        self.arrivals = []  # monotonic time of every request received
+        self.models = []  # model named in each SDK chat completion request
+        self.base_url = None
+        self.url = None
+        self._runner = None
+
+    async def _answer(self, body):
+        self.arrivals.append(time.monotonic())
+        await asyncio.sleep(self.latency)
+        if self.status >= 400:
+            return web.json_response({"error": {"message": "stand-in failure"}}, status=self.status)
+        return web.json_response(body)
+
+    async def _complete(self, request):
+        return await self._answer({"content": f"answer from {self.name}"})
+
+    async def _chat_completions(self, request):
+        model = (await request.json()).get("model")
+        self.models.append(model)
+        return await self._answer({
+            "id": "chatcmpl-stand-in",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"answer from {self.name}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16},
+        })
+
+    async def _models(self, request):
+        return web.json_response({"object": "list", "data": [{"id": "llama-3.3-70b-versatile", "object": "model"}]})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/complete", self._complete)
+        app.router.add_post("/openai/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_get("/openai/v1/models", self._models)
+        self._runner = web.AppRunner(app, handler_cancellation=True)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.url = f"{self.base_url}/complete"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class HttpService:
+    """Minimal provider service (the chat_completion / get_default_model subset the router uses)."""
+
+    def __init__(self, stand_in: StandIn, session: aiohttp.ClientSession):
+        self.stand_in = stand_in
+        self.session = session
+        self.calls = []  # (model, priority)
+        self.cancelled = 0
+
+    async def get_default_model(self) -> str:
+        return f"{self.stand_in.name}-default"
+
+    async def chat_completion(self, messages, model=None, temperature=0.7, max_tokens=1024, priority="chat"):
+        self.calls.append((model, priority))
+        try:
+            async with self.session.post(self.stand_in.url, json={"messages": messages}) as r:
+                body = await r.json()
+                if r.status >= 400:
+                    raise Exception(f"{self.stand_in.name} returned {r.status}")
+                return body["content"]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def run_with_router(primary: StandIn, secondary: StandIn, scenario):
+    """Start both stand-ins, build a router over them and run scenario(router, services)."""
+    async def main():
+        await primary.start()
+        await secondary.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                services = (HttpService(primary, session), HttpService(secondary, session))
+                router = LLMRouter([("primary", services[0]), ("secondary", services[1])])
+                return await scenario(router, services)
+        finally:
+            await primary.stop()
+            await secondary.stop()
+    return asyncio.run(main())
+
+
+def run_with_sdk_router(primary: StandIn, secondary: StandIn, monkeypatch, scenario):
+    """Like run_with_router, but over the real GroqService (primary) and OpenAIService (secondary)."""
+    async def main():
+        await primary.start()
+        await secondary.start()
+        try:
+            monkeypatch.setenv("GROQ_API_KEY", "test-key")
+            monkeypatch.setenv("GROQ_BASE_URL", primary.base_url)
+            monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{secondary.base_url}/v1")
+            monkeypatch.setenv("OPENAI_MODEL", "gpt-4o-mini")
+            services = (GroqService(), OpenAIService())
+            router = LLMRouter([("groq", services[0]), ("openai", services[1])])
+            return await scenario(router, services)
+        finally:
+            await primary.stop()
+            await secondary.stop()
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def fast_deadlines(monkeypatch):
+    monkeypatch.setattr(llm_router, "HEDGE_DEFAULT_SECONDS", 0.2)
+    monkeypatch.setattr(llm_router, "BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(llm_router, "BREAKER_COOLDOWN_SECONDS", 0.3)
+
+
+# ─── Hedging ─────────────────────────────────────────────────────────────────
+
+def test_hedge_fires_after_deadline_and_faster_provider_wins():
+    primary, secondary = StandIn("primary", latency=2.0), StandIn("secondary", latency=0.05)
+
+    async def scenario(router, services):
+        start = time.monotonic()
+        result = await router.chat_completion(MESSAGES)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.05)  # let the loser's cancellation land
+        return result, elapsed, start, router.stats(), services
+
+    result, elapsed, start, stats, (primary_service, _) = run_with_router(primary, secondary, scenario)
+
+    assert result == "answer from secondary"
+    # Hedge sent only once the deadline had passed, and answered well before the slow primary
+    assert secondary.arrivals[0] - start >= 0.2
+    assert elapsed < 1.0
+    assert stats["hedged_requests"] == 1
+    assert stats["fallback_wins"] == 1
+    # The losing primary request was cancelled and counted as neither success nor failure
+    assert primary_service.cancelled == 1
+    assert stats["providers"][0]["circuit"] == "closed"
+    assert stats["providers"][0]["consecutive_failures"] == 0
+
+
+def test_no_hedge_when_primary_answers_before_deadline():
+    primary, secondary = StandIn("primary", latency=0.02), StandIn("secondary")
+
+    async def scenario(router, services):
+        return await router.chat_completion(MESSAGES), router.stats()
+
+    result, stats = run_with_router(primary, secondary, scenario)
+
+    assert result == "answer from primary"
+    assert stats["hedged_requests"] == 0
+    assert secondary.arrivals == []
+
+
+def test_hedge_deadline_follows_the_requested_model():
+    router = LLMRouter([("primary", object())])
+    primary = router.providers[0]
+    for _ in range(llm_router.HEDGE_MIN_SAMPLES * 2):
+        router._window("primary", "fast-8b").record(0.3, ok=True)
+    for _ in range(llm_router.HEDGE_MIN_SAMPLES - 1):
+        router._window("primary", "quality-70b").record(9.0, ok=True)
+
+    # The busy fast model's p95 (clamped) must not set the quality model's deadline
+    assert router._hedge_deadline(primary, "fast-8b") == llm_router.HEDGE_MIN_SECONDS
+    assert router._hedge_deadline(primary, "quality-70b") == llm_router.HEDGE_DEFAULT_SECONDS
+
+    router._window("primary", "quality-70b").record(9.0, ok=True)
+    assert router._hedge_deadline(primary, "quality-70b") == 9.0
+
+
+def test_quiz_priority_is_never_hedged():
+    primary, secondary = StandIn("primary", latency=0.5), StandIn("secondary", latency=0.05)
+
+    async def scenario(router, services):
+        return await router.chat_completion(MESSAGES, max_tokens=2048, priority="quiz"), router.stats()
+
+    result, stats = run_with_router(primary, secondary, scenario)
+
+    assert result == "answer from primary"
+    assert stats["hedged_requests"] == 0
+    assert secondary.arrivals == []
+
+
+def test_primary_5xx_fails_over_immediately():
+    primary, secondary = StandIn("primary", status=503), StandIn("secondary")
+
+    async def scenario(router, services):
+        return await router.chat_completion(MESSAGES), router.stats()
+
+    result, stats = run_with_router(primary, secondary, scenario)
+
+    assert result == "answer from secondary"
+    assert stats["failovers"] == 1
+    assert stats["hedged_requests"] == 0
+
+
+# ─── Circuit breaker ─────────────────────────────────────────────────────────
+
+def test_breaker_opens_then_half_open_trial_closes_it():
+    primary, secondary = StandIn("primary", status=503), StandIn("secondary")
+
+    async def scenario(router, services):
+        for _ in range(3):
+            assert await router.chat_completion(MESSAGES) == "answer from secondary"
+        opened = router.stats()["providers"][0]["circuit"]
+
+        # Open: the primary isn't contacted at all
+        await router.chat_completion(MESSAGES)
+        skipped = len(primary.arrivals)
+
+        # After the cool-down one trial request goes through and closes the circuit
+        primary.status = 200
+        await asyncio.sleep(0.35)
+        trial = await router.chat_completion(MESSAGES)
+        return opened, skipped, trial, router.stats()
+
+    opened, skipped, trial, stats = run_with_router(primary, secondary, scenario)
+
+    assert opened == "open"
+    assert skipped == 3
+    assert trial == "answer from primary"
+    assert len(primary.arrivals) == 4
+    assert stats["providers"][0]["circuit"] == "closed"
+
+
+def test_failed_half_open_trial_reopens_breaker():
+    primary, secondary = StandIn("primary", status=500), StandIn("secondary")
+
+    async def scenario(router, services):
+        for _ in range(3):
+            await router.chat_completion(MESSAGES)
+        await asyncio.sleep(0.35)
+        breaker = router.providers[0].breaker
+        trial_result = await router.chat_completion(MESSAGES)  # trial fails, secondary answers
+        state_after_trial = breaker.state
+        await router.chat_completion(MESSAGES)  # re-opened: primary skipped again
+        return trial_result, state_after_trial
+
+    trial_result, state_after_trial = run_with_router(primary, secondary, scenario)
+
+    assert trial_result == "answer from secondary"
+    assert state_after_trial == "open"
+    assert len(primary.arrivals) == 4
+
+
+# ─── Real provider services ──────────────────────────────────────────────────
+
+def test_groq_service_hedges_onto_openai_service(monkeypatch):
+    primary, secondary = StandIn("groq", latency=2.0), StandIn("openai", latency=0.05)
+
+    async def scenario(router, services):
+        result = await router.chat_completion(MESSAGES, model="llama-3.1-8b-instant")
+        # The SDK call runs on a thread the cancellation can't stop: its slot stays taken
+        in_flight = services[0].get_limiter_stats()["in_flight"]
+        return result, in_flight, router.stats()
+
+    result, in_flight, stats = run_with_sdk_router(primary, secondary, monkeypatch, scenario)
+
+    assert result == "answer from openai"
+    assert stats["hedged_requests"] == 1
+    assert stats["fallback_wins"] == 1
+    assert stats["providers"][0]["circuit"] == "closed"
+    assert in_flight == 1
+    # Requested model went to the preferred provider; the hedge used the fallback's default
+    assert primary.models == ["llama-3.1-8b-instant"]
+    assert secondary.models == ["gpt-4o-mini"]
+
+
+def test_groq_service_5xx_fails_over_to_openai_service(monkeypatch):
+    monkeypatch.setattr(groq_service, "GROQ_MAX_RETRIES", 0)
+    primary, secondary = StandIn("groq", status=503), StandIn("openai")
+
+    async def scenario(router, services):
+        return await router.chat_completion(MESSAGES), router.stats(), services[0].get_limiter_stats()
+
+    result, stats, groq_stats = run_with_sdk_router(primary, secondary, monkeypatch, scenario)
+
+    assert result == "answer from openai"
+    assert stats["failovers"] == 1
+    assert stats["hedged_requests"] == 0
+    assert stats["providers"][0]["consecutive_failures"] == 1
+    assert groq_stats["errors"] == 1
+    # Default model looked up from the stand-in's /models, then used for the call
+    assert primary.models == ["llama-3.3-70b-versatile"]
+
+
+def test_quiz_priority_reaches_groq_service_unhedged(monkeypatch):
+    primary, secondary = StandIn("groq", latency=0.5), StandIn("openai", latency=0.05)
+
+    async def scenario(router, services):
+        ranks = []
+        acquire = services[0]._request_bucket.acquire
+
+        async def recording_acquire(cost=1.0, priority=groq_service.PRIORITY_CHAT):
+            ranks.append(priority)
+            await acquire(cost, priority)
+
+        services[0]._request_bucket.acquire = recording_acquire
+        result = await router.chat_completion(MESSAGES, max_tokens=2048, priority="quiz")
+        return result, ranks, router.stats(), services[0].get_limiter_stats()
+
+    result, ranks, stats, groq_stats = run_with_sdk_router(primary, secondary, monkeypatch, scenario)
+
+    assert result == "answer from groq"
+    assert stats["hedged_requests"] == 0
+    assert secondary.arrivals == []
+    assert groq_stats["calls"] == 1
+    assert ranks == [groq_service.PRIORITY_QUIZ]
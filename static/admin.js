@@ -269,7 +269,7 @@
 
         // Per-course table
         const tbody = $('courseScoreBody');
-        if (!d.per_course.length) { tbody.innerHTML = '<tr><td colspan="6" class="loading-cell">No quiz data</td></tr>'; return; }
+        if (!d.per_course.length) { tbody.innerHTML = '<tr><td colspan="7" class="loading-cell">No quiz data</td></tr>'; return; }
         tbody.innerHTML = d.per_course.map(c => `
             <tr>
                 <td><strong>${escHtml(c.course)}</strong></td>
@@ -277,6 +277,7 @@
                 <td>${c.avg_score}</td>
                 <td>${c.min_score}</td>
                 <td>${c.max_score}</td>
+                <td>${c.p10} / ${c.p50} / ${c.p90}</td>
                 <td>${c.pass_rate}%</td>
             </tr>
         `).join('');
@@ -468,7 +469,9 @@
         $('secForbidden').textContent = s.forbidden_attempts_today;
         $('secRateLimited').textContent = s.rate_limited_today;
         $('secUniqueIPs').textContent = s.unique_ips_today;
-        $('secAvgMs').textContent = s.avg_response_ms + 'ms';
+        const lat = s.latency?.overall || {};
+        const ms = v => v == null ? '—' : Math.round(v);
+        $('secLatency').textContent = `${ms(lat.p50_ms)} / ${ms(lat.p95_ms)} / ${ms(lat.p99_ms)}`;
     }
 
     function renderRequestLog() {
@@ -84,7 +84,7 @@ class CourseDetail {
     async loadData() {
         try {
             const [courseRes, enrollRes, progressRes] = await Promise.all([
-                AUTH.fetch(`/api/courses/${this.courseId}`),
+                AUTH.fetch(`/api/courses/${this.courseId}/outline`),
                 AUTH.fetch(`/api/enrollments/${this.userId}/${this.courseId}`),
                 AUTH.fetch(`/api/module-progress/${this.userId}/${this.courseId}`)
             ]);
@@ -289,8 +289,15 @@ class CourseDetail {
         document.getElementById('lvModuleLabel').textContent =
             `Module ${this.activeModuleIndex + 1} of ${modules.length}`;
 
-        // Article content
+        // Article content (fetched per module on first open)
         const article = document.getElementById('lvArticle');
+        if (mod.content === undefined) {
+            article.innerHTML = '<p>Loading module…</p>';
+            this.loadModuleContent(mod).then(() => {
+                if (modules[this.activeModuleIndex] === mod) this.renderLvContent();
+            });
+            return;
+        }
         if (mod.content && mod.content.trim().startsWith('<')) {
             article.innerHTML = mod.content;
         } else {
@@ -317,6 +324,20 @@ class CourseDetail {
         }
     }
 
+    async loadModuleContent(mod) {
+        if (!this.moduleContent) this.moduleContent = {};
+        if (!(mod.id in this.moduleContent)) {
+            try {
+                const res = await AUTH.fetch(`/api/courses/${this.courseId}/modules/${mod.id}/content`);
+                this.moduleContent[mod.id] = res.ok ? await res.text() : '';
+            } catch (err) {
+                console.error('Error loading module content:', err);
+                this.moduleContent[mod.id] = '';
+            }
+        }
+        mod.content = this.moduleContent[mod.id];
+    }
+
     /* ── Navigation ── */
     updateLvNav() {
         const modules = this.course.modules || [];